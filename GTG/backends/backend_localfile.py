@@ -25,16 +25,26 @@ wants to write a backend.
 """
 
 import os
+import threading
+import time
+
+from gi.repository import GLib
 
 from GTG.backends.backend_signals import BackendSignals
 from GTG.backends.generic_backend import GenericBackend
 from GTG.core.dirs import DATA_DIR
 from gettext import gettext as _
 from GTG.core import cleanxml, taskxml
+from GTG.core.filewatcher import FileWatcher
+from GTG.core.logger import log
+from GTG.core.taskindex import TaskFileIndex
 
 # Ignore all other elements but this one
 TASK_NODE = "task"
 
+# Number of tasks pushed to GTG core at once while loading the file
+PUSH_CHUNK_SIZE = 200
+
 
 class Backend(GenericBackend):
     """
@@ -42,8 +52,9 @@ class Backend(GenericBackend):
     XDG_DATA_DIR/gtg folder (the path is configurable).
     An instance of this class is used as the default backend for GTG.
     This backend loads all the tasks stored in the localfile after it's enabled
-    and from that point on just writes the changes to the file: it does not
-    listen for eventual file changes
+    and from that point on writes the changes to the file. It also watches the
+    file: when another program (e.g. a sync tool) modifies it, only the tasks
+    which were added, changed or removed are reloaded.
     """
 
     # General description of the backend: these are used to show a description
@@ -94,8 +105,7 @@ class Backend(GenericBackend):
         if self.KEY_DEFAULT_BACKEND not in parameters:
             parameters[self.KEY_DEFAULT_BACKEND] = True
 
-        self.doc, self.xmlproj = cleanxml.openxmlfile(
-            self.get_path(), "project")
+        self._open_file()
 
         # status if backup was used while trying to open xml file
         self._used_backup = cleanxml.used_backup()
@@ -104,6 +114,25 @@ class Backend(GenericBackend):
         # Make safety daily backup after loading
         cleanxml.savexml(self.get_path(), self.doc, backup=True)
 
+        # Byte offsets of the tasks in the file, to read a single task
+        # without parsing the whole file again
+        self._index = TaskFileIndex(self.get_path())
+
+        # Digests of the tasks as GTG last wrote or read them. Comparing them
+        # with the file tells which tasks another program modified.
+        self._known_digests = {}
+        # Held while the file is written or reloaded
+        self._file_lock = threading.RLock()
+        self._watcher = FileWatcher(self.get_path(), self._on_file_changed)
+
+    def _open_file(self):
+        """ Parses the XML file and indexes its task nodes by id """
+        self.doc, self.xmlproj = cleanxml.openxmlfile(
+            self.get_path(), "project")
+        self._task_nodes = {node.getAttribute("id"): node
+                            for node in self.xmlproj.childNodes
+                            if node.nodeName == TASK_NODE}
+
     def get_path(self):
         """
         Return the current path to XML
@@ -119,8 +148,7 @@ class Backend(GenericBackend):
     def initialize(self):
         """ This is called when a backend is enabled """
         super(Backend, self).initialize()
-        self.doc, self.xmlproj = cleanxml.openxmlfile(
-            self.get_path(), "project")
+        self._open_file()
 
     def this_is_the_first_run(self, xml):
         """ Called upon the very first GTG startup.
@@ -132,8 +160,7 @@ class Backend(GenericBackend):
         """
         self._parameters[self.KEY_DEFAULT_BACKEND] = True
         cleanxml.savexml(self.get_path(), xml)
-        self.doc, self.xmlproj = cleanxml.openxmlfile(
-            self.get_path(), "project")
+        self._open_file()
         self._used_backup = False
 
     def start_get_tasks(self):
@@ -142,14 +169,146 @@ class Backend(GenericBackend):
 
         @return: start_get_tasks() might not return or finish
         """
-        for node in self.xmlproj.childNodes:
-            if node.nodeName != TASK_NODE:
-                continue
-            tid = node.getAttribute("id")
+        start = time.perf_counter()
+        loaded = 0
+        chunk = []
+        for tid, node in list(self._task_nodes.items()):
             task = self.datastore.task_factory(tid)
             if task:
+                # Contents are only parsed when a view needs them
+                chunk.append(taskxml.task_from_xml(
+                    task, node, lazy_content=True,
+                    content_loader=self._get_content_loader(tid, node)))
+            # Pushing in chunks lets the first tasks be shown early
+            if len(chunk) >= PUSH_CHUNK_SIZE:
+                loaded += self.datastore.push_tasks(chunk)
+                chunk = []
+        loaded += self.datastore.push_tasks(chunk)
+
+        elapsed = time.perf_counter() - start
+        log.debug("Loaded %d tasks from %s in %.3f s (%.0f tasks/s)",
+                  loaded, self.get_path(), elapsed,
+                  loaded / elapsed if elapsed > 0 else 0)
+
+        with self._file_lock:
+            self._known_digests = self._index.get_digests()
+        self._watcher.start()
+
+    def _get_content_loader(self, tid, node):
+        """ Returns a function reading the content of a task straight from
+        the file, falling back on the XML node the task was loaded from """
+
+        def load_content():
+            content = self._index.get_content(tid)
+            if content is None:
+                content = taskxml.normalize_content(
+                    taskxml.read_node(node, "content"))
+            return content
+
+        return load_content
+
+    def get_task_node_from_file(self, tid):
+        """ Reads the current XML node of a single task from the file,
+        without parsing the rest of it.
+
+        @param tid: the id of the task
+        @returns: the <task> XML element, or None if the task is not in
+                  the file
+        """
+        return self._index.get_task_node(tid)
+
+    def get_task_digests(self):
+        """ Returns a dictionary {task id: digest} of the tasks stored in
+        the file, to find out cheaply which tasks changed """
+        return self._index.get_digests()
+
+    def _saved(self):
+        """ Records the version of the file GTG has just written, so that it
+        is not mistaken for an external modification """
+        self._known_digests = self._index.get_digests()
+        self._watcher.acknowledge()
+
+    def _on_file_changed(self):
+        """ Called by the watcher thread when the file changed on disk: finds
+        the tasks another program added, modified or removed. GTG core is
+        not thread-safe, so the changes are pushed to it from the main loop.
+        """
+        with self._file_lock:
+            if not self._index.is_complete():
+                # Don't mistake a file being written for deleted tasks
+                log.warning("Ignoring incomplete %s", self.get_path())
+                return
+
+            digests = self._index.get_digests()
+            known = self._known_digests
+
+            removed = [tid for tid in known if tid not in digests]
+            changed = [tid for tid, digest in digests.items()
+                       if known.get(tid) != digest]
+            if not removed and not changed:
+                return
+
+            log.info("%s was modified: %d tasks changed, %d removed",
+                     self.get_path(), len(changed), len(removed))
+
+            for tid in removed:
+                node = self._task_nodes.pop(tid, None)
+                if node is not None:
+                    self.xmlproj.removeChild(node)
+
+            nodes = {}
+            for tid in changed:
+                node = self._reload_task_node(tid)
+                if node is not None:
+                    nodes[tid] = node
+
+            self._known_digests = digests
+
+        GLib.idle_add(self._apply_file_changes, removed, nodes)
+
+    def _reload_task_node(self, tid):
+        """ Reads a single task from the file into our XML document. The file
+        lock must be held.
+
+        @returns: the new <task> XML element, or None if the task is not in
+                  the file anymore
+        """
+        node = self._index.get_task_node(tid)
+        if node is None:
+            return None
+
+        # Keep our XML document in sync, otherwise the next save would
+        # overwrite the external modification
+        node = self.doc.importNode(node, True)
+        existing = self._task_nodes.get(tid)
+        if existing is not None:
+            self.xmlproj.replaceChild(node, existing)
+        else:
+            self.xmlproj.appendChild(node)
+        self._task_nodes[tid] = node
+        return node
+
+    def _apply_file_changes(self, removed, nodes):
+        """ Idle callback updating GTG core with the tasks read by
+        _on_file_changed()
+
+        @param removed: the ids of the tasks removed from the file
+        @param nodes: a dictionary {task id: <task> XML element} of the tasks
+                      added or modified in the file
+        """
+        for tid in removed:
+            if self.datastore.has_task(tid):
+                self.datastore.request_task_deletion(tid)
+
+        for tid, node in nodes.items():
+            task = self.datastore.get_task(tid)
+            if task is None:
+                task = self.datastore.task_factory(tid)
                 task = taskxml.task_from_xml(task, node)
                 self.datastore.push_task(task)
+            else:
+                taskxml.update_task_from_xml(task, node)
+        return False
 
     def set_task(self, task):
         """
@@ -161,15 +320,34 @@ class Backend(GenericBackend):
 
         @param task: the task object to save
         """
+        self.set_tasks([task])
+
+    def set_tasks(self, tasks):
+        """ Saves several tasks, writing the file only once
+
+        @param tasks: the task objects to save
+        """
+        with self._file_lock:
+            modified = False
+            for task in tasks:
+                modified |= self._set_task_node(task)
+
+            # if the XML object has changed, we save it to file
+            if modified and self._parameters["path"] and self.doc:
+                cleanxml.savexml(self.get_path(), self.doc)
+                self._saved()
+
+    def _set_task_node(self, task):
+        """ Writes a task in the XML object. The file lock must be held.
+
+        @returns bool: True if the XML object changed
+        """
         tid = task.get_id()
         # We create an XML representation of the task
         t_xml = taskxml.task_to_xml(self.doc, task)
 
         # we find if the task exists in the XML treenode.
-        existing = None
-        for node in self.xmlproj.childNodes:
-            if node.nodeName == TASK_NODE and node.getAttribute("id") == tid:
-                existing = node
+        existing = self._task_nodes.get(tid)
 
         modified = False
         # We then replace the existing node
@@ -182,10 +360,8 @@ class Backend(GenericBackend):
         else:
             self.xmlproj.appendChild(t_xml)
             modified = True
-
-        # if the XML object has changed, we save it to file
-        if modified and self._parameters["path"] and self.doc:
-            cleanxml.savexml(self.get_path(), self.doc)
+        self._task_nodes[tid] = t_xml if modified else existing
+        return modified
 
     def remove_task(self, tid):
         """ This function is called from GTG core whenever a task must be
@@ -193,15 +369,31 @@ class Backend(GenericBackend):
 
         @param tid: the id of the task to delete
         """
-        modified = False
-        for node in self.xmlproj.childNodes:
-            if node.nodeName == TASK_NODE and node.getAttribute("id") == tid:
-                modified = True
-                self.xmlproj.removeChild(node)
+        self.remove_tasks([tid])
 
-        # We save the XML file only if it's necessary
-        if modified:
-            cleanxml.savexml(self.get_path(), self.doc, backup=True)
+    def remove_tasks(self, tids):
+        """ Removes several tasks, writing the file only once
+
+        @param tids: the ids of the tasks to delete
+        """
+        with self._file_lock:
+            removed = 0
+            for tid in tids:
+                node = self._task_nodes.pop(tid, None)
+                if node is not None:
+                    self.xmlproj.removeChild(node)
+                    removed += 1
+
+            # We save the XML file only if it's necessary
+            if removed:
+                cleanxml.savexml(self.get_path(), self.doc, backup=True)
+                self._saved()
+
+    def quit(self, disable=False):
+        """ Called when GTG quits or the backend is disabled """
+        self._watcher.stop()
+        super().quit(disable)
+        self._index.close()
 
     def used_backup(self):
         """ This functions return a boolean value telling if backup files
@@ -0,0 +1,162 @@
+# -----------------------------------------------------------------------------
+# Getting Things GNOME! - a personal organizer for the GNOME desktop
+# Copyright (c) 2008-2013 - Lionel Dricot & Bertrand Rousseau
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+
+"""
+Metrics about the changes a backend still has to write.
+
+Both the TaskSource, which collects the changes made in GTG core, and the
+GenericBackend, which applies them, hold pending work in queues. A
+QueueMetrics object follows each task from the moment one of its changes is
+queued until the backend has written it, so that a slow or stalled backend
+can be spotted before it loses data on quit.
+"""
+
+from collections import deque
+import threading
+import time
+
+# Time window (in seconds) over which rates and latencies are computed
+METRICS_WINDOW = 60
+
+# Minimum time (in seconds) between two reports of the same backend
+REPORT_INTERVAL = 1
+
+# Keys of the dictionary returned by QueueMetrics.get_snapshot()
+QUEUE_DEPTH = 'depth'
+OLDEST_PENDING_AGE = 'oldest_pending_age'
+SETS_PER_SECOND = 'sets_per_second'
+REMOVES_PER_SECOND = 'removes_per_second'
+SET_TASK_LATENCY = 'set_task_latency'
+
+
+class QueueMetrics():
+    """
+    Keeps track of the tasks waiting to be written by a backend and of the
+    operations it completed recently. It is updated from the setting
+    threads, so every method is thread-safe.
+    """
+
+    def __init__(self, window=METRICS_WINDOW, clock=time.monotonic):
+        """
+        @param window: time (in seconds) over which rates are computed
+        @param clock: function returning the current time, in seconds
+        """
+        self._window = window
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._started = clock()
+        self._last_report = None
+        # task id -> time of the oldest change not written yet
+        self._pending = {}
+        # (time, duration) of the recent set_task calls
+        self._sets = deque()
+        # time of the recent remove_task calls
+        self._removes = deque()
+
+    def task_queued(self, tid):
+        """
+        Records that a change of a task is waiting to be written. If the task
+        was already pending, the time of its oldest change is kept.
+
+        @param tid: the id of the task
+        """
+        with self._lock:
+            self._pending.setdefault(tid, self._clock())
+
+    def task_set(self, tid, duration):
+        """
+        Records that a task has been written by the backend
+
+        @param tid: the id of the task
+        @param duration: the time (in seconds) set_task took
+        """
+        with self._lock:
+            self._pending.pop(tid, None)
+            self._sets.append((self._clock(), duration))
+
+    def task_removed(self, tid):
+        """
+        Records that a task has been removed from the backend
+
+        @param tid: the id of the task
+        """
+        with self._lock:
+            self._pending.pop(tid, None)
+            self._removes.append(self._clock())
+
+    def task_dropped(self, tid):
+        """
+        Records that a pending task doesn't have to be written anymore (e.g.
+        it was deleted before being saved)
+
+        @param tid: the id of the task
+        """
+        with self._lock:
+            self._pending.pop(tid, None)
+
+    def should_report(self):
+        """
+        Tells if enough time has passed since the last report. Calling this
+        starts a new interval when it returns True.
+
+        @returns bool: True if the metrics should be reported now
+        """
+        now = self._clock()
+        with self._lock:
+            if self._last_report is not None and \
+                    now - self._last_report < REPORT_INTERVAL:
+                return False
+            self._last_report = now
+            return True
+
+    def get_snapshot(self):
+        """
+        Returns the current metrics
+
+        @returns dict: the depth of the queue, the age (in seconds) of the
+                       oldest pending change, the sets and removes per
+                       second and the average set_task latency (in seconds)
+                       over the last METRICS_WINDOW seconds
+        """
+        now = self._clock()
+        with self._lock:
+            horizon = now - self._window
+            while self._sets and self._sets[0][0] < horizon:
+                self._sets.popleft()
+            while self._removes and self._removes[0] < horizon:
+                self._removes.popleft()
+
+            if self._pending:
+                oldest = now - min(self._pending.values())
+            else:
+                oldest = 0.0
+            # Don't underestimate the rates of a backend started recently
+            span = max(min(self._window, now - self._started), 1)
+            if self._sets:
+                latency = sum(duration for _, duration in self._sets)
+                latency /= len(self._sets)
+            else:
+                latency = 0.0
+
+            return {
+                QUEUE_DEPTH: len(self._pending),
+                OLDEST_PENDING_AGE: oldest,
+                SETS_PER_SECOND: len(self._sets) / span,
+                REMOVES_PER_SECOND: len(self._removes) / span,
+                SET_TASK_LATENCY: latency,
+            }
@@ -79,6 +79,8 @@ class _BackendSignalsGObject(GObject.GObject):
     BACKEND_SYNC_STARTED = 'backend-sync-started'
     BACKEND_SYNC_ENDED = 'backend-sync-ended'
     INTERACTION_REQUESTED = 'user-interaction-requested'
+    # carries the queue metrics of a backend (see backend_metrics.py)
+    BACKEND_METRICS = 'backend-metrics'
 
     INTERACTION_CONFIRM = 'confirm'
     INTERACTION_TEXT = 'text'
@@ -92,6 +94,7 @@ class _BackendSignalsGObject(GObject.GObject):
                     BACKEND_SYNC_ENDED: signal_type_factory(str),
                     DEFAULT_BACKEND_LOADED: signal_type_factory(),
                     BACKEND_FAILED: signal_type_factory(str, str),
+                    BACKEND_METRICS: signal_type_factory(str, object),
                     INTERACTION_REQUESTED: signal_type_factory(str, str,
                                                                str, str)}
 
@@ -125,6 +128,10 @@ class _BackendSignalsGObject(GObject.GObject):
         GObject.idle_add(self.emit, self.BACKEND_FAILED, backend_id,
                          error_code)
 
+    def backend_metrics(self, backend_id, metrics):
+        GObject.idle_add(self.emit, self.BACKEND_METRICS, backend_id,
+                         metrics)
+
     def interaction_requested(self, backend_id, description,
                               interaction_type, callback_str):
         GObject.idle_add(self.emit, self.INTERACTION_REQUESTED,
@@ -27,8 +27,11 @@ import errno
 import os
 import pickle
 import threading
+import time
 
+from GTG.backends.backend_metrics import QueueMetrics
 from GTG.backends.backend_signals import BackendSignals
+from GTG.core import profiler
 from GTG.core.tag import ALLTASKS_TAG
 from GTG.core.dirs import SYNC_DATA_DIR
 from GTG.core.interruptible import _cancellation_point
@@ -124,6 +127,28 @@ class GenericBackend():
         """
         pass
 
+    def set_tasks(self, tasks):
+        """ Called from GTG core with the tasks modified since the last
+        writes. By default, it calls set_task() for each of them: backends
+        for which every write is expensive can override it to save them all
+        at once.
+
+        @param tasks: the task objects to save
+        """
+        for task in tasks:
+            self.set_task(task)
+
+    def remove_tasks(self, tids):
+        """ Called from GTG core with the tasks removed since the last
+        writes. By default, it calls remove_task() for each of them: backends
+        for which every write is expensive can override it to remove them
+        all at once.
+
+        @param tids: the ids of the tasks to delete
+        """
+        for tid in tids:
+            self.remove_task(tid)
+
     def this_is_the_first_run(self, xml):
         """
         Optional, and almost surely not needed.
@@ -297,6 +322,8 @@ class GenericBackend():
             lambda: self.please_quit)
         self.to_set = deque()
         self.to_remove = deque()
+        # what is waiting in to_set/to_remove (and in the TaskSource queues)
+        self.queue_metrics = QueueMetrics()
 
     def get_attached_tags(self):
         """
@@ -639,23 +666,38 @@ class GenericBackend():
                                     It's used when the backend quits, to finish
                                     syncing all pending tasks
         """
+        # Changes are applied in batches (e.g. when many tasks are tagged or
+        # purged), so that the backend can write them at once
+        to_set = []
         while not self.please_quit or bypass_quit_request:
             try:
                 task = self.to_set.pop()
             except IndexError:
                 break
-            tid = task.get_id()
-            if tid not in self.to_remove:
-                self.set_task(task)
-
+            if task.get_id() not in self.to_remove:
+                to_set.append(task)
+        if to_set:
+            start = time.perf_counter()
+            with profiler.timer('backend.set_task'):
+                self.set_tasks(to_set)
+            duration = (time.perf_counter() - start) / len(to_set)
+            for task in to_set:
+                self.queue_metrics.task_set(task.get_id(), duration)
+
+        to_remove = []
         while not self.please_quit or bypass_quit_request:
             try:
-                tid = self.to_remove.pop()
+                to_remove.append(self.to_remove.pop())
             except IndexError:
                 break
-            self.remove_task(tid)
+        if to_remove:
+            with profiler.timer('backend.remove_task'):
+                self.remove_tasks(to_remove)
+            for tid in to_remove:
+                self.queue_metrics.task_removed(tid)
         # we release the weak lock
         self.to_set_timer = None
+        self.report_queue_metrics(force=True)
 
     def queue_set_task(self, task):
         """ Save the task in the backend. In particular, it just enqueues the
@@ -667,7 +709,9 @@ class GenericBackend():
         tid = task.get_id()
         if task not in self.to_set and tid not in self.to_remove:
             self.to_set.appendleft(task)
+            self.queue_metrics.task_queued(tid)
             self.__try_launch_setting_thread()
+            self.report_queue_metrics()
 
     def queue_remove_task(self, tid):
         """
@@ -679,9 +723,31 @@ class GenericBackend():
         """
         if tid not in self.to_remove:
             self.to_remove.appendleft(tid)
+            self.queue_metrics.task_queued(tid)
             self.__try_launch_setting_thread()
+            self.report_queue_metrics()
             return None
 
+    def get_queue_metrics(self):
+        """
+        Returns the metrics of the changes waiting to be written by this
+        backend (see GTG.backends.backend_metrics)
+
+        @returns dict: the current queue metrics
+        """
+        return self.queue_metrics.get_snapshot()
+
+    def report_queue_metrics(self, force=False):
+        """
+        Emits the queue metrics through BackendSignals. Reports are
+        throttled, unless force is True.
+
+        @param force: if True, the metrics are reported right away
+        """
+        if self.queue_metrics.should_report() or force:
+            self._signal_manager.backend_metrics(self.get_id(),
+                                                 self.get_queue_metrics())
+
     def sync(self):
         """
         Helper method. Forces the backend to perform all the pending changes.
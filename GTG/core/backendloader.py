@@ -0,0 +1,123 @@
+# -----------------------------------------------------------------------------
+# Getting Things GNOME! - a personal organizer for the GNOME desktop
+# Copyright (c) 2008-2013 - Lionel Dricot & Bertrand Rousseau
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+
+"""
+Starts the backends in threads, once the backends they depend on are loaded
+"""
+
+import threading
+import time
+
+from GTG.core.logger import log
+
+
+class BackendLoader():
+    """
+    Runs the startup of the backends concurrently.
+
+    A backend can depend on other names: it is started only once all of them
+    are done. A name is done when the backend with that id has been loaded,
+    or when mark_done() has been called for it (e.g. for an event like "the
+    default backend has pushed its tasks").
+
+    Every backend is started in its own thread: start_get_tasks() may run a
+    whole network import, which must not hold back the other backends.
+
+    The time spent loading every backend is recorded.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Names which are done
+        self._done = set()
+        # Jobs waiting for their dependencies: [(name, function, depends_on)]
+        self._pending = []
+        # {name: seconds it took to load}
+        self._timings = {}
+
+    def load(self, name, function, depends_on=()):
+        """
+        Runs function in a new thread, as soon as its dependencies are done.
+        Nothing happens if a job with the same name is already waiting for
+        its dependencies.
+
+        @param name: the id of the backend
+        @param function: function without arguments that loads the backend
+        @param depends_on: names that must be done before loading
+        @returns bool: False if the job was already waiting
+        """
+        with self._lock:
+            if any(job[0] == name for job in self._pending):
+                return False
+            depends_on = set(depends_on)
+            if depends_on <= self._done:
+                self._start(name, function)
+            else:
+                self._pending.append((name, function, depends_on))
+            return True
+
+    def run(self, name, function):
+        """
+        Loads a backend in the calling thread, e.g. when the caller needs
+        its tasks right away. It is timed and marked done like the others.
+        """
+        self._execute(name, function)
+
+    def mark_done(self, name):
+        """ Marks a name as done, and starts the jobs waiting for it """
+        with self._lock:
+            self._done.add(name)
+            pending = self._pending
+            self._pending = []
+            for job in pending:
+                job_name, function, depends_on = job
+                if depends_on <= self._done:
+                    self._start(job_name, function)
+                else:
+                    self._pending.append(job)
+
+    def is_done(self, name):
+        """ Returns True if the name is done """
+        with self._lock:
+            return name in self._done
+
+    def get_timings(self):
+        """ Returns a dictionary {backend id: seconds it took to load} """
+        with self._lock:
+            return dict(self._timings)
+
+    def _start(self, name, function):
+        """ Starts a job. Must be called with self._lock held """
+        thread = threading.Thread(target=self._execute, args=(name, function),
+                                  name=f'BackendLoader-{name}')
+        # Like the threads of the backends, don't prevent GTG from quitting
+        thread.daemon = True
+        thread.start()
+
+    def _execute(self, name, function):
+        start = time.perf_counter()
+        try:
+            function()
+        except Exception as error:
+            log.exception('Error while loading backend %s: %s', name, error)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._timings[name] = elapsed
+            log.info('Backend %s loaded in %.3f seconds', name, elapsed)
+            self.mark_done(name)
@@ -23,6 +23,7 @@ import sys
 import re
 import datetime
 
+from GTG.core import profiler
 from GTG.core.logger import log
 
 # This is for the awful pretty xml things
@@ -201,6 +202,7 @@ def emptydoc(root):
 # write a XML doc to a file
 
 
+@profiler.timed('cleanxml.savexml')
 def savexml(zefile, doc, backup=False):
     tmpfile = zefile + '__'
     backup_name = _get_backup_name(zefile)
@@ -21,6 +21,7 @@ Classes responsible for handling user configuration
 """
 
 import configparser
+import json
 import os
 import re
 
@@ -184,6 +185,174 @@ class SectionConfig():
         self._save_function()
 
 
+class TaskConfigStore():
+    """ Compact store for per-task UI state (editor position, size...)
+
+    Records live in memory in a ConfigParser, one section per task, so that
+    SectionConfig can parse them as usual. On disk, the store is an
+    append-only log with one JSON line per record:
+
+     - [task_id, {option: value, ...}] stores the whole record of a task
+     - [task_id, null] forgets a task
+
+    Updating a task therefore appends a single line instead of rewriting the
+    whole file. The log is compacted when it is loaded and whenever stale
+    lines clearly outnumber live records.
+    """
+
+    # Compact only when there are at least this many stale lines...
+    COMPACT_MIN_STALE = 64
+    # ... and there are more stale lines than this factor times live records
+    COMPACT_RATIO = 1
+
+    def __init__(self, path, legacy_path=None):
+        """ Loads the store:
+
+         - path: path of the log file
+         - legacy_path: path of the old tasks.conf. It is imported only when
+                        the log doesn't exist yet.
+        """
+        self._path = path
+        self._records = configparser.ConfigParser(interpolation=None)
+        # Last written value of every record, to skip no-op updates
+        self._persisted = {}
+        self._stale = 0
+
+        if os.path.exists(path):
+            self._load()
+        elif legacy_path and os.path.exists(legacy_path):
+            self._import_legacy(legacy_path)
+
+        if self._stale > 0:
+            self.compact()
+
+    def _load(self):
+        with open(self._path, 'r', encoding='utf-8') as log_file:
+            lines = log_file.readlines()
+
+        for line in lines:
+            try:
+                task_id, record = self._parse_line(line)
+            except ValueError:
+                log.warning('Skipping invalid line in %s: %r',
+                            self._path, line)
+                self._stale += 1
+                continue
+
+            if task_id in self._persisted:
+                self._stale += 1
+
+            if record is None:
+                self._records.remove_section(task_id)
+                self._persisted.pop(task_id, None)
+                self._stale += 1
+            else:
+                self._records[task_id] = record
+                self._persisted[task_id] = record
+
+    @staticmethod
+    def _parse_line(line):
+        """ Returns the (task id, record) of a line of the log. The record
+        is None when the task configuration was purged.
+
+        @raises ValueError: if the line is not valid JSON or doesn't have
+                            the shape written by _dump_line
+        """
+        entry = json.loads(line)
+        if not isinstance(entry, list) or len(entry) != 2:
+            raise ValueError(f'Not a [task id, record] pair: {entry!r}')
+        task_id, record = entry
+        if not isinstance(task_id, str):
+            raise ValueError(f'Invalid task id: {task_id!r}')
+        if record is None:
+            return task_id, None
+        if not isinstance(record, dict):
+            raise ValueError(f'Invalid record: {record!r}')
+        return task_id, {str(k): str(v) for k, v in record.items()}
+
+    def _import_legacy(self, legacy_path):
+        """ Imports the non-empty sections of the old tasks.conf """
+        legacy = open_config_file(legacy_path)
+        for task_id in legacy.sections():
+            record = dict(legacy[task_id])
+            if record:
+                self._records[task_id] = record
+        self.compact()
+        log.info('Imported task configuration from %s', legacy_path)
+
+    def _append(self, lines):
+        dirname = os.path.dirname(self._path)
+        if dirname and not os.path.exists(dirname):
+            os.makedirs(dirname)
+        with open(self._path, 'a', encoding='utf-8') as log_file:
+            log_file.writelines(lines)
+
+    def _dump_line(self, task_id, record):
+        return json.dumps([task_id, record]) + '\n'
+
+    def get_section(self, task_id):
+        """ Returns the in-memory section for a task, creating it if needed """
+        if not self._records.has_section(task_id):
+            self._records.add_section(task_id)
+        return self._records[task_id]
+
+    def save(self, task_id):
+        """ Persists the record of a single task, if it has changed """
+        if not self._records.has_section(task_id):
+            return
+
+        record = dict(self._records[task_id])
+        if self._persisted.get(task_id, {}) == record:
+            return
+
+        if task_id in self._persisted:
+            self._stale += 1
+        self._persisted[task_id] = record
+        self._append([self._dump_line(task_id, record)])
+        self._maybe_compact()
+
+    def purge(self, task_ids):
+        """ Forgets the records of the given tasks """
+        lines = []
+        for task_id in task_ids:
+            if not self._records.has_section(task_id):
+                continue
+
+            self._records.remove_section(task_id)
+            if self._persisted.pop(task_id, None) is not None:
+                lines.append(self._dump_line(task_id, None))
+                # Both the old record and the tombstone are now stale
+                self._stale += 2
+
+        if lines:
+            self._append(lines)
+            self._maybe_compact()
+
+    def _maybe_compact(self):
+        if self._stale >= max(self.COMPACT_MIN_STALE,
+                              self.COMPACT_RATIO * len(self._persisted)):
+            self.compact()
+
+    def compact(self):
+        """ Rewrites the log with only one line per live record """
+        self._persisted = {}
+        lines = []
+        for task_id in self._records.sections():
+            record = dict(self._records[task_id])
+            if record:
+                self._persisted[task_id] = record
+                lines.append(self._dump_line(task_id, record))
+
+        dirname = os.path.dirname(self._path)
+        if dirname and not os.path.exists(dirname):
+            os.makedirs(dirname)
+        tmp_path = self._path + '__'
+        with open(tmp_path, 'w', encoding='utf-8') as log_file:
+            log_file.writelines(lines)
+        os.replace(tmp_path, self._path)
+        self._stale = 0
+
+
 class CoreConfig():
     """ Class holding configuration to all systems and tasks """
 
@@ -191,15 +360,13 @@ class CoreConfig():
         self._conf_path = os.path.join(CONFIG_DIR, 'gtg.conf')
         self._conf = open_config_file(self._conf_path)
 
-        self._task_conf_path = os.path.join(CONFIG_DIR, 'tasks.conf')
-        self._task_conf = open_config_file(self._task_conf_path)
+        self._task_conf = TaskConfigStore(
+            os.path.join(CONFIG_DIR, 'tasks.jsonl'),
+            legacy_path=os.path.join(CONFIG_DIR, 'tasks.conf'))
 
     def save_gtg_config(self):
         self._conf.write(open(self._conf_path, 'w'))
 
-    def save_task_config(self):
-        self._task_conf.write(open(self._task_conf_path, 'w'))
-
     def get_subconfig(self, name):
         """ Returns configuration object for special section of config """
         if name not in self._conf:
@@ -209,10 +376,12 @@ class CoreConfig():
             name, self._conf[name], defaults, self.save_gtg_config)
 
     def get_task_config(self, task_id):
-        if task_id not in self._task_conf:
-            self._task_conf.add_section(task_id)
         return SectionConfig(
             f'Task {task_id}',
-            self._task_conf[task_id],
+            self._task_conf.get_section(task_id),
             DEFAULTS['task'],
-            self.save_task_config)
+            lambda: self._task_conf.save(task_id))
+
+    def purge_task_config(self, task_ids):
+        """ Forgets the configuration of deleted tasks """
+        self._task_conf.purge(task_ids)
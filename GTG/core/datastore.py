@@ -22,23 +22,36 @@ Contains the Datastore object, which is the manager of all the active backends
 
 from collections import deque
 import threading
+import time
 import uuid
 
+from gi.repository import GLib
+
 from GTG.backends.backend_signals import BackendSignals
 from GTG.backends.generic_backend import GenericBackend
+from GTG.core.backendloader import BackendLoader
 from GTG.core.config import CoreConfig
+from GTG.core.dateindex import DateIndex
 from GTG.core import requester
 from GTG.core.dirs import PROJECTS_XMLFILE, TAGS_XMLFILE
 from GTG.core.search import parse_search_query, search_filter, InvalidQuery
 from GTG.core.tag import Tag, SEARCH_TAG
 from GTG.core.task import Task
+from GTG.core.titleindex import TitleIndex
 from GTG.core.treefactory import TreeFactory
-from GTG.core import cleanxml
+from GTG.core import cleanxml, profiler
 from GTG.core.borg import Borg
 from GTG.core.logger import log, log_debug_enabled
 
 TAG_XMLROOT = "tagstore"
 
+# Name the non-default backends depend on in the BackendLoader
+DEFAULT_BACKEND_LOADED = "default-backend-loaded"
+
+# Seconds the main loop may spend adding tasks to the tree in one go while
+# loading progressively. It bounds how long the first tasks take to show up.
+LOAD_CHUNK_BUDGET = 0.02
+
 
 class DataStore():
     """
@@ -49,15 +62,30 @@ class DataStore():
     Requester instead (which also sends signals as you issue commands).
     """
 
-    def __init__(self, global_conf=CoreConfig()):
+    def __init__(self, global_conf=CoreConfig(), progressive_load=False):
         """
         Initializes a DataStore object
+
+        @param progressive_load: if True, the default backend is read in a
+                                 separate thread and its tasks are added to
+                                 the tree in small chunks from the GLib main
+                                 loop, so that the UI can be shown first
         """
         # dictionary {backend_name_string: Backend instance}
         self.backends = {}
         self.treefactory = TreeFactory()
         self._tasks = self.treefactory.get_tasks_tree()
         self.requester = requester.Requester(self, global_conf)
+        # Closed tasks sorted by their closed date, for the autoclean
+        self._closed_index = DateIndex()
+        # All the tasks sorted by their last modification time
+        self._modified_index = DateIndex()
+        # All the tasks by case-folded title
+        self._title_index = TitleIndex()
+        main_view = self._tasks.get_main_view()
+        main_view.register_cllbck('node-added', self._index_task)
+        main_view.register_cllbck('node-modified', self._index_task)
+        main_view.register_cllbck('node-deleted', self._unindex_task)
         self.tagfile_loaded = False
         self._tagstore = self.treefactory.get_tags_tree(self.requester)
         self.load_tag_tree()
@@ -72,6 +100,20 @@ class DataStore():
         self.is_default_backend_loaded = False
         self._backend_signals.connect('default-backend-loaded',
                                       self._activate_non_default_backends)
+        # Starts the backends, the independent ones in parallel
+        self._backend_loader = BackendLoader()
+
+        # Tasks pushed by the default backend which are waiting to be added
+        # to the tree, when loading progressively. Active tasks go first, as
+        # they are the ones the workview shows.
+        self._progressive_load = progressive_load
+        self._queued_active = deque()
+        self._queued_others = deque()
+        self._queued_ids = set()
+        self._queue_lock = threading.Lock()
+        self._queue_scheduled = False
+        self._loading_source = None
+        self._loading_finished = False
         self.filtered_datastore = FilteredDataStore(self)
         self._backend_mutex = threading.Lock()
 
@@ -101,13 +143,60 @@ class DataStore():
         """
         return self._tasks
 
+    def get_closed_index(self):
+        """
+        Return the index of the closed tasks sorted by closed date
+
+        @returns GTG.core.dateindex.DateIndex: the index
+        """
+        return self._closed_index
+
+    def get_modified_index(self):
+        """
+        Return the index of the tasks sorted by last modification time
+
+        @returns GTG.core.dateindex.DateIndex: the index
+        """
+        return self._modified_index
+
+    def get_title_index(self):
+        """
+        Return the index of the tasks by case-folded title
+
+        @returns GTG.core.titleindex.TitleIndex: the index
+        """
+        return self._title_index
+
+    def _index_task(self, tid, path=None):
+        """ Updates the indexes and the memoized dates of a task added or
+        modified in the tree """
+        task = self.get_task(tid)
+        if task is None:
+            return
+        self._modified_index.update(tid, task.get_modified())
+        self._title_index.update(tid, task.get_title())
+        # The parent links may have been changed by the tree itself, e.g.
+        # when a task is dragged or a subtask deleted
+        task.invalidate_dates()
+        if task.get_status() == Task.STA_ACTIVE:
+            self._closed_index.remove(tid)
+        else:
+            self._closed_index.update(tid, task.get_closed_date().date())
+
+    def _unindex_task(self, tid, path=None):
+        """ Removes a task deleted from the tree from the indexes """
+        self._closed_index.remove(tid)
+        self._modified_index.remove(tid)
+        self._title_index.remove(tid)
+
     # Tags functions ##########################################################
     def _add_new_tag(self, name, tag, filter_func, parameters, parent_id=None):
         """ Add tag into a tree """
         if self._tagstore.has_node(name):
             raise IndexError(f'tag {name} was already in the datastore')
 
-        self._tasks.add_filter(name, filter_func, parameters=parameters)
+        self._tasks.add_filter(name, profiler.timed('filter.tag')(filter_func),
+                               parameters=parameters)
         self._tagstore.add_node(tag, parent_id=parent_id)
         tag.set_save_callback(self.save)
 
@@ -153,6 +242,77 @@ class DataStore():
         else:
             raise IndexError(f"There is no tag {name}")
 
+    def add_tag_to_tasks(self, tids, tagname):
+        """
+        Adds a tag to several tasks at once.
+
+        The tag is created if needed, and the tasks which already have it
+        are left untouched. All the tasks are tagged first. Then the tag is
+        notified once and each tagged task is synced once, so the backends
+        receive the tasks in one batch.
+
+        @param tids: the ids of the tasks to tag
+        @param tagname: the name of the tag, with its '@'
+        @returns int: the number of tasks which were tagged
+        """
+        tag = self.get_tag(tagname)
+        if tag is None:
+            tag = self.new_tag(tagname)
+
+        tagged = []
+        for tid in tids:
+            task = self.get_task(tid)
+            if task is not None and task.insert_tag(tagname):
+                tagged.append(task)
+
+        if tagged:
+            tag.modified()
+        for task in tagged:
+            task.sync()
+        return len(tagged)
+
+    def rewrite_tag(self, oldname, newname=None):
+        """
+        Renames a tag in all the tasks which have it, or removes it from them
+        if newname is None. The color and the icon of the tag are given to
+        the new tag.
+
+        All the tasks are rewritten first. Then each tag is notified once
+        and each task is synced once, so the backends receive the tasks in
+        one batch.
+
+        @returns int: the number of rewritten tasks
+        """
+        old_tag = self.get_tag(oldname)
+        if old_tag is None:
+            return 0
+
+        new_tag = None
+        if newname is not None:
+            new_tag = self.get_tag(newname)
+            if new_tag is None:
+                new_tag = self.new_tag(newname)
+            for attribute in ('color', 'icon'):
+                value = old_tag.get_attribute(attribute)
+                if value:
+                    new_tag.set_attribute(attribute, value)
+
+        rewritten = []
+        for task_id in old_tag.get_related_tasks():
+            task = self.get_task(task_id)
+            if task is not None and task.rewrite_tag(oldname, newname):
+                rewritten.append(task)
+
+        # The ViewCount of the old tag doesn't know yet that the tasks lost it
+        for task in rewritten:
+            old_tag.update_task(task.get_id())
+        old_tag.modified()
+        if new_tag is not None:
+            new_tag.modified()
+        for task in rewritten:
+            task.sync()
+        return len(rewritten)
+
     def rename_tag(self, oldname, newname):
         """ Give a tag a new name
 
@@ -170,24 +330,7 @@ class DataStore():
         tag = self.get_tag(oldname)
 
         if not tag.is_search_tag():
-            for task_id in tag.get_related_tasks():
-
-                # Store old tag attributes
-                color = tag.get_attribute("color")
-                icon = tag.get_attribute("icon")
-
-                my_task = self.get_task(task_id)
-                my_task.rename_tag(oldname, newname)
-
-                # Restore attributes on tag
-                new_tag = self.get_tag(newname)
-
-                if color:
-                    new_tag.set_attribute("color", color)
-
-                if icon:
-                    new_tag.set_attribute("icon", icon)
-
+            self.rewrite_tag(oldname, newname)
             return None
 
         query = tag.get_attribute("query")
@@ -346,18 +489,152 @@ class DataStore():
         @return bool: True if the task has been accepted
         """
 
-        def adding(task):
-            self._tasks.add_node(task)
-            task.set_loaded()
-            if self.is_default_backend_loaded:
-                task.sync()
+        queued = self._queue_tasks([task])
+        if queued is not None:
+            return queued == 1
         if self.has_task(task.get_id()):
             return False
         else:
             # Thread protection
-            adding(task)
+            self._add_task(task)
             return True
 
+    def push_tasks(self, tasks):
+        """
+        Adds many task objects to the task tree. It is cheaper than calling
+        push_task() for each of them: the tasks are marked as loaded and
+        synced only once they all are in the tree, when the relationships
+        between them are already known.
+
+        @param tasks: An iterable of task objects
+        @return int: the number of tasks which have been accepted
+        """
+        queued = self._queue_tasks(tasks)
+        if queued is not None:
+            return queued
+
+        added = []
+        added_ids = set()
+        for task in tasks:
+            tid = task.get_id()
+            if tid in added_ids or self.has_task(tid):
+                continue
+            added_ids.add(tid)
+            self._tasks.add_node(task)
+            added.append(task)
+        profiler.count('datastore.tasks_added', len(added))
+
+        for task in added:
+            task.set_loaded()
+        if self.is_default_backend_loaded:
+            for task in added:
+                task.sync()
+        return len(added)
+
+    def _add_task(self, task):
+        """ Adds a task to the tree and marks it as loaded """
+        profiler.count('datastore.tasks_added')
+        self._tasks.add_node(task)
+        task.set_loaded()
+        if self.is_default_backend_loaded:
+            task.sync()
+
+    # Progressive loading #####################################################
+    def _queue_tasks(self, tasks):
+        """
+        Queues tasks pushed by the default backend while it is loaded
+        progressively. They are added to the tree from the main loop.
+
+        The loading state is checked under the same lock the main loop
+        holds when it finishes loading, so that no task is queued after
+        the queue has been drained for the last time.
+
+        @param tasks: An iterable of task objects
+        @return int: the number of tasks which have been accepted, or None
+                     if no backend is being loaded: the caller must add them
+                     to the tree itself
+        """
+        accepted = 0
+        with self._queue_lock:
+            if self._loading_source is None:
+                return None
+            for task in tasks:
+                tid = task.get_id()
+                if tid in self._queued_ids or self.has_task(tid):
+                    continue
+                self._queued_ids.add(tid)
+                if task.get_status() == Task.STA_ACTIVE:
+                    self._queued_active.append(task)
+                else:
+                    self._queued_others.append(task)
+                accepted += 1
+            if accepted:
+                self._schedule_queued_tasks()
+        return accepted
+
+    def _schedule_queued_tasks(self):
+        """ Must be called with self._queue_lock held """
+        if not self._queue_scheduled:
+            self._queue_scheduled = True
+            GLib.idle_add(self._add_queued_tasks,
+                          priority=GLib.PRIORITY_DEFAULT_IDLE)
+
+    def _add_queued_tasks(self):
+        """
+        Idle callback adding queued tasks to the tree for at most
+        LOAD_CHUNK_BUDGET seconds, so that the UI is redrawn in between.
+
+        @return bool: True if it must be called again
+        """
+        deadline = time.perf_counter() + LOAD_CHUNK_BUDGET
+        while not self.please_quit:
+            with self._queue_lock:
+                if self._queued_active:
+                    task = self._queued_active.popleft()
+                elif self._queued_others:
+                    task = self._queued_others.popleft()
+                else:
+                    task = None
+            if task is None:
+                break
+            self._add_task(task)
+            if time.perf_counter() > deadline:
+                return True
+
+        with self._queue_lock:
+            if not self.please_quit and \
+                    (self._queued_active or self._queued_others):
+                # Queued after the loop above ran out of tasks
+                return True
+            self._queue_scheduled = False
+            self._queued_ids.clear()
+            source = self._loading_source
+            finished = source is not None and self._loading_finished
+            if finished:
+                self._loading_source = None
+        if finished:
+            source.tasks_loaded()
+        return False
+
+    def _progressive_backend_startup(self, source):
+        """
+        Reads the tasks of the default backend in the calling thread. They
+        are queued by push_tasks() and added to the tree from the main loop;
+        the signals of the backend are connected once they all are in.
+
+        @param source: the TaskSource of the default backend
+        """
+        with self._queue_lock:
+            self._loading_source = source
+            self._loading_finished = False
+        try:
+            source.initialize(connect_signals=False)
+            source.backend.start_get_tasks()
+        finally:
+            with self._queue_lock:
+                self._loading_finished = True
+                self._schedule_queued_tasks()
+
     ##########################################################################
     # Backends functions
     ##########################################################################
@@ -423,13 +700,20 @@ class DataStore():
             if GenericBackend.KEY_DEFAULT_BACKEND not in backend_dic:
                 source.set_parameter(GenericBackend.KEY_DEFAULT_BACKEND, True)
             # if it's enabled, we initialize it
-            if source.is_enabled() and \
-                    (self.is_default_backend_loaded or source.is_default()):
-                source.initialize(connect_signals=False)
-                # Filling the backend
-                # Doing this at start is more efficient than
-                # after the GUI is launched
-                source.start_get_tasks()
+            if source.is_enabled():
+                if source.is_default() and self._progressive_load:
+                    self._backend_loader.load(
+                        source.get_id(),
+                        lambda: self._progressive_backend_startup(source))
+                elif source.is_default():
+                    # Filling the backend
+                    # Doing this at start is more efficient than
+                    # after the GUI is launched
+                    self._backend_loader.run(
+                        source.get_id(),
+                        lambda: self._default_backend_startup(source))
+                else:
+                    self._backend_startup(source)
             return source
         else:
             log.error("Tried to register a backend without a  pid")
@@ -447,31 +731,51 @@ class DataStore():
             return
 
         self.is_default_backend_loaded = True
-        for backend in self.backends.values():
-            if backend.is_enabled() and not backend.is_default():
-                self._backend_startup(backend)
+        self._backend_loader.mark_done(DEFAULT_BACKEND_LOADED)
+
+    @staticmethod
+    def _default_backend_startup(backend):
+        """
+        Starts the default backend: its tasks are loaded before the ones of
+        the other backends.
+
+        @param backend: the backend object
+        """
+        backend.initialize(connect_signals=False)
+        backend.start_get_tasks()
 
     def _backend_startup(self, backend):
         """
-        Helper function to launch a thread that starts a backend.
+        Queues the start of a non-default backend. It is run by the
+        BackendLoader once the default backend has loaded its tasks, unless
+        it has been disabled or removed in the meantime.
 
         @param backend: the backend object
         """
 
-        def __backend_startup(self, backend):
+        def __backend_startup():
             """
             Helper function to start a backend
-
-            @param backend: the backend object
             """
+            if not backend.is_enabled() or \
+                    self.backends.get(backend.get_id()) is not backend:
+                log.debug("Not starting backend %s: disabled or removed",
+                          backend.get_id())
+                return
             backend.initialize()
             backend.start_get_tasks()
             self.flush_all_tasks(backend.get_id())
 
-        thread = threading.Thread(target=__backend_startup,
-                                  args=(self, backend))
-        thread.setDaemon(True)
-        thread.start()
+        self._backend_loader.load(backend.get_id(), __backend_startup,
+                                  depends_on=[DEFAULT_BACKEND_LOADED])
+
+    def get_backend_load_times(self):
+        """
+        Returns how long the backends took to start.
+
+        @returns: a dictionary {backend id: seconds}
+        """
+        return self._backend_loader.get_timings()
 
     def set_backend_enabled(self, backend_id, state):
         """
@@ -496,12 +800,9 @@ class DataStore():
                 threading.Thread(target=backend.quit,
                                  kwargs={'disable': True}).start()
             elif current_state is False and state is True:
-                if self.is_default_backend_loaded is True:
-                    self._backend_startup(backend)
-                else:
-                    # will be activated afterwards
-                    backend.set_parameter(GenericBackend.KEY_ENABLED,
-                                          True)
+                # it may only be activated once the default backend is loaded
+                backend.set_parameter(GenericBackend.KEY_ENABLED, True)
+                self._backend_startup(backend)
 
     def remove_backend(self, backend_id):
         """
@@ -556,6 +857,7 @@ class DataStore():
         t.start()
         self.backends[backend_id].start_get_tasks()
 
+    @profiler.phase('save')
     def save(self, quit=False):
         """
         Saves the backends parameters.
@@ -651,6 +953,11 @@ class TaskSource():
         """ Loads all task from the backend and connects its signals
         afterwards. """
         self.backend.start_get_tasks()
+        self.tasks_loaded()
+
+    def tasks_loaded(self):
+        """ Connects the signals once the tasks of the backend are in the
+        tree, so that loading them doesn't save them again """
         self._connect_signals()
         if self.backend.is_default():
             BackendSignals().default_backend_loaded()
@@ -708,6 +1015,7 @@ class TaskSource():
         if self.should_task_id_be_stored(tid):
             if tid not in self.to_set and tid not in self.to_remove:
                 self.to_set.appendleft(tid)
+                self.backend.queue_metrics.task_queued(tid)
                 self.__try_launch_setting_thread()
         else:
             self.queue_remove_task(tid, path)
@@ -736,6 +1044,8 @@ class TaskSource():
                     self.req.has_task(tid):
                 task = self.req.get_task(tid)
                 self.backend.queue_set_task(task)
+            elif tid not in self.to_remove:
+                self.backend.queue_metrics.task_dropped(tid)
         while not self.please_quit or bypass_please_quit:
             try:
                 tid = self.to_remove.pop()
@@ -754,6 +1064,7 @@ class TaskSource():
         """
         if tid not in self.to_remove:
             self.to_remove.appendleft(tid)
+            self.backend.queue_metrics.task_queued(tid)
             self.__try_launch_setting_thread()
 
     def __try_launch_setting_thread(self):
@@ -863,6 +1174,7 @@ class FilteredDataStore(Borg):
     def __getattr__(self, attr):
         if attr in ['task_factory',
                     'push_task',
+                    'push_tasks',
                     'get_task',
                     'has_task',
                     'get_all_tasks',
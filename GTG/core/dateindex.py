@@ -0,0 +1,106 @@
+# -----------------------------------------------------------------------------
+# Getting Things GNOME! - a personal organizer for the GNOME desktop
+# Copyright (c) 2008-2013 - Lionel Dricot & Bertrand Rousseau
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+
+"""
+Index of the tasks sorted by a date, to find the tasks in a range of dates
+without looking at all of them.
+"""
+
+import bisect
+import threading
+
+
+class DateIndex():
+    """
+    Keeps task ids sorted by a value, usually a date. Values of the different
+    tasks must be comparable. All the methods are thread-safe.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # sorted list of (value, task id)
+        self._entries = []
+        # task id -> value
+        self._values = {}
+
+    def update(self, tid, value):
+        """
+        Indexes a task under a new value
+
+        @param tid: the id of the task
+        @param value: the value of the task, None to remove it from the index
+        """
+        with self._lock:
+            old_value = self._values.get(tid)
+            if old_value is not None:
+                if old_value == value:
+                    return
+                self._remove(tid, old_value)
+            if value is not None:
+                self._values[tid] = value
+                bisect.insort(self._entries, (value, tid))
+
+    def remove(self, tid):
+        """
+        Removes a task from the index, if it is in it
+
+        @param tid: the id of the task
+        """
+        with self._lock:
+            value = self._values.get(tid)
+            if value is not None:
+                self._remove(tid, value)
+
+    def _remove(self, tid, value):
+        """ Removes an entry. The lock must be held. """
+        del self._values[tid]
+        position = bisect.bisect_left(self._entries, (value, tid))
+        del self._entries[position]
+
+    def get(self, tid):
+        """ Returns the value a task is indexed under, or None """
+        with self._lock:
+            return self._values.get(tid)
+
+    def get_range(self, start=None, end=None):
+        """
+        Returns the ids of the tasks whose value is in [start, end), sorted
+        by value.
+
+        @param start: the lowest value included, None for no lower bound
+        @param end: the first value excluded, None for no upper bound
+        @returns list: the task ids
+        """
+        with self._lock:
+            if start is None:
+                low = 0
+            else:
+                low = bisect.bisect_left(self._entries, (start,))
+            if end is None:
+                high = len(self._entries)
+            else:
+                high = bisect.bisect_left(self._entries, (end,))
+            return [tid for _, tid in self._entries[low:high]]
+
+    def __contains__(self, tid):
+        with self._lock:
+            return tid in self._values
+
+    def __len__(self):
+        with self._lock:
+            return len(self._values)
@@ -0,0 +1,159 @@
+# -----------------------------------------------------------------------------
+# Getting Things GNOME! - a personal organizer for the GNOME desktop
+# Copyright (c) 2008-2013 - Lionel Dricot & Bertrand Rousseau
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+
+"""
+Watches a file for modifications done by other programs (sync tools, git...)
+"""
+
+import os
+import threading
+
+from gi.repository import Gio, GLib
+
+from GTG.core.logger import log
+
+
+class FileWatcher():
+    """
+    Calls a function when a file changes on disk.
+
+    Changes are reported by a Gio.FileMonitor (inotify on Linux). A slow
+    polling of the file status catches what the monitor misses, e.g. on
+    network filesystems or when no monitor is available.
+
+    Events are coalesced: the callback runs in a separate thread once the
+    file has been quiet for a short delay, and never runs twice at the same
+    time.
+    """
+
+    # Seconds between two checks of the file status
+    POLL_PERIOD = 10
+    # Seconds to wait after an event, so that a write is complete
+    SETTLE_DELAY = 0.5
+
+    def __init__(self, path, callback):
+        """
+        @param path: the file to watch
+        @param callback: function without arguments to call on changes
+        """
+        self.path = path
+        self.callback = callback
+        self._last_stat = self._get_stat()
+        self._monitor = None
+        self._monitor_handle = None
+        self._poll_timer = None
+        self._check_timer = None
+        self._timer_lock = threading.Lock()
+        self._callback_lock = threading.Lock()
+        self._running = False
+
+    def _get_stat(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+
+    def start(self):
+        """ Starts watching the file """
+        if self._running:
+            return
+        self._running = True
+        self._last_stat = self._get_stat()
+
+        try:
+            self._monitor = Gio.File.new_for_path(self.path).monitor_file(
+                Gio.FileMonitorFlags.WATCH_MOVES, None)
+            self._monitor_handle = self._monitor.connect(
+                'changed', self._on_monitor_event)
+        except GLib.Error as error:
+            log.warning('Cannot monitor %s, only polling it: %s',
+                        self.path, error)
+            self._monitor = None
+
+        self._schedule_poll()
+
+    def stop(self):
+        """ Stops watching the file """
+        self._running = False
+        if self._monitor is not None:
+            self._monitor.disconnect(self._monitor_handle)
+            self._monitor.cancel()
+            self._monitor = None
+
+        with self._timer_lock:
+            for timer in (self._poll_timer, self._check_timer):
+                if timer is not None:
+                    timer.cancel()
+            self._poll_timer = None
+            self._check_timer = None
+
+    def _on_monitor_event(self, monitor, gfile, other_file, event_type):
+        if event_type in (Gio.FileMonitorEvent.CHANGES_DONE_HINT,
+                          Gio.FileMonitorEvent.CREATED,
+                          Gio.FileMonitorEvent.DELETED,
+                          Gio.FileMonitorEvent.MOVED_IN,
+                          Gio.FileMonitorEvent.RENAMED):
+            self.check_soon()
+
+    def check_soon(self):
+        """ Checks the file after a short delay. Several calls within the
+        delay result in a single check. """
+        with self._timer_lock:
+            if not self._running or self._check_timer is not None:
+                return
+            self._check_timer = threading.Timer(self.SETTLE_DELAY,
+                                                self._delayed_check)
+            self._check_timer.daemon = True
+            self._check_timer.start()
+
+    def _delayed_check(self):
+        with self._timer_lock:
+            self._check_timer = None
+        self.check()
+
+    def _schedule_poll(self):
+        with self._timer_lock:
+            if not self._running:
+                return
+            self._poll_timer = threading.Timer(self.POLL_PERIOD, self._poll)
+            self._poll_timer.daemon = True
+            self._poll_timer.start()
+
+    def _poll(self):
+        self.check()
+        self._schedule_poll()
+
+    def check(self):
+        """ Calls the callback if the file status changed since last time """
+        with self._callback_lock:
+            stat = self._get_stat()
+            if stat is None or stat == self._last_stat:
+                return
+            self._last_stat = stat
+            try:
+                self.callback()
+            except Exception as error:
+                log.exception('Error while reloading %s: %s',
+                              self.path, error)
+
+    def acknowledge(self):
+        """ Tells the watcher that the current version of the file is known,
+        e.g. because we have just written it ourselves """
+        # No lock: the callback may be waiting for the caller to finish
+        self._last_stat = self._get_stat()
@@ -0,0 +1,234 @@
+# -----------------------------------------------------------------------------
+# Getting Things GNOME! - a personal organizer for the GNOME desktop
+# Copyright (c) 2008-2013 - Lionel Dricot & Bertrand Rousseau
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+
+"""
+Instrumentation of GTG: timers and counters around the hot paths, and
+optional cProfile captures of named phases (startup, search, save...).
+
+It is disabled unless the GTG_PROFILE environment variable is set, or GTG is
+started with --profile or --profile-phases:
+
+  GTG_PROFILE=1 or --profile                 timers and counters
+  GTG_PROFILE=cprofile or --profile-phases   and a cProfile capture per phase
+
+When disabled, an instrumented function costs a single test of a flag.
+
+Use it like this::
+
+  from GTG.core import profiler
+
+  @profiler.timed('task.sync')
+  def sync(self):
+      ...
+
+  with profiler.phase('search'):
+      ...
+
+Stats are dumped as JSON (and .prof files for the phases, readable with
+pstats or snakeviz) with dump(), which GTG calls when it receives SIGUSR1
+and when it quits.
+"""
+
+from contextlib import contextmanager
+import cProfile
+import functools
+import json
+import os
+import threading
+import time
+
+from GTG.core.dirs import SYNC_CACHE_DIR
+from GTG.core.logger import log
+
+ENV_VARIABLE = 'GTG_PROFILE'
+MODE_CPROFILE = 'cprofile'
+
+# Where the stats are dumped by default
+PROFILE_DIR = os.path.join(SYNC_CACHE_DIR, 'profile')
+
+_enabled = False
+_capture_phases = False
+_lock = threading.Lock()
+# {name: [count, total seconds, max seconds]}
+_timers = {}
+# {name: count}
+_counters = {}
+# {phase name: cProfile.Profile}
+_profiles = {}
+# {phase name: start time} of the running phases
+_running_phases = {}
+
+
+def enable(mode='1'):
+    """ Turns the instrumentation on
+
+    @param mode: MODE_CPROFILE to also capture the phases with cProfile
+    """
+    global _enabled, _capture_phases
+    _enabled = True
+    _capture_phases = mode == MODE_CPROFILE
+    log.info('Profiling enabled%s',
+             ' with cProfile captures' if _capture_phases else '')
+
+
+def is_enabled():
+    return _enabled
+
+
+def reset():
+    """ Forgets all the collected stats """
+    with _lock:
+        _timers.clear()
+        _counters.clear()
+        _profiles.clear()
+
+
+def add_time(name, seconds):
+    """ Records a duration for the timer `name` """
+    with _lock:
+        timer = _timers.get(name)
+        if timer is None:
+            _timers[name] = [1, seconds, seconds]
+        else:
+            timer[0] += 1
+            timer[1] += seconds
+            if seconds > timer[2]:
+                timer[2] = seconds
+
+
+def count(name, value=1):
+    """ Increments the counter `name` """
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+@contextmanager
+def timer(name):
+    """ Times the block it wraps """
+    if not _enabled:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_time(name, time.perf_counter() - start)
+
+
+def timed(name):
+    """ Decorator timing every call of a function """
+
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return function(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                add_time(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def start_phase(name):
+    """ Starts a phase which ends with stop_phase(). Phases are timed, and
+    captured by cProfile in the calling thread in MODE_CPROFILE. """
+    if not _enabled:
+        return
+    with _lock:
+        if name in _running_phases:
+            return
+        _running_phases[name] = time.perf_counter()
+        if _capture_phases:
+            profile = _profiles.get(name)
+            if profile is None:
+                profile = _profiles[name] = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # Another profiler is already running in this thread
+                log.debug('Cannot capture phase %s with cProfile', name)
+
+    log.debug('Phase %s started', name)
+
+
+def stop_phase(name):
+    """ Ends a phase started with start_phase() """
+    if not _enabled:
+        return
+    with _lock:
+        start = _running_phases.pop(name, None)
+        if start is None:
+            return
+        profile = _profiles.get(name)
+        if profile is not None:
+            profile.disable()
+    add_time(f'phase.{name}', time.perf_counter() - start)
+    log.debug('Phase %s ended', name)
+
+
+@contextmanager
+def phase(name):
+    """ Runs the block it wraps as a phase. Works as a decorator too. """
+    start_phase(name)
+    try:
+        yield
+    finally:
+        stop_phase(name)
+
+
+def get_stats():
+    """ Returns the collected stats as a dictionary """
+    with _lock:
+        timers = {name: {'count': timer[0],
+                         'total': timer[1],
+                         'mean': timer[1] / timer[0],
+                         'max': timer[2]}
+                  for name, timer in _timers.items()}
+        return {'timers': timers, 'counters': dict(_counters)}
+
+
+def dump(directory=PROFILE_DIR):
+    """ Writes the stats in a new JSON file, and the cProfile captures of
+    the phases next to it
+
+    @returns: the path of the JSON file
+    """
+    os.makedirs(directory, exist_ok=True)
+    prefix = os.path.join(directory, time.strftime('gtg-%Y%m%d-%H%M%S'))
+    path = prefix + '.json'
+    with open(path, 'w') as stats_file:
+        json.dump(get_stats(), stats_file, indent=2, sort_keys=True)
+
+    with _lock:
+        # Dumping a profile disables it: running phases are left out
+        profiles = {name: profile for name, profile in _profiles.items()
+                    if name not in _running_phases}
+    for name, profile in profiles.items():
+        profile.dump_stats(f'{prefix}-{name}.prof')
+
+    log.info('Profiling stats written to %s', path)
+    return path
+
+
+if os.environ.get(ENV_VARIABLE):
+    enable(os.environ[ENV_VARIABLE])
@@ -94,6 +94,10 @@ class Requester(GObject.GObject):
         return self.__basetree.remove_filter(filter_name)
 
     # Tasks ##########################
+    def is_default_backend_loaded(self):
+        """Are all the tasks of the default backend in the tree?"""
+        return self.ds.is_default_backend_loaded
+
     def has_task(self, tid):
         """Does the task 'tid' exist?"""
         return self.ds.has_task(tid)
@@ -140,23 +144,95 @@ class Requester(GObject.GObject):
         """
         # send the signal before actually deleting the task !
         log.debug(f"deleting task {tid}")
-        return self.__basetree.del_node(tid, recursive=recursive)
+        deleted = self._get_subtree_ids(tid) if recursive else [tid]
+        result = self.__basetree.del_node(tid, recursive=recursive)
+        self._config.purge_task_config(deleted)
+        return result
+
+    def delete_tasks(self, tids):
+        """Delete several tasks, with all their children, at once.
+
+        The configuration of the deleted tasks is purged once for all of them
+        and the backends receive all the deletions in the same batch.
+
+        @param tids: the ids of the tasks to delete
+        @returns int: the number of deleted tasks, children included
+        """
+        deleted = []
+        seen = set()
+        for tid in tids:
+            if tid in seen or not self.has_task(tid):
+                continue
+            subtree = self._get_subtree_ids(tid)
+            seen.update(subtree)
+            deleted.extend(subtree)
+            self.__basetree.del_node(tid, recursive=True)
+        log.debug(f"deleted {len(deleted)} tasks")
+        self._config.purge_task_config(deleted)
+        return len(deleted)
+
+    def get_tasks_closed_before(self, date):
+        """Returns the ids of the closed tasks whose closed date is before
+        date, the oldest first. It is a range lookup in an index.
+
+        @param date: a datetime.date, excluded
+        """
+        return self.ds.get_closed_index().get_range(end=date)
+
+    def get_tasks_modified_before(self, time, since=None):
+        """Returns the ids of the tasks last modified before time, the
+        oldest first. It is a range lookup in an index.
+
+        @param time: a datetime, excluded
+        @param since: if given, only the tasks modified at or after this
+                      datetime are returned
+        """
+        return self.ds.get_modified_index().get_range(start=since, end=time)
+
+    def add_tag_to_tasks(self, tids, tagname):
+        """Adds a tag to several tasks at once.
+
+        The tag is created once, the tasks already tagged are left untouched,
+        the tag is notified once and each task is synced once, so that the
+        backends receive all the modified tasks in the same batch.
+
+        @param tids: the ids of the tasks to tag
+        @param tagname: the name of the tag, with its '@'
+        @returns int: the number of tasks which were tagged
+        """
+        return self.ds.add_tag_to_tasks(tids, tagname)
+
+    def _get_subtree_ids(self, tid):
+        """ Returns the ids of the task tid and of all its descendants """
+        subtree = []
+        seen = set()
+        to_visit = [tid]
+        while to_visit:
+            node_id = to_visit.pop()
+            if node_id in seen or not self.has_task(node_id):
+                continue
+            seen.add(node_id)
+            subtree.append(node_id)
+            to_visit.extend(self.get_task(node_id).get_children())
+        return subtree
 
     def get_task_id(self, task_title):
         """ Heuristic which convert task_title to a task_id
 
-        Return a first task which has similar title """
-
-        task_title = task_title.lower()
-        tasks = self.get_tasks_tree('active', False).get_all_nodes()
-        tasktree = self.get_main_view()
-        for task_id in tasks:
-            task = tasktree.get_node(task_id)
-            if task_title == task.get_title().lower():
+        Return a first active task which has similar title, looked up in
+        the title index """
+        for task_id in self.ds.get_title_index().get_exact(task_title):
+            task = self.get_task(task_id)
+            if task is not None and task.get_status() == task.STA_ACTIVE:
                 return task_id
 
         return None
 
+    def get_task_ids_by_title_prefix(self, prefix):
+        """ Returns the ids of the tasks whose title starts with prefix,
+        ignoring the case, sorted by title """
+        return self.ds.get_title_index().get_prefix(prefix)
+
     # Tags ##########################
     def get_tag_tree(self):
         return self.ds.get_tagstore().get_viewtree(name='activetags')
@@ -235,11 +311,11 @@ class Requester(GObject.GObject):
         return self.ds.get_tagstore().get_main_view().get_all_nodes()
 
     def delete_tag(self, tagname):
-        my_tag = self.get_tag(tagname)
-        for task_id in my_tag.get_related_tasks():
-            my_task = self.get_task(task_id)
-            my_task.remove_tag(tagname)
-            my_task.sync()
+        """Removes a tag from all the tasks which have it, in one batch.
+
+        @returns int: the number of tasks which had the tag
+        """
+        return self.ds.rewrite_tag(tagname)
 
     # Backends #######################
     def get_all_backends(self, disabled=False):
@@ -78,6 +78,7 @@ For more information see unittests:
 import re
 
 from gettext import gettext as _
+from GTG.core import profiler
 from GTG.core.dates import Date
 
 # Generate keywords and their possible translations
@@ -232,6 +233,7 @@ def parse_search_query(query):
     return {'q': commands}
 
 
+@profiler.timed('search_filter')
 def search_filter(task, parameters=None):
     """ Check if task satisfies all search parameters """
 
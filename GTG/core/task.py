@@ -19,7 +19,8 @@
 """
 task.py contains the Task class which represents (guess what) a task
 """
-from datetime import datetime
+from collections import deque
+from datetime import date, datetime
 import html
 import re
 import uuid
@@ -27,6 +28,7 @@ import xml.dom.minidom
 import xml.sax.saxutils as saxutils
 
 from gettext import gettext as _
+from GTG.core import profiler
 from GTG.core.dates import Date
 from GTG.core.logger import log
 from GTG.core.tag import extract_tags_from_text
@@ -50,6 +52,7 @@ class Task(TreeNode):
         self.tid = str(task_id)
         self.set_uuid(uuid.uuid4())
         self.remote_ids = {}
+        self._content_loader = None
         self.content = ""
         self.title = _("My new task")
         # available status are: Active - Done - Dismiss - Note
@@ -72,6 +75,10 @@ class Task(TreeNode):
 #        if self.loaded:
 #            self.req._task_loaded(self.tid)
         self.attributes = {}
+        # Memoized get_urgent_date() and get_due_date_constraint(), as
+        # (day, value): fuzzy dates compare differently on another day
+        self._urgent_date = None
+        self._due_date_constraint = None
         self._modified_update()
 
     def get_added_date(self):
@@ -212,47 +219,91 @@ class Task(TreeNode):
             self.set_start_date(defer_date)
 
     def set_status(self, status, donedate=None):
+        """Sets the status of the task.
+
+        Closing a task closes its active subtasks too, reopening a task
+        reopens its closed parents. The affected tasks are collected first,
+        then their statuses and closed dates are set, and each of them is
+        synced once.
+
+        @param status: one of STA_ACTIVE, STA_DONE and STA_DISMISSED
+        @param donedate: the closed date when closing, today by default
+        """
+        if not status:
+            self.can_be_deleted = False
+            self.sync()
+            return
+
+        affected = self._get_status_cascade(status)
+        for task in affected:
+            task._apply_status(status, donedate)
+        for task in affected:
+            task.sync()
+
+    def _get_status_cascade(self, status):
+        """Returns the task and the relatives whose status changes with it,
+        before changing anything.
+
+        If the task is closed, its active subtasks are closed too, and so
+        on: the subtasks which are already closed are left alone, with
+        their own subtasks. If a closed task is reopened, its closed
+        parents are reopened, and so on. We dont mark the children as
+        Active because they might be already completed after all.
+        """
+        affected = [self]
+        # No need to update children or whatever if the task is not loaded
+        if not self.is_loaded():
+            return affected
+
+        seen = {self.get_id()}
+        to_visit = [self]
+        if status in [self.STA_DONE, self.STA_DISMISSED]:
+            while to_visit:
+                task = to_visit.pop(0)
+                for child in task.get_subtasks():
+                    if child.get_id() in seen or \
+                            child.get_status() not in [self.STA_ACTIVE]:
+                        continue
+                    seen.add(child.get_id())
+                    affected.append(child)
+                    if child.is_loaded():
+                        to_visit.append(child)
+        # If we mark a task as Active and that some parent are not
+        # Active, we restore the parent too: it has no sense to have an
+        # active subtask of a done parent.
+        # (old_status check is necessary to avoid false positive a start)
+        elif status in [self.STA_ACTIVE] and \
+                self.status in [self.STA_DONE, self.STA_DISMISSED]:
+            while to_visit:
+                task = to_visit.pop(0)
+                for p_tid in task.get_parents():
+                    par = self.req.get_task(p_tid)
+                    if par is None or p_tid in seen:
+                        continue
+                    if par.is_loaded() and par.get_status() in \
+                            [self.STA_DONE, self.STA_DISMISSED]:
+                        seen.add(p_tid)
+                        affected.append(par)
+                        to_visit.append(par)
+        return affected
+
+    def _apply_status(self, status, donedate=None):
+        """Sets the status and the closed date of the task only, without
+        syncing it"""
         old_status = self.status
         self.can_be_deleted = False
-        # No need to update children or whatever if the task is not loaded
-        if status and self.is_loaded():
-            # we first modify the status of the children
-            # If Done, we set the done date
-            if status in [self.STA_DONE, self.STA_DISMISSED]:
-                for c in self.get_subtasks():
-                    if c.get_status() in [self.STA_ACTIVE]:
-                        c.set_status(status, donedate=donedate)
-            # If we mark a task as Active and that some parent are not
-            # Active, we break the parent/child relation
-            # It has no sense to have an active subtask of a done parent.
-            # (old_status check is necessary to avoid false positive a start)
-            elif status in [self.STA_ACTIVE] and\
-                    old_status in [self.STA_DONE, self.STA_DISMISSED]:
-                if self.has_parent():
-                    for p_tid in self.get_parents():
-                        par = self.req.get_task(p_tid)
-                        if par.is_loaded() and par.get_status() in\
-                                [self.STA_DONE, self.STA_DISMISSED]:
-                            # we can either break the parent/child relationship
-                            # self.remove_parent(p_tid)
-                            # or restore the parent too
-                            par.set_status(self.STA_ACTIVE)
-                # We dont mark the children as Active because
-                # They might be already completed after all
-
-        # then the task itself
-        if status:
-            self.status = status
+        self.status = status
+        if status != old_status:
+            self.invalidate_dates()
 
         # Set closing date
-        if status and status in [self.STA_DONE, self.STA_DISMISSED]:
+        if status in [self.STA_DONE, self.STA_DISMISSED]:
             # to the specified date (if any)
             if donedate:
                 self.closed_date = donedate
             # or to today
             else:
                 self.closed_date = Date.today()
-        self.sync()
 
     def get_status(self):
         return self.status
@@ -312,66 +363,118 @@ class Task(TreeNode):
     # on this task's due date though, you can obtain it by using
     # get_due_date_constraint method.
     def set_due_date(self, new_duedate):
-        """Defines the task's due date."""
-
-        def __get_defined_parent_list(task):
-            """Recursively fetch a list of parents that have a defined due date
-               which is not fuzzy"""
-            parent_list = []
-            for par_id in task.parents:
-                par = self.req.get_task(par_id)
-                if par.get_due_date().is_fuzzy():
-                    parent_list += __get_defined_parent_list(par)
-                else:
-                    parent_list.append(par)
-            return parent_list
-
-        def __get_defined_child_list(task):
-            """Recursively fetch a list of children that have a defined
-               due date which is not fuzzy"""
-            child_list = []
-            for child_id in task.children:
-                child = self.req.get_task(child_id)
-                if child.get_due_date().is_fuzzy():
-                    child_list += __get_defined_child_list(child)
-                else:
-                    child_list.append(child)
-            return child_list
+        """Defines the task's due date.
 
+        The constraints are propagated to the related tasks in one pass, then
+        each task whose dates changed is synced once, with the subtasks of
+        the tasks whose due date changed."""
         old_due_date = self.due_date
         new_duedate_obj = Date(new_duedate)  # caching the conversion
         self.due_date = new_duedate_obj
+        # {tid: task} of the tasks whose due date / start date changed
+        moved = {}
+        started = {}
+        if old_due_date != new_duedate_obj:
+            moved[self.get_id()] = self
         # If the new date is fuzzy or undefined, we don't update related tasks
         if not new_duedate_obj.is_fuzzy():
+            self._propagate_due_date(moved, started)
+
+        # If the date changed, we notify the change for the children since the
+        # constraints might have changed
+        for task in moved.values():
+            task.invalidate_dates()
+        to_sync = dict(started)
+        for task in moved.values():
+            to_sync.update(task._get_subtree())
+        for task in to_sync.values():
+            task.sync()
+
+    def _propagate_due_date(self, moved, started):
+        """Applies the constraints of the new due date of the task to its
+        ancestors and descendants, breadth first, without syncing them.
+
+        Every related task whose due date has to change gets the same due
+        date as this task, so each of them is visited once.
+
+        @param moved: {tid: task} where the tasks whose due date changed are
+                      added
+        @param started: {tid: task} where the tasks whose start date changed
+                        are added
+        """
+        new_duedate = self.due_date
+        queue = deque([self])
+        while queue:
+            task = queue.popleft()
             # if the task's start date happens later than the
             # new due date, we update it (except for fuzzy dates)
-            if not self.get_start_date().is_fuzzy() and \
-                    self.get_start_date() > new_duedate_obj:
-                self.set_start_date(new_duedate)
+            start_date = task.start_date
+            if not start_date.is_fuzzy() and start_date > new_duedate:
+                task.start_date = new_duedate
+                started[task.get_id()] = task
             # if some ancestors' due dates happen before the task's new
             # due date, we update them (except for fuzzy dates)
-            for par in __get_defined_parent_list(self):
-                if par.get_due_date() < new_duedate_obj:
-                    par.set_due_date(new_duedate)
+            for par in task._get_defined_relatives('parents'):
+                if par.due_date < new_duedate:
+                    par.due_date = new_duedate
+                    moved[par.get_id()] = par
+                    queue.append(par)
             # we must apply the constraints to the defined & non-fuzzy children
             # as well
-            for sub in __get_defined_child_list(self):
-                sub_duedate = sub.get_due_date()
+            for sub in task._get_defined_relatives('children'):
                 # if the child's due date happens later than the task's: we
                 # update it to the task's new due date
-                if sub_duedate > new_duedate_obj:
-                    sub.set_due_date(new_duedate)
+                if sub.due_date > new_duedate:
+                    sub.due_date = new_duedate
+                    moved[sub.get_id()] = sub
+                    queue.append(sub)
                 # if the child's start date happens later than
                 # the task's new due date, we update it
                 # (except for fuzzy start dates)
-                sub_startdate = sub.get_start_date()
+                sub_startdate = sub.start_date
                 if not sub_startdate.is_fuzzy() and \
-                        sub_startdate > new_duedate_obj:
-                    sub.set_start_date(new_duedate)
-        # If the date changed, we notify the change for the children since the
-        # constraints might have changed
-        if old_due_date != new_duedate_obj:
-            self.recursive_sync()
+                        sub_startdate > new_duedate:
+                    sub.start_date = new_duedate
+                    started[sub.get_id()] = sub
+
+    def _get_defined_relatives(self, relation):
+        """Returns the nearest parents or children of the task which have a
+        defined due date which is not fuzzy: the tasks with a fuzzy due date
+        are walked through.
+
+        @param relation: 'parents' or 'children'
+        """
+        relatives = []
+        seen = set()
+        to_visit = list(getattr(self, relation))
+        while to_visit:
+            tid = to_visit.pop(0)
+            if tid in seen:
+                continue
+            seen.add(tid)
+            task = self.req.get_task(tid)
+            if task is None:
+                continue
+            if task.get_due_date().is_fuzzy():
+                to_visit.extend(getattr(task, relation))
+            else:
+                relatives.append(task)
+        return relatives
+
+    def _get_subtree(self):
+        """Returns {tid: task} of the task and all its descendants"""
+        subtree = {}
+        to_visit = [self]
+        while to_visit:
+            task = to_visit.pop()
+            if task.get_id() in subtree:
+                continue
+            subtree[task.get_id()] = task
+            for sub_id in task.children:
+                sub = self.req.get_task(sub_id)
+                if sub is not None:
+                    to_visit.append(sub)
+        return subtree
 
     def get_due_date(self):
         """ Returns the due date, which always respects all constraints """
@@ -381,16 +484,24 @@ class Task(TreeNode):
         """
         Returns the most urgent due date among the task and its active subtasks
         """
+        today = date.today()
+        if self._urgent_date is not None and self._urgent_date[0] == today:
+            return self._urgent_date[1]
         urgent_date = self.get_due_date()
         for subtask in self.get_subtasks():
             if subtask.get_status() == self.STA_ACTIVE:
                 urgent_date = min(urgent_date, subtask.get_urgent_date())
+        self._urgent_date = (today, urgent_date)
         return urgent_date
 
     def get_due_date_constraint(self):
         """ Returns the most urgent due date constraint, following
             parents' due dates. Return Date.no_date() if no constraint
             is applied. """
+        today = date.today()
+        if (self._due_date_constraint is not None and
+                self._due_date_constraint[0] == today):
+            return self._due_date_constraint[1]
         # Check out for constraints depending on date definition/fuzziness.
         strongest_const_date = self.due_date
         if strongest_const_date.is_fuzzy():
@@ -415,8 +526,46 @@ class Task(TreeNode):
                 # we compare the dates
                 if par_duedate < strongest_const_date:
                     strongest_const_date = par_duedate
+        self._due_date_constraint = (today, strongest_const_date)
         return strongest_const_date
 
+    def invalidate_dates(self):
+        """ Forgets the memoized dates which depend on the due date, the
+        status or the parents of the task: the urgent date of the task and
+        its ancestors, and the due date constraint of the task and of its
+        descendants which inherit it """
+        to_visit = [self]
+        seen = set()
+        while to_visit:
+            task = to_visit.pop()
+            if task.get_id() in seen:
+                continue
+            seen.add(task.get_id())
+            task._urgent_date = None
+            to_visit.extend(task._get_related_tasks(task.parents))
+
+        to_visit = [self]
+        seen = set()
+        while to_visit:
+            task = to_visit.pop()
+            if task.get_id() in seen:
+                continue
+            seen.add(task.get_id())
+            task._due_date_constraint = None
+            # Only the subtasks with a fuzzy due date follow their parents
+            for sub in task._get_related_tasks(task.children):
+                if sub.due_date.is_fuzzy():
+                    to_visit.append(sub)
+
+    def _get_related_tasks(self, tids):
+        """ Returns the tasks of tids which exist """
+        tasks = []
+        for tid in tids:
+            task = self.req.get_task(tid)
+            if task is not None:
+                tasks.append(task)
+        return tasks
+
     # ABOUT START DATE
     #
     # Start date is the date at which the user has decided to work or consider
@@ -462,6 +611,38 @@ class Task(TreeNode):
         closed_date = self.get_closed_date()
         return (closed_date - due_date).days
 
+    @property
+    def content(self):
+        """ The XML content of the task, loaded on first access if it was
+        given through set_lazy_text() """
+        if self._content_loader is not None:
+            loader = self._content_loader
+            self._content_loader = None
+            text = loader()
+            self._content = self._clean_text(text) if text else ''
+        return self._content
+
+    @content.setter
+    def content(self, value):
+        self._content_loader = None
+        self._content = value
+
+    def set_lazy_text(self, loader):
+        """ Defers reading the content until it is first needed.
+
+        Most views only need the title, status, dates and tags of a task, so
+        backends can avoid materializing every content at load time.
+
+        @param loader: a function without arguments which returns the
+                       content, in any format accepted by set_text
+        """
+        self._content = ''
+        self._content_loader = loader
+
+    def is_text_loaded(self):
+        """ Returns False while a lazy content is still on disk """
+        return self._content_loader is None
+
     def get_text(self):
         """ Return the content or empty string in case of None """
         if self.content:
@@ -523,16 +704,20 @@ class Task(TreeNode):
 
     def set_text(self, texte):
         self.can_be_deleted = False
-        if texte != "<content/>":
-            # defensive programmation to filter bad formatted tasks
-            if not texte.startswith("<content>"):
-                texte = html.escape(texte, quote=True)
-                texte = f"<content>{texte}"
-            if not texte.endswith("</content>"):
-                texte = f"{texte}</content>"
-            self.content = str(texte)
-        else:
-            self.content = ''
+        self.content = self._clean_text(texte)
+
+    @staticmethod
+    def _clean_text(texte):
+        """ Wraps texte into a <content> element if it is not already """
+        if texte == "<content/>":
+            return ''
+        # defensive programmation to filter bad formatted tasks
+        if not texte.startswith("<content>"):
+            texte = html.escape(texte, quote=True)
+            texte = f"<content>{texte}"
+        if not texte.endswith("</content>"):
+            texte = f"{texte}</content>"
+        return str(texte)
 
     # SUBTASKS ###############################################################
     def new_subtask(self):
@@ -553,8 +738,11 @@ class Task(TreeNode):
         self.can_be_deleted = False
         # the core of the method is in the TreeNode object
         TreeNode.add_child(self, tid)
-        # now we set inherited attributes only if it's a new task
+        self.invalidate_dates()
         child = self.req.get_task(tid)
+        if child is not None:
+            child.invalidate_dates()
+        # now we set inherited attributes only if it's a new task
         if self.is_loaded() and child and child.can_be_deleted:
             child.set_start_date(self.get_start_date())
             child.set_due_date(self.get_due_date())
@@ -595,9 +783,25 @@ class Task(TreeNode):
                     i.get_self_and_all_subtasks(active_only, tasks)
         return tasks
 
+    def add_parent(self, parent_id):
+        """Adds a parent to the task. Refresh memoized dates."""
+        result = TreeNode.add_parent(self, parent_id)
+        self.invalidate_dates()
+        return result
+
+    def remove_parent(self, parent_id):
+        """Removes a parent of the task. Refresh memoized dates of its
+        former ancestors too."""
+        self.invalidate_dates()
+        result = TreeNode.remove_parent(self, parent_id)
+        self.invalidate_dates()
+        return result
+
     def set_parent(self, parent_id):
         """Update the task's parent. Refresh due date constraints."""
+        self.invalidate_dates()
         TreeNode.set_parent(self, parent_id)
+        self.invalidate_dates()
         if parent_id is not None:
             par = self.req.get_task(parent_id)
             par_duedate = par.get_due_date_constraint()
@@ -625,6 +829,7 @@ class Task(TreeNode):
         """
         return self.attributes.get((namespace, att_name), None)
 
+    @profiler.timed('task.sync')
     def sync(self):
         self._modified_update()
         if self.is_loaded():
@@ -666,6 +871,33 @@ class Task(TreeNode):
         self.req.get_tag(new).modified()
         self.sync()
 
+    def rewrite_tag(self, old, new=None):
+        """
+        Renames the tag old to new in the tags and the content of the task,
+        or removes it if new is None.
+
+        Unlike rename_tag and remove_tag, neither the tags nor the subtasks
+        are touched and the task isn't synced: this is left to the caller,
+        which rewrites many tasks at once.
+
+        @returns bool: True if the task had the tag
+        """
+        if old not in self.tags:
+            return False
+        if new is None:
+            self.tags.remove(old)
+            self.content = self._strip_tag(self.content, old)
+            return True
+
+        eold = saxutils.escape(saxutils.unescape(old))
+        enew = saxutils.escape(saxutils.unescape(new))
+        self.content = self.content.replace(eold, enew)
+        if new in self.tags:
+            self.tags.remove(old)
+        else:
+            self.tags[self.tags.index(old)] = new
+        return True
+
     def tag_added(self, tagname):
         """
         Adds a tag. Does not add '@tag' to the contents. See add_tag
@@ -687,30 +919,51 @@ class Task(TreeNode):
     def add_tag(self, tagname):
         "Add a tag to the task and insert '@tag' into the task's content"
         if self.tag_added(tagname):
-            c = self.content
-
-            # strip <content>...</content> tags
-            if c.startswith('<content>'):
-                c = c[len('<content>'):]
-            if c.endswith('</content>'):
-                c = c[:-len('</content>')]
-
-            if not c:
-                # don't need a separator if it's the only text
-                sep = ''
-            elif c.startswith('<tag>'):
-                # if content starts with a tag, make a comma-separated list
-                sep = ', '
-            else:
-                # other text at the beginning, so put the tag on its own line
-                sep = '\n\n'
-
-            self.content = "<content><tag>%s</tag>%s%s</content>" % (
-                html.escape(tagname), sep, c)
+            self._insert_tag_in_content(tagname)
             # we modify the task internal state, thus we have to call for a
             # sync
             self.sync()
 
+    def insert_tag(self, tagname):
+        """
+        Adds a tag to the tags of the task and inserts '@tag' into its
+        content.
+
+        Unlike add_tag, neither the tag nor the subtasks are touched and the
+        task isn't synced: this is left to the caller, which tags many tasks
+        at once.
+
+        @returns bool: True if the task didn't have the tag yet
+        """
+        if tagname in self.tags:
+            return False
+        self.tags.append(tagname)
+        self._insert_tag_in_content(tagname)
+        return True
+
+    def _insert_tag_in_content(self, tagname):
+        """ Inserts '@tag' at the beginning of the content of the task """
+        c = self.content
+
+        # strip <content>...</content> tags
+        if c.startswith('<content>'):
+            c = c[len('<content>'):]
+        if c.endswith('</content>'):
+            c = c[:-len('</content>')]
+
+        if not c:
+            # don't need a separator if it's the only text
+            sep = ''
+        elif c.startswith('<tag>'):
+            # if content starts with a tag, make a comma-separated list
+            sep = ', '
+        else:
+            # other text at the beginning, so put the tag on its own line
+            sep = '\n\n'
+
+        self.content = "<content><tag>%s</tag>%s%s</content>" % (
+            html.escape(tagname), sep, c)
+
     # remove by tagname
     def remove_tag(self, tagname):
         modified = False
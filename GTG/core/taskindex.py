@@ -0,0 +1,263 @@
+# -----------------------------------------------------------------------------
+# Getting Things GNOME! - a personal organizer for the GNOME desktop
+# Copyright (c) 2008-2013 - Lionel Dricot & Bertrand Rousseau
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+
+"""
+Index of the byte offsets of every <task> element of a task XML file
+
+The file is read through mmap, so a single task can be fetched by slicing
+its bytes instead of parsing the whole document again. Every entry also
+holds a digest of the task bytes, which makes it cheap to find out which
+tasks changed between two versions of the file.
+
+The index is persisted in the cache folder and rebuilt when the size, the
+modification time or the inode of the file change.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import re
+import threading
+import xml.dom.minidom
+import xml.parsers.expat
+import xml.sax.saxutils as saxutils
+
+from GTG.core import cleanxml, taskxml
+from GTG.core.dirs import SYNC_CACHE_DIR
+from GTG.core.logger import log
+
+INDEX_VERSION = 1
+
+# <task> but not <task-remote-ids>
+TASK_START = re.compile(rb'<task[\s/>]')
+TASK_END = b'</task>'
+TASK_ID = re.compile(rb'\sid="([^"]*)"')
+
+
+def task_digest(raw):
+    """ Returns the digest of the bytes of a task element """
+    return hashlib.blake2b(raw, digest_size=12).hexdigest()
+
+
+def parse_task_bytes(raw):
+    """ Parses the bytes of a single pretty-printed <task> element """
+    stringed = cleanxml.cleanString(raw.decode('utf-8'),
+                                    cleanxml.tab, cleanxml.enter)
+    doc = xml.dom.minidom.parseString(stringed)
+    cleanxml.cleanNode(doc.documentElement, cleanxml.tab, cleanxml.enter)
+    return doc.documentElement
+
+
+class TaskFileIndex():
+    """ Offset index of the tasks stored in an XML file """
+
+    def __init__(self, path, cache_dir=SYNC_CACHE_DIR, root="project"):
+        """
+        @param path: the task XML file
+        @param cache_dir: the folder where the index is persisted
+        @param root: the name of the root element of the file
+        """
+        self._path = path
+        self._root_end = f'</{root}>'.encode('utf-8')
+        path_hash = hashlib.sha1(path.encode('utf-8')).hexdigest()[:12]
+        self._index_path = os.path.join(
+            cache_dir, f'{os.path.basename(path)}-{path_hash}.idx')
+
+        # {task_id: (start offset, end offset, digest)}
+        self._entries = {}
+        # (size, mtime, inode) of the indexed file
+        self._indexed_stat = None
+
+        self._data = None
+        self._mapped_stat = None
+        self._lock = threading.Lock()
+
+        self._load_index()
+
+    # Persistence #############################################################
+    def _load_index(self):
+        try:
+            with open(self._index_path, 'r') as index_file:
+                stored = json.load(index_file)
+            if stored['version'] != INDEX_VERSION:
+                return
+            self._indexed_stat = tuple(stored['stat'])
+            self._entries = {tid: tuple(entry)
+                             for tid, entry in stored['entries'].items()}
+        except (OSError, ValueError, KeyError, TypeError):
+            # Missing or damaged index: it will be rebuilt on first use
+            self._indexed_stat = None
+            self._entries = {}
+
+    def _save_index(self):
+        stored = {
+            'version': INDEX_VERSION,
+            'stat': self._indexed_stat,
+            'entries': self._entries,
+        }
+        tmp_path = self._index_path + '__'
+        try:
+            os.makedirs(os.path.dirname(self._index_path), exist_ok=True)
+            with open(tmp_path, 'w') as index_file:
+                json.dump(stored, index_file)
+            os.replace(tmp_path, self._index_path)
+        except OSError as error:
+            log.warning('Could not save task index %s: %s',
+                        self._index_path, error)
+
+    # Mapping #################################################################
+    @staticmethod
+    def _stat_key(stat):
+        return (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+
+    def _map(self):
+        """ Maps the current version of the file, and rebuilds the index if
+        the file changed since it was indexed.
+
+        Must be called with self._lock held.
+        @returns bool: True if the index has been rebuilt
+        """
+        try:
+            current_stat = self._stat_key(os.stat(self._path))
+        except OSError:
+            current_stat = None
+
+        if self._data is not None and current_stat == self._mapped_stat:
+            return False
+
+        self._unmap()
+        if current_stat is not None:
+            with open(self._path, 'rb') as xml_file:
+                self._mapped_stat = self._stat_key(os.fstat(xml_file.fileno()))
+                if self._mapped_stat[0] > 0:
+                    self._data = mmap.mmap(xml_file.fileno(), 0,
+                                           access=mmap.ACCESS_READ)
+
+        if self._mapped_stat != self._indexed_stat:
+            self._rebuild()
+            return True
+        return False
+
+    def _unmap(self):
+        if self._data is not None:
+            self._data.close()
+        self._data = None
+        self._mapped_stat = None
+
+    def _rebuild(self):
+        """ Scans the mapped file for <task> elements """
+        entries = {}
+        data = self._data
+        position = 0
+        while data is not None:
+            match = TASK_START.search(data, position)
+            if not match:
+                break
+            start = match.start()
+            tag_end = data.find(b'>', start)
+            if tag_end < 0:
+                break
+
+            if data[tag_end - 1:tag_end] == b'/':
+                end = tag_end + 1
+            else:
+                end = data.find(TASK_END, tag_end)
+                if end < 0:
+                    break
+                end += len(TASK_END)
+
+            id_match = TASK_ID.search(data, start, tag_end)
+            if id_match:
+                tid = saxutils.unescape(id_match.group(1).decode('utf-8'),
+                                        {'&quot;': '"'})
+                entries[tid] = (start, end, task_digest(data[start:end]))
+            position = end
+
+        log.debug('Indexed %d tasks of %s', len(entries), self._path)
+        self._entries = entries
+        self._indexed_stat = self._mapped_stat
+        self._save_index()
+
+    # Public API ##############################################################
+    def refresh(self):
+        """ Makes sure the index matches the file on disk
+
+        @returns bool: True if the index has been rebuilt
+        """
+        with self._lock:
+            return self._map()
+
+    def is_complete(self):
+        """ Returns False if the file is empty or truncated, e.g. because
+        another program is still writing it """
+        with self._lock:
+            self._map()
+            if self._data is None:
+                return False
+            tail = self._data[-(len(self._root_end) + 64):]
+            return tail.rstrip().endswith(self._root_end)
+
+    def get_task_ids(self):
+        """ Returns the ids of the tasks in the file """
+        with self._lock:
+            self._map()
+            return list(self._entries)
+
+    def get_digests(self):
+        """ Returns a dictionary {task_id: digest of the task bytes} """
+        with self._lock:
+            self._map()
+            return {tid: entry[2] for tid, entry in self._entries.items()}
+
+    def get_task_bytes(self, tid):
+        """ Returns the raw bytes of the <task> element, or None if the
+        task is not in the file """
+        with self._lock:
+            self._map()
+            entry = self._entries.get(tid)
+            if entry is None:
+                return None
+            start, end, digest = entry
+            raw = self._data[start:end]
+            return raw if task_digest(raw) == digest else None
+
+    def get_task_node(self, tid):
+        """ Returns the parsed <task> element, or None """
+        raw = self.get_task_bytes(tid)
+        if raw is None:
+            return None
+        try:
+            return parse_task_bytes(raw)
+        except xml.parsers.expat.ExpatError as error:
+            log.warning('Could not parse task %s from %s: %s',
+                        tid, self._path, error)
+            return None
+
+    def get_content(self, tid):
+        """ Returns the content of a task, as Task.set_text() expects it,
+        or None if the task is not in the file """
+        node = self.get_task_node(tid)
+        if node is None:
+            return None
+        return taskxml.normalize_content(taskxml.read_node(node, 'content'))
+
+    def close(self):
+        """ Releases the mapping of the file """
+        with self._lock:
+            self._unmap()
@@ -40,10 +40,24 @@ def read_node(xmlnode, name):
         return ""
 
 
+def normalize_content(content):
+    """ Returns the content of a task as a <content> XML string """
+    # FIXME why we need to convert that through an XML?
+    if content != "":
+        content = f"<content>{content}</content>"
+        content = minidom.parseString(content).firstChild.toxml()
+    return content
+
+
 # Take an empty task, an XML node and return a Task.
+#
+# If lazy_content is True, the content is not parsed here: the task keeps a
+# reference to its <content> node and reads it on the first
+# get_text()/get_excerpt(). A content_loader function can be given to read
+# the content from somewhere else (e.g. straight from the file).
 
 # FIXME: This should use reflection to figure out the fields
-def task_from_xml(task, xmlnode):
+def task_from_xml(task, xmlnode, lazy_content=False, content_loader=None):
     # print "********************************"
     # print xmlnode.toprettyxml()
 
@@ -77,12 +91,20 @@ def task_from_xml(task, xmlnode):
         # FIXME why unescape????
         task.tag_added(saxutils.unescape(tag))
 
-    # FIXME why we need to convert that through an XML?
-    content = read_node(xmlnode, "content")
-    if content != "":
-        content = f"<content>{content}</content>"
-        content = minidom.parseString(content).firstChild.toxml()
-        task.set_text(content)
+    if lazy_content:
+        content_nodes = xmlnode.getElementsByTagName("content")
+        if content_nodes and content_nodes[0].hasChildNodes():
+            if content_loader is None:
+                content_node = content_nodes[0]
+
+                def content_loader():
+                    return normalize_content(get_text(content_node))
+
+            task.set_lazy_text(content_loader)
+    else:
+        content = normalize_content(read_node(xmlnode, "content"))
+        if content != "":
+            task.set_text(content)
 
     for subtask in xmlnode.getElementsByTagName("subtask"):
         task.add_child(get_text(subtask))
@@ -112,6 +134,32 @@ def task_from_xml(task, xmlnode):
 
     return task
 
+
+def update_task_from_xml(task, xmlnode):
+    """ Applies the XML node of a task to an already loaded Task.
+
+    Unlike task_from_xml(), the tags, subtasks and content which are not in
+    the node anymore are removed from the task.
+    """
+    tags = xmlnode.getAttribute("tags").replace(' ', '')
+    tags = {saxutils.unescape(tag) for tag in tags.split(',')
+            if tag.strip() != ""}
+    for tag in task.get_tags_name():
+        if tag not in tags:
+            task.remove_tag(tag)
+
+    children = {get_text(subtask)
+                for subtask in xmlnode.getElementsByTagName("subtask")}
+    for child_id in task.get_children():
+        if child_id not in children:
+            task.remove_child(child_id)
+
+    if read_node(xmlnode, "content") == "":
+        task.set_text("<content/>")
+
+    return task_from_xml(task, xmlnode)
+
+
 # FIXME maybe pretty XML should be enough for this...
 # Task as parameter the doc where to put the XML node
 
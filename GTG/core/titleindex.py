@@ -0,0 +1,113 @@
+# -----------------------------------------------------------------------------
+# Getting Things GNOME! - a personal organizer for the GNOME desktop
+# Copyright (c) 2008-2013 - Lionel Dricot & Bertrand Rousseau
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+
+"""
+Index of the tasks by title, to resolve a title without looking at all the
+tasks.
+"""
+
+import bisect
+import threading
+
+
+def fold_title(title):
+    """ Returns the form of a title which the index compares """
+    return title.casefold()
+
+
+class TitleIndex():
+    """
+    Keeps task ids by case-folded title, for exact and prefix lookups.
+    All the methods are thread-safe.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # sorted list of (folded title, task id)
+        self._entries = []
+        # task id -> folded title
+        self._titles = {}
+
+    def update(self, tid, title):
+        """
+        Indexes a task under a new title
+
+        @param tid: the id of the task
+        @param title: the title of the task, None to remove it from the index
+        """
+        folded = None if title is None else fold_title(title)
+        with self._lock:
+            old_title = self._titles.get(tid)
+            if old_title is not None:
+                if old_title == folded:
+                    return
+                self._remove(tid, old_title)
+            if folded is not None:
+                self._titles[tid] = folded
+                bisect.insort(self._entries, (folded, tid))
+
+    def remove(self, tid):
+        """
+        Removes a task from the index, if it is in it
+
+        @param tid: the id of the task
+        """
+        with self._lock:
+            title = self._titles.get(tid)
+            if title is not None:
+                self._remove(tid, title)
+
+    def _remove(self, tid, title):
+        """ Removes an entry. The lock must be held. """
+        del self._titles[tid]
+        position = bisect.bisect_left(self._entries, (title, tid))
+        del self._entries[position]
+
+    def get_exact(self, title):
+        """
+        Returns the ids of the tasks with this title, ignoring the case
+
+        @returns list: the task ids, sorted
+        """
+        folded = fold_title(title)
+        with self._lock:
+            low = bisect.bisect_left(self._entries, (folded,))
+            high = bisect.bisect_left(self._entries, (folded, chr(0x10ffff)))
+            return [tid for _, tid in self._entries[low:high]]
+
+    def get_prefix(self, prefix):
+        """
+        Returns the ids of the tasks whose title starts with prefix,
+        ignoring the case
+
+        @returns list: the task ids, sorted by title
+        """
+        folded = fold_title(prefix)
+        with self._lock:
+            low = bisect.bisect_left(self._entries, (folded,))
+            high = bisect.bisect_left(self._entries,
+                                      (folded + chr(0x10ffff),))
+            return [tid for _, tid in self._entries[low:high]]
+
+    def __contains__(self, tid):
+        with self._lock:
+            return tid in self._titles
+
+    def __len__(self):
+        with self._lock:
+            return len(self._titles)
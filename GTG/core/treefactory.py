@@ -19,7 +19,7 @@
 from datetime import datetime
 
 from GTG.core.search import search_filter
-from GTG.core import tag
+from GTG.core import profiler, tag
 from GTG.core.task import Task
 from gettext import gettext as _
 from GTG.core.dates import Date
@@ -59,7 +59,8 @@ class TreeFactory():
                 param = filt[1]
             else:
                 param = None
-            tasktree.add_filter(f, filt[0], param)
+            tasktree.add_filter(f, profiler.timed(f'filter.{f}')(filt[0]),
+                                param)
         self.tasktree = tasktree
         return tasktree
 
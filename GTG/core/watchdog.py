@@ -16,7 +16,19 @@
 # this program.  If not, see <http://www.gnu.org/licenses/>.
 # -----------------------------------------------------------------------------
 
+from contextlib import contextmanager
+import sys
 import threading
+import time
+import traceback
+
+from gi.repository import GLib
+
+from GTG.core import profiler
+from GTG.core.logger import log
+
+# Names of the main loop handlers being run, innermost last
+_handlers = []
 
 
 class Watchdog():
@@ -52,3 +64,117 @@ class Watchdog():
         if value is None:
             return True
         return False
+
+
+@contextmanager
+def main_loop_handler(name):
+    """
+    Names the main loop handler it wraps, so that a stall of the main loop
+    can be attributed to it. Works as a decorator too::
+
+        @main_loop_handler('on_search')
+        def on_search(self, data):
+            ...
+    """
+    _handlers.append(name)
+    try:
+        yield
+    finally:
+        _handlers.pop()
+
+
+class MainLoopWatchdog():
+    """
+    Measures the stalls of the GLib main loop, i.e. the time the UI is
+    frozen.
+
+    A heartbeat runs in the main loop. A thread checks that it keeps beating:
+    when it doesn't for more than `threshold` seconds, the stack of the main
+    thread is logged, with the name of the running handler (see
+    main_loop_handler). The length of the stall is logged once the main loop
+    is back.
+    """
+
+    # Seconds between two heartbeats
+    HEARTBEAT = 0.05
+    # A stall longer than this is logged, in seconds
+    THRESHOLD = 0.25
+    # Number of frames of the stack samples
+    STACK_DEPTH = 15
+
+    def __init__(self, threshold=THRESHOLD, heartbeat=HEARTBEAT):
+        """
+        @param threshold: seconds without heartbeat that make a stall
+        @param heartbeat: seconds between two heartbeats
+        """
+        self.threshold = threshold
+        self.heartbeat = heartbeat
+        self.stalls = 0
+        self.longest_stall = 0
+        self._running = False
+        self._main_thread = None
+        self._last_beat = 0
+        self._sampled = False
+        self._handler = None
+
+    def start(self):
+        """ Starts watching. Must be called from the main loop thread. """
+        if self._running:
+            return
+        self._running = True
+        self._main_thread = threading.get_ident()
+        self._last_beat = time.monotonic()
+        GLib.timeout_add(int(self.heartbeat * 1000), self._beat)
+        monitor = threading.Thread(target=self._monitor,
+                                   name='MainLoopWatchdog')
+        monitor.daemon = True
+        monitor.start()
+
+    def stop(self):
+        self._running = False
+
+    def _beat(self):
+        """ The heartbeat, run by the main loop """
+        now = time.monotonic()
+        stall = now - self._last_beat - self.heartbeat
+        self._last_beat = now
+        if stall > self.threshold:
+            self.stalls += 1
+            self.longest_stall = max(self.longest_stall, stall)
+            if profiler.is_enabled():
+                profiler.add_time('main_loop.stall', stall)
+            log.warning('Main loop blocked for %d ms%s', stall * 1000,
+                        f' in {self._handler}' if self._handler else '')
+        self._sampled = False
+        self._handler = None
+        return self._running
+
+    def _monitor(self):
+        while self._running:
+            time.sleep(self.heartbeat)
+            try:
+                self.check()
+            except Exception:
+                # A bad sample must not stop the watchdog
+                log.exception('Main loop watchdog failed to sample')
+
+    def check(self):
+        """ Samples the stack of the main thread if it is stalled """
+        blocked = time.monotonic() - self._last_beat - self.heartbeat
+        if blocked <= self.threshold or self._sampled:
+            return
+        self._sampled = True
+        # The main thread may pop the handler in the meantime
+        try:
+            self._handler = _handlers[-1]
+        except IndexError:
+            self._handler = None
+
+        frame = sys._current_frames().get(self._main_thread)
+        if frame is None:
+            return
+        stack = ''.join(traceback.format_stack(frame)[-self.STACK_DEPTH:])
+        log.warning('Main loop blocked for more than %d ms%s, in:\n%s',
+                    blocked * 1000,
+                    f' by {self._handler}' if self._handler else '',
+                    stack)
@@ -18,10 +18,12 @@
 
 """Main class of GTG."""
 
-from gi.repository import Gtk, Gdk, Gio
+from gi.repository import Gtk, Gdk, Gio, GLib
 import configparser
+import datetime
 import os
 import logging
+import signal
 
 from GTG.gtk.browser.delete_task import DeletionUI
 from GTG.gtk.browser.main_window import MainWindow
@@ -29,10 +31,11 @@ from GTG.gtk.editor.editor import TaskEditor
 from GTG.gtk.preferences import Preferences
 from GTG.gtk.plugins import PluginsDialog
 from webbrowser import open as openurl
-from GTG.core import clipboard
+from GTG.core import clipboard, profiler
 from GTG.core.plugins.engine import PluginEngine
 from GTG.core.plugins.api import PluginAPI
 from GTG.backends import BackendFactory
+from GTG.backends.backend_signals import BackendSignals
 from GTG.core.datastore import DataStore
 from GTG.core.dirs import CSS_DIR
 from GTG.core.logger import log
@@ -40,6 +43,7 @@ from GTG.core.dates import Date
 from GTG.gtk.backends import BackendsDialog
 from GTG.gtk.browser.tag_editor import TagEditor
 from GTG.core.timer import Timer
+from GTG.core.watchdog import MainLoopWatchdog, main_loop_handler
 
 
 class Application(Gtk.Application):
@@ -67,6 +71,9 @@ class Application(Gtk.Application):
     # Timer to refresh views and purge tasks
     timer = None
 
+    # Logs the stalls of the main loop
+    main_loop_watchdog = None
+
     # Plugin Engine instance
     plugin_engine = None
 
@@ -82,14 +89,20 @@ class Application(Gtk.Application):
 
         super().__init__(application_id=app_id)
 
+        profiler.start_phase('startup')
+        if profiler.is_enabled():
+            # kill -USR1 <pid> dumps the profiling stats
+            GLib.unix_signal_add(GLib.PRIORITY_DEFAULT, signal.SIGUSR1,
+                                 self.dump_profile)
+
         if debug:
             log.setLevel(logging.DEBUG)
             log.debug("Debug output enabled.")
         else:
             log.setLevel(logging.INFO)
 
-        # Register backends
-        datastore = DataStore()
+        # Register backends. The tasks are loaded while the UI starts.
+        datastore = DataStore(progressive_load=True)
 
         [datastore.register_backend(backend_dic)
          for backend_dic in BackendFactory().get_saved_backends_list()]
@@ -104,6 +117,8 @@ class Application(Gtk.Application):
 
         self.clipboard = clipboard.TaskClipboard(self.req)
 
+        self.main_loop_watchdog = MainLoopWatchdog()
+
         self.timer = Timer(self.config)
         self.timer.connect('refresh', self.autoclean)
 
@@ -123,6 +138,8 @@ class Application(Gtk.Application):
         # Browser (still hidden)
         if not self.browser:
             self.browser = MainWindow(self.req, self)
+            # Logs the UI freezes from now on
+            self.main_loop_watchdog.start()
 
         if self.props.application_id == 'org.gnome.GTGDevel':
             self.browser.get_style_context().add_class('devel')
@@ -132,6 +149,7 @@ class Application(Gtk.Application):
         self.browser.present()
         self.open_uri_list()
 
+        profiler.stop_phase('startup')
         log.debug("Application activation finished")
 
     def init_plugin_engine(self):
@@ -202,6 +220,12 @@ class Application(Gtk.Application):
 
         log.debug(f'Received {len(self.uri_list)} Task URIs')
 
+        if self.uri_list and not self.req.is_default_backend_loaded():
+            # Tasks are still being loaded, open them afterwards
+            self._uri_list_handle = BackendSignals().connect(
+                'default-backend-loaded', self._open_uri_list_when_loaded)
+            return
+
         for uri in self.uri_list:
             if uri.startswith('gtg://'):
                 log.debug(f'Opening task {uri[6:]}')
@@ -211,6 +235,12 @@ class Application(Gtk.Application):
         if not self.browser.is_visible() and not self.open_tasks:
             self.quit()
 
+    def _open_uri_list_when_loaded(self, sender=None):
+        """Callback for the default-backend-loaded signal."""
+
+        BackendSignals().disconnect(self._uri_list_handle)
+        self.open_uri_list()
+
     # --------------------------------------------------------------------------
     # ACTIONS
     # --------------------------------------------------------------------------
@@ -310,24 +340,25 @@ class Application(Gtk.Application):
     # TASKS AUTOCLEANING
     # --------------------------------------------------------------------------
 
+    @main_loop_handler('Application.purge_old_tasks')
     def purge_old_tasks(self, widget=None):
-        """Remove closed tasks older than N days."""
+        """Remove closed tasks older than N days.
+
+        Returns the number of removed tasks, subtasks included.
+        """
 
         log.debug("Deleting old tasks")
 
         today = Date.today()
         max_days = self.config.get('autoclean_days')
-        closed_tree = self.req.get_tasks_tree(name='inactive')
-
-        closed_tasks = [self.req.get_task(tid) for tid in
-                        closed_tree.get_all_nodes()]
+        # Tasks closed more than max_days ago
+        limit = today.date() - datetime.timedelta(days=max_days)
+        to_remove = self.req.get_tasks_closed_before(limit)
 
-        to_remove = [t for t in closed_tasks
-                     if (today - t.get_closed_date()).days > max_days]
-
-        [self.req.delete_task(task.get_id())
-         for task in to_remove
-         if self.req.has_task(task.get_id())]
+        removed = self.req.delete_tasks(to_remove)
+        log.info("Removed %d tasks closed more than %d days ago",
+                 removed, max_days)
+        return removed
 
     def autoclean(self, timer):
         """Run Automatic cleanup of old tasks."""
@@ -494,12 +525,23 @@ class Application(Gtk.Application):
         self.save_tasks()
         Gtk.Application.quit(self)
 
+    def dump_profile(self):
+        """Write the profiling stats, on SIGUSR1."""
+
+        profiler.dump()
+        return True
+
     def do_shutdown(self):
         """Callback when GTG is closed."""
 
         self.save_plugin_settings()
 
+        self.main_loop_watchdog.stop()
+
         # Save data and shutdown datastore backends
         self.req.save_datastore(quit=True)
 
+        if profiler.is_enabled():
+            profiler.dump()
+
         Gtk.Application.do_shutdown(self)
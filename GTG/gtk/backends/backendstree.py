@@ -16,13 +16,23 @@
 # this program.  If not, see <http://www.gnu.org/licenses/>.
 # -----------------------------------------------------------------------------
 
+from gi.repository import GLib
 from gi.repository import Gtk
 from gi.repository import GdkPixbuf
+from gettext import gettext as _, ngettext
 
 from GTG.core.tag import ALLTASKS_TAG
 from GTG.gtk.colors import get_colored_tags_markup
+from GTG.backends import backend_metrics
 from GTG.backends.backend_signals import BackendSignals
 
+# A backend whose oldest pending change is older than this (in seconds) is
+# shown as lagging behind
+LAGGING_BACKEND_AGE = 30
+# How often (in seconds) the metrics are polled while the tree is shown, so
+# that a backend stuck while writing is noticed even if it stops reporting
+METRICS_REFRESH_INTERVAL = 2
+
 
 class BackendsTree(Gtk.TreeView):
     """
@@ -33,6 +43,8 @@ class BackendsTree(Gtk.TreeView):
     COLUMN_ICON = 1
     COLUMN_TEXT = 2  # holds the backend "human-readable" name
     COLUMN_TAGS = 3
+    COLUMN_METRICS = 4  # what the backend still has to write
+    COLUMN_METRICS_TOOLTIP = 5
 
     def __init__(self, backendsdialog):
         """
@@ -44,6 +56,7 @@ class BackendsTree(Gtk.TreeView):
         super().__init__()
         self.dialog = backendsdialog
         self.req = backendsdialog.get_requester()
+        self._metrics_source = None
         self._init_liststore()
         self._init_renderers()
         self._init_signals()
@@ -92,12 +105,15 @@ class BackendsTree(Gtk.TreeView):
         @param backend_id: the id of the backend to add
         """
         if backend:
+            metrics = backend.get_queue_metrics()
             backend_iter = self.liststore.append([
                 backend.get_id(),
                 self.dialog.get_pixbuf_from_icon_name(backend.get_name(),
                                                       16),
                 backend.get_human_name(),
                 self._get_markup_for_tags(backend.get_attached_tags()),
+                self._get_markup_for_metrics(metrics),
+                self._get_tooltip_for_metrics(metrics),
             ])
             self.backendid_to_iter[backend.get_id()] = backend_iter
 
@@ -143,6 +159,84 @@ class BackendsTree(Gtk.TreeView):
             tags_txt = get_colored_tags_markup(self.req, tag_names)
         return "<small>" + tags_txt + "</small>"
 
+    def on_backend_metrics(self, sender, backend_id, metrics):
+        """
+        Signal callback executed when a backend reports its queue metrics
+
+        @param sender: not used, only here to let this function be used as a
+                       callback
+        @param backend_id: the id of the backend
+        @param metrics: the metrics dictionary (see backend_metrics.py)
+        """
+        if backend_id not in self.backendid_to_iter:
+            return
+        b_path = self.liststore.get_path(self.backendid_to_iter[backend_id])
+        row = self.liststore[b_path]
+        row[self.COLUMN_METRICS] = self._get_markup_for_metrics(metrics)
+        row[self.COLUMN_METRICS_TOOLTIP] = self._get_tooltip_for_metrics(
+            metrics)
+
+    def _start_metrics_refresh(self, widget=None):
+        """Starts polling the queue metrics of the backends"""
+        if self._metrics_source is None:
+            self._metrics_source = GLib.timeout_add_seconds(
+                METRICS_REFRESH_INTERVAL, self._refresh_metrics)
+
+    def _stop_metrics_refresh(self, widget=None):
+        """Stops polling the queue metrics of the backends"""
+        if self._metrics_source is not None:
+            GLib.source_remove(self._metrics_source)
+            self._metrics_source = None
+
+    def _refresh_metrics(self):
+        """Updates the metrics of all the backends from their queues: the
+        age of the oldest pending change grows even when a backend is stuck
+        and doesn't report anything"""
+        for backend_id in list(self.backendid_to_iter):
+            backend = self.req.get_backend(backend_id)
+            if backend:
+                self.on_backend_metrics(None, backend_id,
+                                        backend.get_queue_metrics())
+        return True
+
+    def _get_markup_for_metrics(self, metrics):
+        """Given the queue metrics of a backend, generates the pango markup
+        summing them up: nothing when the backend is idle
+
+        @param metrics: the metrics dictionary (see backend_metrics.py)
+        @return str: the pango markup string
+        """
+        depth = metrics[backend_metrics.QUEUE_DEPTH]
+        if not depth:
+            return ""
+        age = metrics[backend_metrics.OLDEST_PENDING_AGE]
+        text = ngettext("%(count)d pending (%(age)ds)",
+                        "%(count)d pending (%(age)ds)",
+                        depth) % {'count': depth, 'age': age}
+        if age >= LAGGING_BACKEND_AGE:
+            text = f"<b>{text}</b>"
+        return "<small>" + text + "</small>"
+
+    def _get_tooltip_for_metrics(self, metrics):
+        """Given the queue metrics of a backend, generates the text of the
+        tooltip detailing them
+
+        @param metrics: the metrics dictionary (see backend_metrics.py)
+        @return str: the tooltip text
+        """
+        lines = [
+            _("Pending changes: %d") % metrics[backend_metrics.QUEUE_DEPTH],
+            _("Oldest pending change: %.0f s") %
+            metrics[backend_metrics.OLDEST_PENDING_AGE],
+            _("Saved tasks: %.1f/s") %
+            metrics[backend_metrics.SETS_PER_SECOND],
+            _("Removed tasks: %.1f/s") %
+            metrics[backend_metrics.REMOVES_PER_SECOND],
+            _("Average save time: %.0f ms") %
+            (metrics[backend_metrics.SET_TASK_LATENCY] * 1000),
+        ]
+        return "\n".join(lines)
+
     def remove_backend(self, backend_id):
         """ Removes a backend from the treeview, and selects the first (to show
         something in the configuration panel
@@ -156,8 +250,10 @@ class BackendsTree(Gtk.TreeView):
 
     def _init_liststore(self):
         """Creates the liststore"""
-        self.liststore = Gtk.ListStore(object, GdkPixbuf.Pixbuf, str, str)
+        self.liststore = Gtk.ListStore(object, GdkPixbuf.Pixbuf, str, str,
+                                       str, str)
         self.set_model(self.liststore)
+        self.set_tooltip_column(self.COLUMN_METRICS_TOOLTIP)
 
     def _init_renderers(self):
         """Initializes the cell renderers"""
@@ -180,6 +276,12 @@ class BackendsTree(Gtk.TreeView):
         tvcolumn_tags = Gtk.TreeViewColumn('Tags', tags_cell)
         tvcolumn_tags.add_attribute(tags_cell, 'markup', self.COLUMN_TAGS)
         self.append_column(tvcolumn_tags)
+        # For what the backend still has to write
+        metrics_cell = Gtk.CellRendererText()
+        tvcolumn_metrics = Gtk.TreeViewColumn('Metrics', metrics_cell)
+        tvcolumn_metrics.add_attribute(metrics_cell, 'markup',
+                                       self.COLUMN_METRICS)
+        self.append_column(tvcolumn_metrics)
 
     def cell_edited_callback(self, text_cell, path, new_text):
         """If a backend name is changed, it saves the changes in the Backend
@@ -205,10 +307,15 @@ class BackendsTree(Gtk.TreeView):
     def _init_signals(self):
         """Initializes the backends and gtk signals """
         self.connect("cursor-changed", self.on_select_row)
+        # The metrics are polled only while the tree is shown
+        self.connect("map", self._start_metrics_refresh)
+        self.connect("unmap", self._stop_metrics_refresh)
+        self.connect("destroy", self._stop_metrics_refresh)
         _signals = BackendSignals()
         _signals.connect(_signals.BACKEND_ADDED, self.on_backend_added)
         _signals.connect(_signals.BACKEND_STATE_TOGGLED,
                          self.on_backend_state_changed)
+        _signals.connect(_signals.BACKEND_METRICS, self.on_backend_metrics)
 
     def on_select_row(self, treeview=None):
         """When a row is selected, displays the corresponding editing panel
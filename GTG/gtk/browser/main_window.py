@@ -23,7 +23,7 @@ import datetime
 
 from gi.repository import GObject, Gtk, Gdk, Gio
 
-from GTG.core import info
+from GTG.core import info, profiler
 from GTG.backends.backend_signals import BackendSignals
 from GTG.core.dirs import ICONS_DIR
 from GTG.core.search import parse_search_query, InvalidQuery
@@ -40,6 +40,7 @@ from GTG.gtk.editor.calendar import GTGCalendar
 from GTG.gtk.tag_completion import TagCompletion
 from GTG.core.dates import Date
 from GTG.core.logger import log
+from GTG.core.watchdog import main_loop_handler
 
 class MainWindow(Gtk.ApplicationWindow):
     """ The UI for browsing open and closed tasks,
@@ -418,6 +419,8 @@ class MainWindow(Gtk.ApplicationWindow):
             self.searchbar.set_search_mode(True)
             self.search_entry.grab_focus()
 
+    @main_loop_handler('MainWindow.on_search')
+    @profiler.phase('search')
     def on_search(self, data):
         query = self.search_entry.get_text()
         log.debug(f"Searching for '{query}'")
@@ -549,6 +552,8 @@ class MainWindow(Gtk.ApplicationWindow):
         for t in self.config.get("opened_tasks"):
             GObject.idle_add(open_task, self.req, t)
 
+    @main_loop_handler('MainWindow.refresh_all_views')
+    @profiler.timed('refresh_all_views')
     def refresh_all_views(self, timer):
         active_tree = self.req.get_tasks_tree(name='active', refresh=False)
         active_tree.refresh_all()
@@ -1163,6 +1168,7 @@ class MainWindow(Gtk.ApplicationWindow):
                 task.set_status(Task.STA_DISMISSED)
                 self.close_all_task_editors(uid)
 
+    @profiler.timed('apply_filter_on_panes')
     def apply_filter_on_panes(self, filter_name, refresh=True, parameters=None):
         """ Apply filters for every pane: active tasks, closed tasks """
 
@@ -1170,12 +1176,14 @@ class MainWindow(Gtk.ApplicationWindow):
             vtree = self.req.get_tasks_tree(name=pane, refresh=False)
             vtree.apply_filter(filter_name, refresh=refresh, parameters=parameters)
 
+    @profiler.timed('unapply_filter_on_panes')
     def unapply_filter_on_panes(self, filter_name, refresh=True):
         """ Apply filters for every pane: active tasks, closed tasks """
         for pane in self.vtree_panes:
             vtree = self.req.get_tasks_tree(name=pane, refresh=False)
             vtree.unapply_filter(filter_name, refresh=refresh)
 
+    @main_loop_handler('MainWindow.on_select_tag')
     def on_select_tag(self, widget=None, row=None, col=None):
         """
         callback for when selecting an element of the tagtree (left sidebar)
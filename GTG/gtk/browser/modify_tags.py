@@ -34,7 +34,7 @@ class ModifyTagsDialog():
         self.tasks = []
 
         self._init_dialog()
-        self.tag_entry.set_completion(tag_completion)
+        tag_completion.attach_to_entry(self.tag_entry)
 
         # Rember values from last time
         self.last_tag_entry = _("NewTag")
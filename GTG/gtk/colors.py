@@ -20,45 +20,72 @@ from gi.repository import Gdk
 from functools import reduce
 import random
 
+# Colors used by the tags
+used_color = set()
+
+# Blended background colors, by (tag colors, background color)
+_blend_cache = {}
+# Number of blended colors kept before clearing the cache
+BLEND_CACHE_SIZE = 1024
+
+
 # Take list of Tags and give the background color that should be applied
 # The returned color might be None (in which case, the default is used)
+def background_color(tags, bgcolor=None):
+    tag_colors = []
+    for my_tag in tags:
+        my_color_str = my_tag.get_attribute("color")
+        if my_color_str:
+            used_color.add(my_color_str)
+            tag_colors.append(my_color_str)
+    if not tag_colors:
+        return None
+
+    if bgcolor:
+        key = (tuple(tag_colors), bgcolor.red, bgcolor.green, bgcolor.blue)
+    else:
+        key = (tuple(tag_colors), None)
+    try:
+        return _blend_cache[key]
+    except KeyError:
+        pass
+
+    if len(_blend_cache) >= BLEND_CACHE_SIZE:
+        _blend_cache.clear()
+    my_color = _blend_cache[key] = _blend_colors(tag_colors, bgcolor)
+    return my_color
 
-used_color = []
 
+def _blend_colors(tag_colors, bgcolor=None):
+    """ Blends the average of the tag colors with the background color
 
-def background_color(tags, bgcolor=None):
+    @param tag_colors: a non empty list of color strings
+    @param bgcolor: a Gdk.Color, white if None
+    @returns: the blended color as a string
+    """
     if not bgcolor:
         bgcolor = Gdk.color_parse("#FFFFFF")
-    # Compute color
-    my_color = None
-    color_count = 0.0
     red = 0
     green = 0
     blue = 0
-    for my_tag in tags:
-        my_color_str = my_tag.get_attribute("color")
-        if my_color_str is not None and my_color_str not in used_color:
-            used_color.append(my_color_str)
-        if my_color_str:
-            my_color = Gdk.color_parse(my_color_str)
-            color_count = color_count + 1
-            red = red + my_color.red
-            green = green + my_color.green
-            blue = blue + my_color.blue
-    if color_count != 0:
-        red = int(red / color_count)
-        green = int(green / color_count)
-        blue = int(blue / color_count)
-        brightness = (red + green + blue) / 3.0
-        target_brightness = (bgcolor.red + bgcolor.green + bgcolor.blue) / 3.0
-
-        alpha = (1 - abs(brightness - target_brightness) / 65535.0) / 2.0
-        red = int(red * alpha + bgcolor.red * (1 - alpha))
-        green = int(green * alpha + bgcolor.green * (1 - alpha))
-        blue = int(blue * alpha + bgcolor.blue * (1 - alpha))
-
-        my_color = Gdk.Color(red, green, blue).to_string()
-    return my_color
+    for my_color_str in tag_colors:
+        my_color = Gdk.color_parse(my_color_str)
+        red = red + my_color.red
+        green = green + my_color.green
+        blue = blue + my_color.blue
+    color_count = float(len(tag_colors))
+    red = int(red / color_count)
+    green = int(green / color_count)
+    blue = int(blue / color_count)
+    brightness = (red + green + blue) / 3.0
+    target_brightness = (bgcolor.red + bgcolor.green + bgcolor.blue) / 3.0
+
+    alpha = (1 - abs(brightness - target_brightness) / 65535.0) / 2.0
+    red = int(red * alpha + bgcolor.red * (1 - alpha))
+    green = int(green * alpha + bgcolor.green * (1 - alpha))
+    blue = int(blue * alpha + bgcolor.blue * (1 - alpha))
+
+    return Gdk.Color(red, green, blue).to_string()
 
 
 def get_colored_tag_markup(req, tag_name, html=False):
@@ -96,28 +123,26 @@ def get_colored_tags_markup(req, tag_names):
 
 
 def generate_tag_color():
-
+    """ Returns a random color which no tag uses yet """
     maxvalue = 65535
-    flag = 0
-    while(flag == 0):
+    my_color = None
+    while my_color is None or my_color in used_color:
         red = random.randint(0, maxvalue)
         green = random.randint(0, maxvalue)
         blue = random.randint(0, maxvalue)
         my_color = Gdk.Color(red, green, blue).to_string()
-        if my_color not in used_color:
-            flag = 1
-    used_color.append(my_color)
+    used_color.add(my_color)
     return my_color
 
 
 def color_add(present_color):
-
-    if present_color not in used_color:
-        used_color.append(present_color)
+    used_color.add(present_color)
 
 
 def color_remove(present_color):
-
-    if present_color in used_color:
-        used_color.remove(present_color)
+    """ Forgets a color which a tag stopped using, and the backgrounds
+    blended from it """
+    used_color.discard(present_color)
+    for key in [key for key in _blend_cache if present_color in key[0]]:
+        del _blend_cache[key]
 # -----------------------------------------------------------------------------
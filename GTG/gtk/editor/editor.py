@@ -36,6 +36,7 @@ from GTG.core.task import Task
 from gettext import gettext as _, ngettext
 from GTG.gtk.editor import GnomeConfig
 from GTG.gtk.editor.calendar import GTGCalendar
+from GTG.gtk.editor.save_pipeline import SavePipeline
 from GTG.gtk.editor.taskview import TaskView
 from GTG.gtk.tag_completion import tag_filter
 from GTG.core.dates import Date
@@ -65,6 +66,10 @@ class TaskEditor():
         self.browser_config = self.req.get_config('browser')
         self.config = self.req.get_task_config(task.get_id())
         self.time = None
+        # The (title, text) last written to the task by the editor
+        self._saved_content = None
+        self._save_pipeline = SavePipeline(self._serialize_content,
+                                           self._apply_content)
         self.clipboard = clipboard
         self.builder = Gtk.Builder()
         self.builder.add_from_file(self.EDITOR_UI_FILE)
@@ -684,15 +689,44 @@ class TaskEditor():
         self.close()
 
     def save(self):
-        self.task.set_title(self.textview.get_title())
-        self.task.set_text(self.textview.get_text())
+        # The content saved now is newer than the one being serialized
+        self._save_pipeline.cancel()
+        self._apply_content((self.textview.get_title(),
+                             self.textview.get_text()))
+        self.time = time.time()
+
+    def save_in_background(self):
+        """ Saves the task without blocking the main loop: the buffer is
+        copied right away, then serialized and compared with the last saved
+        content in another thread. The task is updated back in the main loop
+        if its content changed. """
+        self._save_pipeline.submit((self.textview.get_title(),
+                                    self.textview.get_text_snapshot(),
+                                    self._saved_content))
+        self.time = time.time()
+
+    def _serialize_content(self, snapshot):
+        """ Called in the save thread: returns the new (title, text) of
+        the task, or None if it didn't change """
+        title, text_snapshot, saved_content = snapshot
+        serializer = self.textview.serializer
+        content = (title, serializer.serialize_snapshot(text_snapshot))
+        if content == saved_content:
+            return None
+        return content
+
+    def _apply_content(self, content):
+        """ Writes the (title, text) of the editor in the task """
+        title, text = content
+        self.task.set_title(title)
+        self.task.set_text(text)
         self.task.sync()
+        self._saved_content = content
         if self.config is not None:
             self.config.save()
-        self.time = time.time()
-    # light_save save the task without refreshing every 30seconds
-    # We will reduce the time when the get_text will be in another thread
 
+    # light_save save the task without refreshing every 30seconds
+    # The text is serialized in another thread, see save_in_background()
     def light_save(self):
         # if self.time is none, we never called any save
         if self.time:
@@ -703,7 +737,7 @@ class TaskEditor():
             tosave = self.textview.get_editable()
             diff = None
         if tosave:
-            self.save()
+            self.save_in_background()
 
     def present(self):
         # This tries to bring the Task Editor to the front.
@@ -743,6 +777,7 @@ class TaskEditor():
         else:
             self.save()
             [sub.set_to_keep() for sub in self.task.get_subtasks() if sub]
+        self._save_pipeline.stop()
 
         try:
             del self.app.open_tasks[tid]
@@ -0,0 +1,113 @@
+# -----------------------------------------------------------------------------
+# Getting Things GNOME! - a personal organizer for the GNOME desktop
+# Copyright (c) 2008-2013 - Lionel Dricot & Bertrand Rousseau
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+
+"""
+Saves the content of the task editor without blocking the main loop.
+"""
+
+import threading
+
+from gi.repository import GLib
+
+from GTG.core.logger import log
+
+
+class SavePipeline():
+    """
+    Processes the snapshots submitted to it in a worker thread and posts the
+    results back to the main loop.
+
+    Only the latest snapshot matters: a snapshot replaced before the worker
+    picked it up is never processed, and the result of a snapshot is dropped
+    if a newer one was submitted in the meantime.
+    """
+
+    def __init__(self, process, apply):
+        """
+        @param process: function called in the worker thread with a
+                        snapshot. It returns the result to apply, or None if
+                        there is nothing to do.
+        @param apply: function called in the main loop with the result
+        """
+        self._process = process
+        self._apply = apply
+        self._condition = threading.Condition()
+        self._pending = None
+        self._generation = 0
+        self._thread = None
+        self._stopped = False
+
+    def submit(self, snapshot):
+        """
+        Queues a snapshot, replacing the one waiting to be processed if any
+
+        @param snapshot: the argument given to the process function
+        """
+        with self._condition:
+            if self._stopped:
+                return
+            self._generation += 1
+            self._pending = (self._generation, snapshot)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._work,
+                                                name='SavePipeline',
+                                                daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def cancel(self):
+        """ Forgets the snapshots whose result was not applied yet (e.g.
+        because the content is about to be saved synchronously) """
+        with self._condition:
+            self._generation += 1
+            self._pending = None
+
+    def stop(self):
+        """ Cancels the pending snapshots and stops the worker thread """
+        with self._condition:
+            self._generation += 1
+            self._pending = None
+            self._stopped = True
+            self._condition.notify()
+
+    def _work(self):
+        """ Body of the worker thread """
+        while True:
+            with self._condition:
+                while self._pending is None and not self._stopped:
+                    self._condition.wait()
+                if self._stopped:
+                    return
+                generation, snapshot = self._pending
+                self._pending = None
+
+            try:
+                result = self._process(snapshot)
+            except Exception:
+                log.exception("Could not process the snapshot to save")
+                continue
+            if result is not None:
+                GLib.idle_add(self._apply_result, generation, result)
+
+    def _apply_result(self, generation, result):
+        """ Applies a result in the main loop, unless it is outdated """
+        with self._condition:
+            outdated = generation != self._generation
+        if not outdated:
+            self._apply(result)
+        return False
@@ -32,18 +32,35 @@ class Serializer():
 
     def __init__(self):
 
-        # List of parsed tags
-        self.done = []
+        # Set of parsed tags
+        self.done = set()
 
     def serialize(self, register_buf, content_buf, start, end, length, udata):
         # Currently we serialize in XML
-        its = start.copy()
-        ite = end.copy()
+        return self.serialize_snapshot(self.snapshot(content_buf, start, end))
+
+    def snapshot(self, buff, start, end):
+        """
+        Copy the content of the buffer between start and end (the character
+        at end included) to a structure of plain python objects.
+
+        Taking a snapshot only walks the tag toggles of the buffer, the XML
+        is built by serialize_snapshot(), which doesn't need the buffer and
+        can be run in another thread.
+        """
         # Warning : the serialization process cannot be allowed to modify
         # the content of the buffer.
+        limit = end.copy()
+        limit.forward_char()
+        # Tags can survive from one serialization to the next one
+        self.done = set()
+        return self._snapshot_range(buff, start, limit)
+
+    def serialize_snapshot(self, snapshot):
+        """ Returns the <content> XML of a snapshot of the buffer """
         doc = xml.dom.minidom.Document()
         parent = doc.createElement("content")
-        doc.appendChild(self.parse_buffer(content_buf, its, ite, parent, doc))
+        doc.appendChild(self._snapshot_to_xml(snapshot, parent, doc))
 
         # We don't want the whole doc with the XML declaration
         # we only take the first node (the "content" one)
@@ -63,83 +80,17 @@ class Serializer():
         Parse the buffer and output an XML representation.
 
             @var buff, start, end  : the buffer to parse from start to end
+                                     (the character at end included)
             @var parent, doc: the XML element to add data and doc is
                                 the XML dom
         """
+        return self._snapshot_to_xml(self.snapshot(buff, start, end),
+                                     parent, doc)
 
-        it = start.copy()
-        tag = None
-        start_it = start.copy()
-        end_it = start.copy()
-        buffer_end = False
+    def _snapshot_to_xml(self, snapshot, parent, doc):
+        """ Add the XML representation of a snapshot to parent """
 
-        while not buffer_end:
-
-            if tag is None:
-                # We are not in a tag context
-                # Get list of know tags which begin here
-                # and are not already processed
-                tags = []
-                for ta in it.get_tags():
-                    if (it.begins_tag(ta) and ta not in self.done
-                       and self.is_known_tag(ta)):
-                        tags.append(ta)
-
-                if it.begins_tag() and tags:
-                    # We enter a tag context
-                    tag = tags.pop()
-                    self.done.append(tag)
-                    start_it = it.copy()
-
-                # We stay out of a tag context
-                # We write the char in the xml node
-                elif it.get_char() != "":
-                    parent.appendChild(doc.createTextNode(it.get_char()))
-
-            else:
-                # We are in a tag context
-                if it.ends_tag(tag) or it.equal(end):
-                    # There is the end of the gtkTextTag
-                    # We process the tag
-                    end_it = it.copy()
-                    end_it.backward_char()
-
-                    if hasattr(tag, 'is_tag'):
-                        # The current gtkTextTag is a tag
-                        # Recursive call
-                        nparent = doc.createElement("tag")
-                        child = self.parse_buffer(buff, start_it, end_it,
-                                                  nparent, doc)
-
-                        parent.appendChild(child)
-
-                    elif hasattr(ta, 'is_subtask'):
-                        # The current gtkTextTag is a subtask
-                        subt = doc.createElement('subtask')
-                        target = ta.child
-                        subt.appendChild(doc.createTextNode(target))
-                        parent.appendChild(subt)
-                        parent.appendChild(doc.createTextNode("\n"))
-                        it.forward_line()
-
-                    elif hasattr(ta, 'is_indent'):
-                        # The current gtkTextTag is a indent
-                        indent = buff.get_text(start_it, end_it, True)
-
-                        if '\n' in indent:
-                            parent.appendChild(doc.createTextNode('\n'))
-
-                        it = end_it
-
-                    # We go out the tag context
-                    tag = None
-                    if not it.equal(end):
-                        it.backward_char()
-
-            if it.equal(end):
-                buffer_end = True
-            else:
-                it.forward_char()
+        self._append_items(snapshot, parent, doc)
 
         # Finishing with an \n before closing </content>
         if parent.localName == "content":
@@ -154,6 +105,102 @@ class Serializer():
         parent.normalize()
         return parent
 
+    def _append_items(self, items, parent, doc):
+        """ Add the items of a snapshot to the XML element parent """
+        for item in items:
+            if isinstance(item, str):
+                parent.appendChild(doc.createTextNode(item))
+            elif item[0] == 'tag':
+                nparent = doc.createElement("tag")
+                self._append_items(item[1], nparent, doc)
+                nparent.normalize()
+                parent.appendChild(nparent)
+            elif item[0] == 'subtask':
+                subt = doc.createElement('subtask')
+                subt.appendChild(doc.createTextNode(item[1]))
+                parent.appendChild(subt)
+
+    def _begins_known_tag(self, it):
+        """
+        Returns the known tag, not already processed, that begins at 'it'.
+        If there are several, the one with the highest priority is returned.
+        """
+        tag = None
+        for ta in it.get_toggled_tags(True):
+            if ta not in self.done and self.is_known_tag(ta):
+                if tag is None or ta.get_priority() > tag.get_priority():
+                    tag = ta
+        return tag
+
+    def _snapshot_range(self, buff, start, limit):
+        """
+        Returns the snapshot of the text between start and limit (excluded):
+        a list of strings, ('tag', items) and ('subtask', task id) tuples.
+
+        The buffer is walked from one tag toggle to the next: the text between
+        two toggles is copied at once, and adjacent text is gathered in a
+        single string.
+        """
+
+        it = start.copy()
+        items = []
+        text = []
+
+        def flush_text():
+            if text:
+                items.append(''.join(text))
+                text.clear()
+
+        while it.compare(limit) < 0:
+            tag = self._begins_known_tag(it)
+
+            if tag is None:
+                # We are not in a tag context: we copy the text until
+                # the next place where a tag could begin
+                run_end = it.copy()
+                run_end.forward_to_tag_toggle(None)
+                if run_end.compare(limit) > 0:
+                    run_end = limit.copy()
+                text.append(buff.get_slice(it, run_end, True))
+                it = run_end
+                continue
+
+            # We enter a tag context
+            self.done.add(tag)
+            tag_end = it.copy()
+            tag_end.forward_to_tag_toggle(tag)
+            if tag_end.compare(limit) > 0:
+                tag_end = limit.copy()
+
+            if hasattr(tag, 'is_tag'):
+                # The current gtkTextTag is a tag
+                # Recursive call
+                flush_text()
+                items.append(('tag', self._snapshot_range(buff, it, tag_end)))
+                it = tag_end
+
+            elif hasattr(tag, 'is_subtask'):
+                # The current gtkTextTag is a subtask
+                # The rest of its line is replaced by the subtask
+                flush_text()
+                items.append(('subtask', tag.child))
+                text.append("\n")
+                it.forward_line()
+
+            elif hasattr(tag, 'is_indent'):
+                # The current gtkTextTag is a indent
+                # Only its last character (the one after the bullet) and
+                # the line break it might contain are kept
+                indent_end = tag_end.copy()
+                indent_end.backward_char()
+                if '\n' in buff.get_text(it, indent_end, True):
+                    text.append('\n')
+                if indent_end.compare(it) > 0:
+                    it = indent_end
+
+        flush_text()
+        return items
+
 
 # Deserializing #########################################################
 # Deserialize : put all in the TextBuffer
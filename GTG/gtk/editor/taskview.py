@@ -36,6 +36,7 @@ from gi.repository import GObject, Gtk, Gdk, Pango
 from gettext import gettext as _
 from GTG.gtk.editor import serialize
 from GTG.core import urlregex
+from GTG.core.watchdog import main_loop_handler
 
 separators = [' ', ',', '\n', '\t', '!', '?', ';', '\0', '(', ')']
 # those separators are only separators if followed by a space. Else, they
@@ -133,6 +134,16 @@ class TaskView(Gtk.TextView):
                                               self._insert_at_cursor)
         self.delete_sigid = self.buff.connect("delete-range",
                                               self._delete_range)
+        # Marks around the text changed since the last call to modified().
+        # "changed" is emitted while the text is inserted or deleted, so
+        # the region has to be marked before.
+        self._dirty_start = None
+        self._dirty_end = None
+        self.buff.connect('insert-text', self._on_text_inserted)
+        self.buff.connect('delete-range', self._on_range_deleted)
+        # The anchor tag of each subtask. It stays in the buffer as long as
+        # the line of the subtask is not modified.
+        self._subtask_tags = {}
         self.connect('copy-clipboard', self.copy_clipboard, "copy")
         self.connect('cut-clipboard', self.copy_clipboard, "cut")
         self.connect('paste-clipboard', self.paste_clipboard)
@@ -381,12 +392,15 @@ class TaskView(Gtk.TextView):
                 i_e.forward_char()
             buff.move_mark(e, i_e)
             tex = buff.get_text(i_s, i_e, True)
+        # A subtask has a single anchor tag
+        self._remove_subtask_tag(buff, subtask)
         if len(tex) > 0:
             self.req.get_task(subtask).set_title(tex)
             texttag = self.create_anchor_tag(buff, subtask, text=tex,
                                              typ="subtask")
             texttag.is_subtask = True
             texttag.child = subtask
+            self._subtask_tags[subtask] = texttag
             # This one is for marks
             self.__apply_tag_to_mark(s, e, tag=texttag)
         else:
@@ -474,6 +488,11 @@ class TaskView(Gtk.TextView):
     # Get the complete serialized text
     # But without the title
     def get_text(self):
+        return self.serializer.serialize_snapshot(self.get_text_snapshot())
+
+    # Get a snapshot of the text, without the title, which can be serialized
+    # later (in another thread) with serializer.serialize_snapshot()
+    def get_text_snapshot(self):
         # we get the text
         start = self.buff.get_start_iter()
         start.forward_to_line_end()
@@ -485,10 +504,7 @@ class TaskView(Gtk.TextView):
         # we go to the next line, just after the title
         start.forward_line()
         end = self.buff.get_end_iter()
-        texte = self.serializer.serialize(
-            self.buff, self.buff, start, end, 1, None)
-
-        return texte
+        return self.serializer.snapshot(self.buff, start, end)
     # Get the title of the task (aka the first line of the buffer)
 
     def get_title(self):
@@ -510,6 +526,7 @@ class TaskView(Gtk.TextView):
 
     # PRIVATE FUNCTIONS #######################################################
     # This function is called so frequently that we should optimize it more.
+    @main_loop_handler('TaskView.modified')
     def modified(self, buff=None, full=False, refresheditor=True):
         """Called when the buffer has been modified.
 
@@ -522,7 +539,6 @@ class TaskView(Gtk.TextView):
             buff = self.buff
         cursor_mark = buff.get_insert()
         cursor_iter = buff.get_iter_at_mark(cursor_mark)
-        table = buff.get_tag_table()
         # This should be called only if we are on the title line
         # As an optimisation
         # But we should still get the title_end iter
@@ -531,16 +547,20 @@ class TaskView(Gtk.TextView):
             # It involves refreshing the whole task tree
             title_end = self._apply_title(buff, refresheditor)
 
+        dirty = self._pop_dirty_lines(buff)
         if full:
             local_start = title_end.copy()
             local_end = buff.get_end_iter()
+        elif dirty:
+            # We analyse only the lines modified since the last call
+            local_start, local_end = dirty
         else:
             # We analyse only the current line
             local_start = cursor_iter.copy()
             local_start.set_line(local_start.get_line())
             local_end = cursor_iter.copy()
             local_end.forward_lines(2)
-        # if full=False we detect tag only on the current line
+        # if full=False we detect tag only on the modified lines
 
         # The following 3 lines are a quick ugly fix for bug #359469
 #        temp = buff.get_iter_at_line(1)
@@ -550,27 +570,22 @@ class TaskView(Gtk.TextView):
         self._detect_tag(buff, local_start, local_end)
         self._detect_url(buff, local_start, local_end)
 
-        # subt_list = self.get_subtasks()
-        # First, we remove the olds tags
-        tag_list = []
-
-        def subfunc(texttag, data=None):
-            if hasattr(texttag, 'is_subtask'):
-                tag_list.append(texttag)
-
-        table.foreach(subfunc, None)
-        start, end = buff.get_bounds()
-        for t in tag_list:
-            buff.remove_tag(t, start, end)
-            table.remove(t)
-
-        # We apply the hyperlink tag to subtask
-        for s in self.get_subtasks():
+        # We apply the hyperlink tag to the subtasks. The tags of the
+        # subtasks out of the modified lines are still right.
+        subtasks = self.get_subtasks()
+        for s in list(self._subtask_tags):
+            if s not in subtasks:
+                self._remove_subtask_tag(buff, s)
+        for s in subtasks:
             start_mark = buff.get_mark(s)
             # "applying %s to %s - %s"%(s, start_mark, end_mark)
             if start_mark:
-                # In fact, the subtask mark always go to the end of line.
                 start_i = buff.get_iter_at_mark(start_mark)
+                if s in self._subtask_tags and \
+                        not self._in_lines(start_i, local_start, local_end):
+                    continue
+                self._remove_subtask_tag(buff, s)
+                # In fact, the subtask mark always go to the end of line.
                 if self._get_indent_level(start_i) > 0:
                     start_i.forward_to_line_end()
                     end_mark = buff.create_mark(f"/{s}", start_i, False)
@@ -578,13 +593,15 @@ class TaskView(Gtk.TextView):
                 else:
                     self.remove_subtask(s)
 
-        # Now we apply the tag tag to the marks
+        # Now we apply the tag tag to the marks of the modified lines
         for t in self.get_tagslist():
             start_mark = buff.get_mark(t)
             end_mark = buff.get_mark(f"/{t}")
             # "applying %s to %s - %s"%(t, start_mark, end_mark)
             if start_mark and end_mark:
-                self.apply_tag_tag(buff, t, start_mark, end_mark)
+                start_i = buff.get_iter_at_mark(start_mark)
+                if self._in_lines(start_i, local_start, local_end):
+                    self.apply_tag_tag(buff, t, start_mark, end_mark)
 
         # Ok, we took care of the modification
         self.buff.set_modified(False)
@@ -592,21 +609,87 @@ class TaskView(Gtk.TextView):
         if self.save_task:
             self.save_task()
 
+    def _on_text_inserted(self, buff, itera, text, length):
+        """ Marks the line where text is about to be inserted as modified.
+        The marks are moved by the insertion to surround the new text. """
+        self._mark_dirty(buff, itera, itera)
+
+    def _on_range_deleted(self, buff, start, end):
+        """ Marks the line where text is about to be deleted as modified """
+        self._mark_dirty(buff, start, end)
+
+    def _mark_dirty(self, buff, start, end):
+        """ Extends the region modified() has to analyse to start-end.
+
+        The region is kept with marks, so that it follows the next
+        modifications of the buffer.
+        """
+        if self._dirty_start is None:
+            self._dirty_start = buff.create_mark(None, start, True)
+            self._dirty_end = buff.create_mark(None, end, False)
+            return
+        if start.compare(buff.get_iter_at_mark(self._dirty_start)) < 0:
+            buff.move_mark(self._dirty_start, start)
+        if end.compare(buff.get_iter_at_mark(self._dirty_end)) > 0:
+            buff.move_mark(self._dirty_end, end)
+
+    def _pop_dirty_lines(self, buff):
+        """ Returns the iterators at the start and the end of the lines
+        modified since the last call, or None if nothing was modified """
+        if self._dirty_start is None:
+            return None
+        start = buff.get_iter_at_mark(self._dirty_start)
+        end = buff.get_iter_at_mark(self._dirty_end)
+        buff.delete_mark(self._dirty_start)
+        buff.delete_mark(self._dirty_end)
+        self._dirty_start = None
+        self._dirty_end = None
+
+        start.set_line_offset(0)
+        if not end.ends_line():
+            end.forward_to_line_end()
+        return start, end
+
+    @staticmethod
+    def _in_lines(itera, start, end):
+        """ Tells if itera is between start and end (included) """
+        return start.compare(itera) <= 0 and itera.compare(end) <= 0
+
+    def _remove_subtask_tag(self, buff, subtask):
+        """ Removes the anchor tag of a subtask from the buffer """
+        texttag = self._subtask_tags.pop(subtask, None)
+        if texttag is not None:
+            self._remove_anchor_tag(buff, texttag)
+
+    def _remove_anchor_tag(self, buff, texttag):
+        """ Forgets an anchor tag which isn't needed anymore """
+        # Removing it from the table also removes it from the buffer
+        buff.get_tag_table().remove(texttag)
+        if texttag in self.__tags:
+            self.__tags.remove(texttag)
+
     # Detect URL in the tasks
     # It's ugly...
     def _detect_url(self, buff, start, end):
-        # subt_list = self.get_subtasks()
-        # First, we remove the olds tags
-        tag_list = []
-        table = buff.get_tag_table()
-
-        def subfunc(texttag, data=None):
-            if hasattr(texttag, 'is_anchor'):
-                tag_list.append(texttag)
-
-        table.foreach(subfunc, None)
-        for t in tag_list:
+        # First, we remove the olds tags. Only the links toggled in the
+        # region are looked at: the subtasks are handled by modified().
+        links = {t for t in start.get_tags()
+                 if getattr(t, 'type', None) == 'http'}
+        started = set()
+        it = start.copy()
+        while it.compare(end) < 0:
+            for t in it.get_toggled_tags(True):
+                if getattr(t, 'type', None) == 'http':
+                    started.add(t)
+            if not it.forward_to_tag_toggle(None):
+                break
+        for t in links | started:
             buff.remove_tag(t, start, end)
+        # The links that were only in this region are not used anymore
+        for t in started:
+            it = start.copy()
+            if not it.forward_to_tag_toggle(t):
+                self._remove_anchor_tag(buff, t)
         # Now we add the tag URL
         it = start.copy()
         prev = start.copy()
@@ -18,11 +18,15 @@
 
 """ Tag completion which is connected to LibLarch """
 
+from bisect import bisect_left
 from gi.repository import Gtk
 import unicodedata
 
 FILTER_NAME = '@@TagCompletion'
 
+# Greater than any character: the end of a range of prefix matches
+_LAST_CHAR = chr(0x10ffff)
+
 
 def tag_filter(tag, parameters=None):
     """ Show only regular tags which has some active tasks or the user has
@@ -40,20 +44,29 @@ def normalize_unicode(string):
     return unicodedata.normalize('NFC', str(string))
 
 
-def tag_match(completion, key, iterator, column):
-    """ Does key match an item in the list?
+def get_match_key(text):
+    """ Returns the key which the tags must start with to match text, or
+    None if no tag should match.
 
     Don't match any item if only artefacts (!, @) are inserted
     (don't show all tags) """
-
-    key = key.lower().lstrip()
+    key = normalize_unicode(text.lower()).lstrip()
     if key in ['', '!', '@', '!@']:
+        return None
+    return key
+
+
+def tag_match(completion, key, iterator, column):
+    """ Does key match an item in the list?
+
+    The model only holds the variants matching the text of the entry, but
+    GTK passes the raw text: leading whitespace must be ignored here too. """
+    key = get_match_key(key)
+    if key is None:
         return False
 
     text = completion.get_model().get_value(iterator, column)
-    text = normalize_unicode(text.lower())
-
-    return text.startswith(key)
+    return normalize_unicode(text.lower()).startswith(key)
 
 
 class TagCompletion(Gtk.EntryCompletion):
@@ -63,7 +76,10 @@ class TagCompletion(Gtk.EntryCompletion):
        The user can choose wheter write tag with or without '@',
        with or without '!' which is used for negation.
 
-       The list of tasks is updated by LibLarch callbacks """
+       The list of tasks is updated by LibLarch callbacks. All the variants
+       are kept in a sorted index, and the model of the completion only
+       holds the variants starting with the text of the entry: GTK doesn't
+       need to call back Python to match each row. """
 
     def __init__(self, tree):
         """ Initialize entry completion
@@ -72,14 +88,22 @@ class TagCompletion(Gtk.EntryCompletion):
         kept updated. """
         super().__init__()
 
+        # Sorted (lower case name, name) of all the variants
+        self._index = []
+        # Variants matching the current key
         self.tags = Gtk.ListStore(str)
+        self._key = None
+        self._populating = True
 
         tree = tree.get_basetree()
         tree.add_filter(FILTER_NAME, tag_filter, {'flat': True})
         tag_tree = tree.get_viewtree('tag_completion', False)
         tag_tree.register_cllbck('node-added-inview', self._on_tag_added)
         tag_tree.register_cllbck('node-deleted-inview', self._on_tag_deleted)
+        # The tags already there are indexed in one go
         tag_tree.apply_filter(FILTER_NAME)
+        self._index = sorted(set(self._index))
+        self._populating = False
 
         self.set_model(self.tags)
         self.set_text_column(0)
@@ -88,18 +112,52 @@ class TagCompletion(Gtk.EntryCompletion):
         self.set_inline_selection(True)
         self.set_popup_single_match(False)
 
+    def attach_to_entry(self, entry):
+        """ Completes the text of entry """
+        entry.set_completion(self)
+        entry.connect('changed', self._on_entry_changed)
+
+    def _on_entry_changed(self, entry):
+        """ Fills the model with the variants matching the new text.
+
+        GTK filters the model after a timeout, so it is up to date by
+        then """
+        key = get_match_key(entry.get_text())
+        if key != self._key:
+            self._key = key
+            self._update_matches()
+
+    def get_matches(self, key):
+        """ Returns the variants starting with key, in lower case """
+        start = bisect_left(self._index, (key, ))
+        end = bisect_left(self._index, (key + _LAST_CHAR, ))
+        return [name for _, name in self._index[start:end]]
+
+    def _update_matches(self):
+        self.tags.clear()
+        if self._key is not None:
+            for name in self.get_matches(self._key):
+                self.tags.append((name, ))
+
+    def _matches_key(self, name):
+        if self._key is None:
+            return False
+        return normalize_unicode(name.lower()).startswith(self._key)
+
     def _try_insert(self, name):
-        """ Insert an item into ListStore if it is not already there.
-        It keeps the list sorted. """
-        position = 0
-        for position, row in enumerate(self.tags, 1):
-            if row[0] == name:
-                # already there
-                return
-            elif row[0] > name:
-                position -= 1
-                break
-        self.tags.insert(position, (name, ))
+        """ Insert an item into the index if it is not already there.
+        It keeps the index sorted. """
+        item = (normalize_unicode(name.lower()), name)
+        if self._populating:
+            self._index.append(item)
+            return
+        position = bisect_left(self._index, item)
+        if position < len(self._index) and self._index[position] == item:
+            # already there
+            return
+        self._index.insert(position, item)
+        if self._matches_key(name):
+            self._update_matches()
 
     def _on_tag_added(self, tag, path):
         """ Add all variants of tag """
@@ -110,11 +168,17 @@ class TagCompletion(Gtk.EntryCompletion):
         self._try_insert('!' + tag[1:])
 
     def _try_delete(self, name):
-        """ Delete an item if it is in the list """
-        for row in self.tags:
-            if row[0] == name:
-                self.tags.remove(row.iter)
-                break
+        """ Delete an item if it is in the index """
+        item = (normalize_unicode(name.lower()), name)
+        if self._populating:
+            if item in self._index:
+                self._index.remove(item)
+            return
+        position = bisect_left(self._index, item)
+        if position < len(self._index) and self._index[position] == item:
+            del self._index[position]
+            if self._matches_key(name):
+                self._update_matches()
 
     def _on_tag_deleted(self, tag, path):
         """ Delete all variants of tag """
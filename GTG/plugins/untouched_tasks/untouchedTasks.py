@@ -14,11 +14,10 @@
 # You should have received a copy of the GNU General Public License along with
 # this program.  If not, see <http://www.gnu.org/licenses/>.
 
-from threading import Timer
 import datetime
 import os
 
-from gi.repository import Gtk
+from gi.repository import GLib, Gtk
 
 from GTG.core.logger import log
 
@@ -68,6 +67,9 @@ class UntouchedTasksPlugin():
         # preferences initialization
         self.is_automatic = False
         self.timer = None
+        # (tag name, max days, cutoff) of the last automatic run: the next
+        # one only looks at the tasks untouched since that cutoff
+        self.last_run = None
         self.preferences_load()
         self.preferences_apply()
         # add menu item
@@ -78,6 +80,7 @@ class UntouchedTasksPlugin():
         Deactivates the plugin.
         """
         plugin_api.remove_menu_item(self.menu_item)
+        self.cancel_autopurge()
 
 # HELPER FUNCTIONS ############################################################
     def __log(self, message):
@@ -85,18 +88,29 @@ class UntouchedTasksPlugin():
 
 # CORE FUNCTIONS ##############################################################
     def schedule_autopurge(self):
-        self.timer = Timer(self.TIME_BETWEEN_PURGES,
-                           self.add_untouched_tag)
-        self.timer.setDaemon(True)
-        self.timer.start()
+        self.timer = GLib.timeout_add_seconds(self.TIME_BETWEEN_PURGES,
+                                              self.autopurge)
         self.__log("Automatic untouched tasks check scheduled")
 
     def cancel_autopurge(self):
         if self.timer:
             self.__log("Automatic untouched tasks check cancelled")
-            self.timer.cancel()
+            GLib.source_remove(self.timer)
+            self.timer = None
 
-    def add_untouched_tag(self, widget=None):
+    def autopurge(self):
+        """ Periodic run, in the main loop """
+        self.timer = None
+        self.add_untouched_tag(incremental=True)
+        return False
+
+    def add_untouched_tag(self, widget=None, incremental=False):
+        """ Tags the closed tasks not modified for max_days.
+
+        @param incremental: if True, only the tasks which got past the
+                            threshold since the last automatic run are
+                            looked at
+        """
         # If no tag is picked up from preferences
         tag_name = self.pref_tag_name.get_text()
         if not tag_name:
@@ -107,25 +121,29 @@ class UntouchedTasksPlugin():
             tag_name = '@' + tag_name
 
         self.__log("Starting process for adding " + tag_name)
-        today = datetime.datetime.now()
         max_days = self.preferences["max_days"]
+        cutoff = datetime.datetime.now() - datetime.timedelta(days=max_days)
+        since = None
+        if incremental and self.last_run is not None:
+            last_tag_name, last_max_days, last_cutoff = self.last_run
+            if (last_tag_name, last_max_days) == (tag_name, max_days):
+                since = last_cutoff
+        self.last_run = (tag_name, max_days, cutoff)
+
+        # Closed tasks whose last modification is older than the cutoff
         requester = self.plugin_api.get_requester()
-        closed_tree = requester.get_tasks_tree(name='inactive')
-        closed_tasks = [requester.get_task(tid) for tid in
-                        closed_tree.get_all_nodes()]
-
-        # Add untouched tag to all tasks where new_date < time now
-        for task in closed_tasks:
-            modified_time = task.get_modified()
-            new_time = modified_time + datetime.timedelta(days=max_days)
-            if new_time < today:
+        untouched = []
+        for tid in requester.get_tasks_modified_before(cutoff, since=since):
+            task = requester.get_task(tid)
+            if task.get_status() != task.STA_ACTIVE:
                 self.__log('Adding ' + tag_name + ' tag to: "' + task.title +
                            '" as last time it was modified was ' +
-                           str(modified_time))
-                task.add_tag(tag_name)
+                           str(task.get_modified()))
+                untouched.append(tid)
+        requester.add_tag_to_tasks(untouched, tag_name)
 
         # If automatic purging is on, schedule another run
-        if self.is_automatic:
+        if self.is_automatic and self.timer is None:
             self.schedule_autopurge()
 
 # Preferences methods #########################################################
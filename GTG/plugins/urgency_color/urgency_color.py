@@ -14,6 +14,7 @@
 # You should have received a copy of the GNU General Public License along with
 # this program.  If not, see <http://www.gnu.org/licenses/>.
 
+from datetime import date
 from math import ceil
 from gi.repository import Gtk
 from gi.repository import Gdk
@@ -31,10 +32,23 @@ class UrgencyColorPlugin():
         'color_normal': '#ffed84',
         'color_high': '#ff9784',
         'color_overdue': '#b8b8b8'}
+    # Number of steps of the precomputed gradients
+    GRADIENT_STEPS = 256
 
     def __init__(self):
         self._plugin_api = None
         self.req = None
+        self._gradients = {}
+        self._callbacks = []
+        # Cache of the urgency of the tasks, valid for the day _cache_day:
+        #   _colors: tid -> color of the task itself
+        #   _urgencies: tid -> (days left, tid) of the most urgent active
+        #                      descendant with a due date, or None
+        #   _parents: tid -> parents of the task when it was cached
+        self._colors = {}
+        self._urgencies = {}
+        self._parents = {}
+        self._cache_day = None
 
     def activate(self, plugin_api):
         """ Plugin is activated """
@@ -42,12 +56,37 @@ class UrgencyColorPlugin():
         self.req = self._plugin_api.get_requester()
         self.prefs_load()
         self.prefs_init()
+        main_view = self.req.get_main_view()
+        for event in ('node-added', 'node-modified', 'node-deleted'):
+            handle = main_view.register_cllbck(event, self._on_task_changed)
+            self._callbacks.append((event, handle))
         # Set color function
         self._refresh_task_color()
 
     def _refresh_task_color(self):
+        self._build_gradients()
+        self.clear_cache()
         self._plugin_api.set_bgcolor_func(self.bgcolor)
 
+    def _build_gradients(self):
+        """ Precomputes the gradients from low to normal urgency and from
+        normal to high urgency, from the preferences """
+        self._gradients = {}
+        for pair in ((0, 1), (1, 2)):
+            color1 = Gdk.color_parse(self._get_color(pair[0]))
+            color2 = Gdk.color_parse(self._get_color(pair[1]))
+            self._gradients[pair] = [
+                self._get_gradient_color(color1, color2,
+                                         step / self.GRADIENT_STEPS)
+                for step in range(self.GRADIENT_STEPS + 1)]
+
+    def _get_gradient(self, colindex1, colindex2, position):
+        """ Returns the color at position (from 0 to 1) in the precomputed
+        gradient from colindex1 to colindex2 """
+        gradient = self._gradients[(colindex1, colindex2)]
+        step = round(position * self.GRADIENT_STEPS)
+        return gradient[min(max(step, 0), self.GRADIENT_STEPS)]
+
     def _get_color(self, colindex):
         if colindex == 0:
             return self._pref_data['color_low']
@@ -64,8 +103,6 @@ class UrgencyColorPlugin():
         """This function returns a string in the hexadecimal form of Gdk.Color
         which corresponds to the position (a float value from 0 to 1) in the
         gradient formed by color1 & color2, both of type Gdk.Color"""
-        color1 = Gdk.color_parse(color1)
-        color2 = Gdk.color_parse(color2)
         R1, G1, B1 = color1.red, color1.green, color1.blue
         R2, G2, B2 = color2.red, color2.green, color2.blue
         R = R1 + (R2 - R1) * position
@@ -130,17 +167,13 @@ class UrgencyColorPlugin():
                 # Has to be float so division by it is non-zero
                 steps = float(grad_half_dayspan)
                 step = grad_half_dayspan - (daysleft - reddays)
-                color = self._get_gradient_color(self._get_color(1),
-                                                 self._get_color(2),
-                                                 step / steps)
+                color = self._get_gradient(1, 2, step / steps)
             elif daysleft <= dayspan:
                 # Gradient CL to CN
                 steps = float(grad_half_dayspan)
                 step = grad_half_dayspan - (daysleft -
                                             reddays - grad_half_dayspan)
-                color = self._get_gradient_color(self._get_color(0),
-                                                 self._get_color(1),
-                                                 step / steps)
+                color = self._get_gradient(0, 1, step / steps)
 
             return color
 
@@ -149,41 +182,90 @@ class UrgencyColorPlugin():
             return None
 
     def bgcolor(self, node, standard_color):
-        color = self.get_node_bgcolor(node)
-
-        def __get_active_child_list(node):
-            """ This function recursively fetches a list
-            of all the children of a task which are active
-            (i.e - the subtasks which are not marked as 'Done' or 'Dismissed'
-            """
-            child_list = []
-            for child_id in node.children:
-                child = node.req.get_task(child_id)
-                child_list += __get_active_child_list(child)
-                if child.get_status() in [child.STA_ACTIVE]:
-                    child_list.append(child_id)
-            return child_list
-
-        child_list = __get_active_child_list(node)
-
-        daysleft = None
-        for child_id in child_list:
+        """ Returns the color of the most urgent active descendant of the
+        task which has a due date, or the color of the task itself """
+        today = date.today()
+        if today != self._cache_day:
+            # Days left and fuzzy dates change at midnight
+            self.clear_cache()
+            self._cache_day = today
+
+        urgency = self._get_descendants_urgency(node)
+        if urgency is not None:
+            node = self.req.get_task(urgency[1])
+        return self._get_task_color(node)
+
+    def _get_task_color(self, node):
+        """ Returns get_node_bgcolor(node), cached """
+        tid = node.get_id()
+        try:
+            return self._colors[tid]
+        except KeyError:
+            color = self._colors[tid] = self.get_node_bgcolor(node)
+            return color
+
+    def _get_descendants_urgency(self, node):
+        """ Returns (days left, tid) for the active descendant of the task
+        with the nearest due date, or None if there isn't any.
+
+        The descendants are walked depth first, each child after its own
+        descendants, and the first of several equally urgent tasks wins.
+        """
+        tid = node.get_id()
+        try:
+            return self._urgencies[tid]
+        except KeyError:
+            pass
+
+        urgency = None
+        for child_id in node.children:
             child = self.req.get_task(child_id)
-            if child.get_due_date() == Date.no_date():
+            candidates = [self._get_descendants_urgency(child)]
+            if (child.get_status() == child.STA_ACTIVE and
+                    child.get_due_date() != Date.no_date()):
+                candidates.append((child.get_due_date().days_left(),
+                                   child_id))
+            for candidate in candidates:
+                if candidate is None:
+                    continue
+                if urgency is None or candidate[0] < urgency[0]:
+                    urgency = candidate
+
+        self._urgencies[tid] = urgency
+        self._parents[tid] = tuple(node.get_parents())
+        return urgency
+
+    def clear_cache(self):
+        """ Forgets the urgency of all the tasks """
+        self._colors.clear()
+        self._urgencies.clear()
+        self._parents.clear()
+
+    def _on_task_changed(self, tid, path=None):
+        """ Forgets the urgency of a modified task and of its ancestors,
+        the colors of which may come from the task """
+        pending = [tid]
+        done = set()
+        while pending:
+            tid = pending.pop()
+            if tid in done:
                 continue
-
-            daysleft_of_child = child.get_due_date().days_left()
-            if daysleft is None:
-                daysleft = daysleft_of_child
-                color = self.get_node_bgcolor(child)
-            elif daysleft_of_child < daysleft:
-                daysleft = daysleft_of_child
-                color = self.get_node_bgcolor(child)
-
-        return color
+            done.add(tid)
+            self._colors.pop(tid, None)
+            self._urgencies.pop(tid, None)
+            # The task may have been removed from its former parents
+            parents = set(self._parents.pop(tid, ()))
+            if self.req.has_task(tid):
+                parents.update(self.req.get_task(tid).get_parents())
+            pending.extend(parents)
 
     def deactivate(self, plugin_api):
         """ Plugin is deactivated """
+        main_view = self.req.get_main_view()
+        for event, handle in self._callbacks:
+            main_view.deregister_cllbck(event, handle)
+        self._callbacks = []
+        self.clear_cache()
         self._plugin_api.set_bgcolor_func()
 
 # Preferences dialog
@@ -0,0 +1,141 @@
+# -----------------------------------------------------------------------------
+# Getting Things GNOME! - a personal organizer for the GNOME desktop
+# Copyright (c) 2008-2013 - Lionel Dricot & Bertrand Rousseau
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+
+"""
+Runs the benchmarks, saves the results as JSON and compares them with a
+baseline.
+
+    python3 -m tests.benchmarks --size 5000 --output results.json
+    python3 -m tests.benchmarks --save-baseline
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+
+BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        prog='python3 -m tests.benchmarks',
+        description='Headless benchmarks of GTG core')
+    parser.add_argument('--size', type=int, default=1000,
+                        help='number of tasks')
+    parser.add_argument('--depth', type=int, default=3,
+                        help='maximum depth of the task tree')
+    parser.add_argument('--subtask-ratio', type=float, default=0.4,
+                        help='proportion of tasks which have a parent')
+    parser.add_argument('--tags', type=int, default=30,
+                        help='number of distinct tags')
+    parser.add_argument('--tags-per-task', type=float, default=1.5,
+                        help='average number of tags of a task')
+    parser.add_argument('--content-length', type=int, default=200,
+                        help='average length of the task contents')
+    parser.add_argument('--closed-ratio', type=float, default=0.3,
+                        help='proportion of closed tasks')
+    parser.add_argument('--profile',
+                        help='generate tasks following distributions saved '
+                             'by tests.benchmarks.generate, instead of the '
+                             'tree parameters above')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='seed of the task generator')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='number of timed runs of each case')
+    parser.add_argument('--output', help='file where to write the results')
+    parser.add_argument('--baseline', default=BASELINE,
+                        help='results to compare with (default: %(default)s)')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='store the results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='slowdown regarded as a regression '
+                             '(default: %(default)s)')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    # Keep GTG away from the folders of the user
+    home = tempfile.mkdtemp(prefix='gtg-benchmark-home-')
+    for variable in ('XDG_DATA_HOME', 'XDG_CONFIG_HOME', 'XDG_CACHE_HOME'):
+        os.environ[variable] = os.path.join(home, variable.lower())
+
+    from tests.benchmarks import suite
+    from tests.benchmarks.synthetic import (LearnedTasks, SyntheticTasks,
+                                            TaskFileProfile)
+
+    parameters = {
+        'size': args.size,
+        'depth': args.depth,
+        'subtask_ratio': args.subtask_ratio,
+        'tags': args.tags,
+        'tags_per_task': args.tags_per_task,
+        'content_length': args.content_length,
+        'closed_ratio': args.closed_ratio,
+        'seed': args.seed,
+        'repeat': args.repeat,
+    }
+    if args.profile:
+        parameters['profile'] = os.path.abspath(args.profile)
+        synthetic = LearnedTasks(TaskFileProfile.load(args.profile),
+                                 size=args.size, seed=args.seed)
+    else:
+        synthetic = SyntheticTasks(**{key: value
+                                      for key, value in parameters.items()
+                                      if key != 'repeat'})
+    benchmark = suite.Benchmark(synthetic, repeat=args.repeat)
+    try:
+        results = benchmark.run()
+    finally:
+        benchmark.close()
+    report = suite.get_report(results, parameters)
+
+    print(f'{"case":<32} {"min (ms)":>10} {"mean (ms)":>10} {"peak (KiB)":>11}')
+    for name, result in results.items():
+        print(f'{name:<32} {result["min"] * 1000:>10.2f} '
+              f'{result["mean"] * 1000:>10.2f} '
+              f'{result["peak_memory"] / 1024:>11.0f}')
+
+    if args.output:
+        suite.save_report(report, args.output)
+    if args.save_baseline:
+        suite.save_report(report, args.baseline)
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f'\nNo baseline in {args.baseline}, use --save-baseline')
+        return 0
+
+    baseline = suite.load_report(args.baseline)
+    if baseline['parameters'] != parameters:
+        print('\nWarning: the baseline was run with other parameters')
+
+    regressions = 0
+    print(f'\n{"case":<32} {"baseline":>10} {"current":>10} {"ratio":>7}')
+    for name, old, new, ratio, regression in suite.compare(
+            report, baseline, args.tolerance):
+        regressions += regression
+        print(f'{name:<32} {old * 1000:>10.2f} {new * 1000:>10.2f} '
+              f'{ratio:>7.2f}{"  REGRESSION" if regression else ""}')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
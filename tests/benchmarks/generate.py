@@ -0,0 +1,89 @@
+# -----------------------------------------------------------------------------
+# Getting Things GNOME! - a personal organizer for the GNOME desktop
+# Copyright (c) 2008-2013 - Lionel Dricot & Bertrand Rousseau
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+
+"""
+Generates task files for benchmarks and load tests.
+
+    python3 -m tests.benchmarks.generate --learn gtg_tasks.xml \
+        --save-profile profile.json
+    python3 -m tests.benchmarks.generate --profile profile.json \
+        --size 100000 --seed 1 --output-dir fixtures
+
+Learn from an anonymized file (see scripts/anonymize_task_file.py): only
+the distributions are kept, but it is better not to share them otherwise.
+"""
+
+import argparse
+from datetime import datetime
+import os
+import sys
+
+from tests.benchmarks.synthetic import (LearnedTasks, SyntheticTasks,
+                                        TaskFileProfile)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog='python3 -m tests.benchmarks.generate',
+        description='Generates gtg_tasks.xml and tags.xml files')
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--learn', metavar='TASK_FILE',
+                        help='task file to learn the distributions from')
+    source.add_argument('--profile', help='distributions saved with '
+                                          '--save-profile')
+    parser.add_argument('--save-profile', metavar='PROFILE',
+                        help='file where to save the learned distributions')
+    parser.add_argument('--size', type=int, default=1000,
+                        help='number of tasks (default: %(default)s)')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='seed of the generator (default: %(default)s)')
+    parser.add_argument('--today', default='2020-01-01',
+                        help='date the dates are spread around, for '
+                             'reproducible files (default: %(default)s)')
+    parser.add_argument('--output-dir', default='.',
+                        help='folder where to write the files')
+    args = parser.parse_args()
+
+    today = datetime.strptime(args.today, '%Y-%m-%d').date()
+    if args.learn:
+        profile = TaskFileProfile.from_task_file(args.learn)
+    elif args.profile:
+        profile = TaskFileProfile.load(args.profile)
+    else:
+        profile = None
+
+    if args.save_profile:
+        if profile is None:
+            parser.error('--save-profile needs --learn')
+        profile.save(args.save_profile)
+
+    if profile is None:
+        tasks = SyntheticTasks(size=args.size, seed=args.seed, today=today)
+    else:
+        tasks = LearnedTasks(profile, size=args.size, seed=args.seed,
+                             today=today)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    tasks.write_tasks(os.path.join(args.output_dir, 'gtg_tasks.xml'))
+    tasks.write_tags(os.path.join(args.output_dir, 'tags.xml'))
+    print(f'Wrote {len(tasks.get_tasks())} tasks to {args.output_dir}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
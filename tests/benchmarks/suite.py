@@ -0,0 +1,287 @@
+# -----------------------------------------------------------------------------
+# Getting Things GNOME! - a personal organizer for the GNOME desktop
+# Copyright (c) 2008-2013 - Lionel Dricot & Bertrand Rousseau
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+
+"""
+Benchmarks of GTG core on a synthetic task tree
+
+GTG.core.dirs must point to a throwaway folder before this module is
+imported: see __main__.py.
+"""
+
+from datetime import date, timedelta
+import gc
+import json
+import os
+import platform
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+from GTG.backends import BackendFactory
+from GTG.core import cleanxml, taskxml
+from GTG.core.datastore import DataStore
+from GTG.core.dates import Date
+from GTG.core.dirs import TAGS_XMLFILE
+from GTG.core.search import parse_search_query, search_filter
+
+SEARCH_QUERIES = [
+    'lorem',
+    '@tag0',
+    '@tag1 !or @tag5',
+    '!not @tag0 ipsum',
+    '!today',
+    '!before tomorrow',
+    '!notag',
+    '"dolor sit"',
+]
+
+
+class Benchmark():
+    """
+    Loads a synthetic task file in a DataStore and times operations on it.
+
+    Each case runs `repeat` times to measure its duration, then once more
+    with tracemalloc to measure the peak of memory it allocates.
+    """
+
+    def __init__(self, synthetic, repeat=3):
+        """
+        @param synthetic: a SyntheticTasks describing the task tree
+        @param repeat: how many times each case is timed
+        """
+        self.synthetic = synthetic
+        self.repeat = repeat
+        self.results = {}
+        self.datastore = None
+        self._tmpdir = tempfile.mkdtemp(prefix='gtg-benchmark-')
+        self._tasks_path = os.path.join(self._tmpdir, 'gtg_tasks.xml')
+        synthetic.write_tasks(self._tasks_path)
+        os.makedirs(os.path.dirname(TAGS_XMLFILE), exist_ok=True)
+        synthetic.write_tags(TAGS_XMLFILE)
+
+    def close(self):
+        self.unload()
+        shutil.rmtree(self._tmpdir, ignore_errors=True)
+
+    def unload(self):
+        """ Stops the backends of the current DataStore """
+        if self.datastore is not None:
+            self.datastore.save(quit=True)
+            self.datastore = None
+
+    def measure(self, name, function, setup=None):
+        """ Times function() and records its peak memory as `name`
+
+        @param function: the case, called with the number of the run
+        @param setup: an optional function called before every run, which
+                      is not timed
+        """
+        timings = []
+        for run in range(self.repeat):
+            if setup is not None:
+                setup()
+            gc.collect()
+            start = time.perf_counter()
+            function(run)
+            timings.append(time.perf_counter() - start)
+
+        if setup is not None:
+            setup()
+        gc.collect()
+        tracemalloc.start()
+        try:
+            function(self.repeat)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        self.results[name] = {
+            'min': min(timings),
+            'mean': sum(timings) / len(timings),
+            'runs': len(timings),
+            'peak_memory': peak,
+        }
+        return self.results[name]
+
+    # Cases ###################################################################
+    def load(self, run=0):
+        """ Parses the task file and fills a new DataStore """
+        datastore = DataStore()
+        backend_dic = BackendFactory().get_new_backend_dict(
+            'backend_localfile', {'path': self._tasks_path})
+        datastore.register_backend(backend_dic)
+        self.datastore = datastore
+
+    def save(self, run=0):
+        """ Serializes all the tasks and writes the task file """
+        doc, xmlproj = cleanxml.emptydoc('project')
+        tasks = self.datastore.get_tasks_tree()
+        for tid in self.datastore.get_all_tasks():
+            xmlproj.appendChild(taskxml.task_to_xml(doc, tasks.get_node(tid)))
+        cleanxml.savexml(os.path.join(self._tmpdir, 'saved.xml'), doc)
+
+    def save_tags(self, run=0):
+        self.datastore.save_tagtree()
+
+    def search(self, query):
+        """ Returns a case matching every task against a search query """
+        parameters = parse_search_query(query)
+
+        def case(run=0):
+            tasks = self.datastore.get_tasks_tree()
+            for tid in self.datastore.get_all_tasks():
+                search_filter(tasks.get_node(tid), parameters)
+        return case
+
+    def refresh_filter(self, filter_name):
+        """ Returns a case applying a filter to a new view of the tasks """
+
+        def case(run=0):
+            tasks = self.datastore.get_tasks_tree()
+            view = tasks.get_viewtree(refresh=False)
+            view.apply_filter(filter_name, refresh=True)
+            view.get_n_nodes()
+        return case
+
+    def count_tags(self, run=0):
+        requester = self.datastore.get_requester()
+        for tag_name in requester.get_all_tags():
+            requester.get_tag(tag_name).get_active_tasks_count()
+
+    def propagate_due_dates(self, run=0):
+        """ Moves the due date of the root tasks earlier: the due dates of
+        their subtasks are moved too """
+        tasks = self.datastore.get_tasks_tree()
+        due = date.today() - timedelta(days=run + 1)
+        for tid in self.datastore.get_all_tasks():
+            task = tasks.get_node(tid)
+            if not task.has_parent() and task.has_child():
+                task.set_due_date(due)
+
+    def urgency_color(self, cached):
+        """ Returns a case computing the urgency color of every task like
+        the Urgency Color plugin does when the task list is drawn
+
+        @param cached: False to use the recursion the plugin did before
+                       caching the urgency of the tasks
+        """
+        from GTG.plugins.urgency_color.urgency_color import UrgencyColorPlugin
+
+        plugin = UrgencyColorPlugin()
+        plugin.req = self.datastore.get_requester()
+        plugin._pref_data = dict(plugin.DEFAULT_PREFS)
+        plugin._build_gradients()
+        bgcolor = plugin.bgcolor if cached else _recursive_bgcolor(plugin)
+
+        def case(run=0):
+            tasks = self.datastore.get_tasks_tree()
+            for tid in self.datastore.get_all_tasks():
+                bgcolor(tasks.get_node(tid), None)
+        return case, plugin
+
+    def run(self):
+        """ Runs all the cases, in an order where each one has the data it
+        needs, and returns the results """
+        self.measure('load', self.load, setup=self.unload)
+        self.measure('save', self.save)
+        self.measure('save_tags', self.save_tags)
+        for query in SEARCH_QUERIES:
+            self.measure(f'search {query}', self.search(query))
+        for filter_name in ('workview', 'active', 'closed', '@tag0'):
+            self.measure(f'refresh {filter_name}',
+                         self.refresh_filter(filter_name))
+        self.measure('count_tags', self.count_tags)
+        self.measure('propagate_due_dates', self.propagate_due_dates)
+
+        case, _ = self.urgency_color(cached=False)
+        self.measure('urgency_color recursive', case)
+        case, plugin = self.urgency_color(cached=True)
+        self.measure('urgency_color cold', case, setup=plugin.clear_cache)
+        self.measure('urgency_color warm', case)
+        return self.results
+
+
+def _recursive_bgcolor(plugin):
+    """ Returns the bgcolor function of the Urgency Color plugin as it was
+    before the cache: the active descendants of a task are collected again
+    each time it is drawn """
+
+    def get_active_children(node):
+        children = []
+        for child_id in node.children:
+            child = node.req.get_task(child_id)
+            children += get_active_children(child)
+            if child.get_status() == child.STA_ACTIVE:
+                children.append(child_id)
+        return children
+
+    def bgcolor(node, standard_color):
+        color = plugin.get_node_bgcolor(node)
+        daysleft = None
+        for child_id in get_active_children(node):
+            child = plugin.req.get_task(child_id)
+            if child.get_due_date() == Date.no_date():
+                continue
+            daysleft_of_child = child.get_due_date().days_left()
+            if daysleft is None or daysleft_of_child < daysleft:
+                daysleft = daysleft_of_child
+                color = plugin.get_node_bgcolor(child)
+        return color
+    return bgcolor
+
+
+def get_report(results, parameters):
+    """ Returns the results and how they were obtained, to save as JSON """
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'parameters': parameters,
+        'results': results,
+    }
+
+
+def compare(report, baseline, tolerance=0.2):
+    """
+    Compares the results of two reports.
+
+    @param tolerance: how much slower than the baseline a case may be
+                      before being a regression (0.2 = 20%)
+    @returns: a list of (case, baseline min, current min, ratio,
+              is regression) tuples
+    """
+    comparison = []
+    for name, result in report['results'].items():
+        old = baseline['results'].get(name)
+        if old is None or old['min'] <= 0:
+            continue
+        ratio = result['min'] / old['min']
+        comparison.append((name, old['min'], result['min'], ratio,
+                           ratio > 1 + tolerance))
+    return comparison
+
+
+def save_report(report, path):
+    with open(path, 'w') as report_file:
+        json.dump(report, report_file, indent=2, sort_keys=True)
+
+
+def load_report(path):
+    with open(path) as report_file:
+        return json.load(report_file)
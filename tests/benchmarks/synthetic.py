@@ -0,0 +1,456 @@
+# -----------------------------------------------------------------------------
+# Getting Things GNOME! - a personal organizer for the GNOME desktop
+# Copyright (c) 2008-2013 - Lionel Dricot & Bertrand Rousseau
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+
+"""
+Synthetic task files for the benchmarks and load tests
+
+SyntheticTasks generates a task tree from a few parameters. LearnedTasks
+generates one following the distributions of a real (anonymized) task file,
+stored in a TaskFileProfile.
+"""
+
+from collections import Counter
+from datetime import date, datetime, timedelta
+import json
+import random
+import uuid
+import xml.dom.minidom
+import xml.sax.saxutils as saxutils
+
+from GTG.core import taskxml
+
+WORDS = ("lorem ipsum dolor sit amet consectetur adipiscing elit sed do "
+         "eiusmod tempor incididunt ut labore et dolore magna aliqua ut enim "
+         "ad minim veniam quis nostrud exercitation ullamco laboris nisi "
+         "aliquip ex ea commodo consequat").split()
+
+
+class SyntheticTasks():
+    """
+    Generates a random task tree, the same one for a given seed.
+
+    Titles and contents are made of random words. Tags follow a Zipf-like
+    distribution: a few tags are used by many tasks, most by a few.
+    """
+
+    def __init__(self, size=1000, depth=3, subtask_ratio=0.4, tags=30,
+                 tags_per_task=1.5, content_length=200, closed_ratio=0.3,
+                 due_ratio=0.5, seed=0, today=None):
+        """
+        @param size: the number of tasks
+        @param depth: the maximum depth of a task in the tree (1: no subtasks)
+        @param subtask_ratio: the proportion of tasks which have a parent
+        @param tags: the number of distinct tags
+        @param tags_per_task: the average number of tags of a task
+        @param content_length: the average length of the contents, in
+                               characters
+        @param closed_ratio: the proportion of Done or Dismissed tasks
+        @param due_ratio: the proportion of tasks with a due date
+        @param seed: the seed of the random generator
+        @param today: the date the dates are spread around
+        """
+        self.size = size
+        self.depth = depth
+        self.subtask_ratio = subtask_ratio
+        self.tag_names = [f'@tag{i}' for i in range(tags)]
+        self.tags_per_task = tags_per_task
+        self.content_length = content_length
+        self.closed_ratio = closed_ratio
+        self.due_ratio = due_ratio
+        self.seed = seed
+        self.today = today or date.today()
+        self._tasks = None
+
+    def _words(self, rng, length):
+        words = []
+        total = 0
+        while total < length:
+            word = rng.choice(WORDS)
+            words.append(word)
+            total += len(word) + 1
+        return ' '.join(words)
+
+    def _date(self, rng, spread):
+        return self.today + timedelta(days=rng.randint(-spread, spread))
+
+    def _make_task(self, rng, parent):
+        """ Returns the record of a single task """
+        tid = str(uuid.UUID(int=rng.getrandbits(128)))
+        weights = [1 / rank for rank in range(1, len(self.tag_names) + 1)]
+        tag_count = min(len(self.tag_names),
+                        int(rng.expovariate(1 / self.tags_per_task))
+                        if self.tags_per_task > 0 else 0)
+        tags = []
+        while len(tags) < tag_count:
+            tag = rng.choices(self.tag_names, weights)[0]
+            if tag not in tags:
+                tags.append(tag)
+
+        age = rng.randint(0, 365)
+        added = datetime.combine(self.today - timedelta(days=age),
+                                 datetime.min.time())
+        task = {
+            'id': tid,
+            'parent': parent,
+            'children': [],
+            'title': self._words(rng, rng.randint(10, 60)).capitalize(),
+            'tags': tags,
+            'status': 'Active',
+            'added': added,
+            'modified': added + timedelta(seconds=rng.randint(0, 86400 * age)),
+            'due': '',
+            'start': '',
+            'done': '',
+            'content': '',
+        }
+
+        if rng.random() < self.closed_ratio:
+            task['status'] = rng.choice(('Done', 'Done', 'Dismiss'))
+            task['done'] = (self.today - timedelta(
+                days=rng.randint(0, age))).isoformat()
+        if rng.random() < self.due_ratio:
+            due = self._date(rng, 60)
+            task['due'] = due.isoformat()
+            if rng.random() < 0.3:
+                task['start'] = (due - timedelta(days=rng.randint(0, 14))
+                                 ).isoformat()
+
+        length = int(rng.expovariate(1 / self.content_length)) \
+            if self.content_length > 0 else 0
+        task['content'] = self._content(rng, tags, length)
+        return task
+
+    def _content(self, rng, tags, length):
+        """ Returns a content mentioning the tags, as GTG writes them """
+        if not tags and not length:
+            return ''
+        text = ', '.join(f'<tag>{tag}</tag>' for tag in tags)
+        if length:
+            text += '\n' + self._words(rng, length)
+        return text.strip()
+
+    def get_tasks(self):
+        """ Returns the list of the task records, parents first """
+        if self._tasks is not None:
+            return self._tasks
+
+        rng = random.Random(self.seed)
+        tasks = []
+        # Tasks which can still get children
+        parents = []
+        for _ in range(self.size):
+            parent = None
+            if parents and rng.random() < self.subtask_ratio:
+                parent, parent_depth = rng.choice(parents)
+            else:
+                parent_depth = 0
+            task = self._make_task(rng, parent and parent['id'])
+            if parent is not None:
+                parent['children'].append(task['id'])
+            if parent_depth + 1 < self.depth:
+                parents.append((task, parent_depth + 1))
+            tasks.append(task)
+        self._tasks = tasks
+        return tasks
+
+    def write_tasks(self, path):
+        """ Writes the tasks in the format of the localfile backend """
+        with open(path, 'w', encoding='utf-8') as xml_file:
+            xml_file.write('<?xml version="1.0" ?>\n<project>\n')
+            for task in self.get_tasks():
+                xml_file.write(task_to_xml_string(task))
+            xml_file.write('</project>\n')
+
+    def write_tags(self, path):
+        """ Writes the tags.xml file of the tags """
+        rng = random.Random(self.seed)
+        with open(path, 'w', encoding='utf-8') as xml_file:
+            xml_file.write('<?xml version="1.0" ?>\n<tagstore>\n')
+            for name in self.tag_names:
+                color = f'#{rng.getrandbits(24):06x}'
+                xml_file.write(f'\t<tag color={saxutils.quoteattr(color)} '
+                               f'name={saxutils.quoteattr(name)}/>\n')
+            xml_file.write('</tagstore>\n')
+
+
+def task_to_xml_string(task):
+    """ Returns a task record as taskxml.task_to_xml() would write it """
+    def node(name, value):
+        if value == '':
+            return f'\t\t<{name}/>\n'
+        return f'\t\t<{name}>{saxutils.escape(value)}</{name}>\n'
+
+    tags = saxutils.quoteattr(','.join(saxutils.escape(tag)
+                                       for tag in task['tags']))
+    lines = [
+        f'\t<task id={saxutils.quoteattr(task["id"])} '
+        f'status={saxutils.quoteattr(task["status"])} tags={tags} '
+        f'uuid={saxutils.quoteattr(task["id"])}>\n',
+        node('title', task['title']),
+        node('addeddate', task['added'].strftime('%Y-%m-%dT%H:%M:%S')),
+        node('duedate', task['due']),
+        node('modified', task['modified'].strftime('%Y-%m-%dT%H:%M:%S')),
+        node('startdate', task['start']),
+        node('donedate', task['done']),
+    ]
+    lines.extend(node('subtask', child) for child in task['children'])
+    if task['content']:
+        lines.append(node('content', task['content']))
+    lines.append('\t\t<task-remote-ids/>\n\t</task>\n')
+    return ''.join(lines)
+
+
+DATE_FORMAT = '%Y-%m-%d'
+DATETIME_FORMAT = '%Y-%m-%dT%H:%M:%S'
+
+
+def _parse_date(text):
+    """ Returns a date, the fuzzy date string (e.g. "someday") or None """
+    if not text:
+        return None
+    try:
+        return datetime.strptime(text, DATE_FORMAT).date()
+    except ValueError:
+        return text
+
+
+def _parse_datetime(text):
+    try:
+        return datetime.strptime(text, DATETIME_FORMAT)
+    except ValueError:
+        return None
+
+
+class TaskFileProfile():
+    """
+    Distributions observed in a task file. They are kept as the lists of
+    observed values, which are sampled to generate tasks.
+
+    Dates are stored as offsets in days from the most recent modification
+    in the file, so that they can be moved to any other day.
+    """
+
+    FIELDS = ('children', 'tag_counts', 'tag_frequencies', 'statuses',
+              'ages', 'due_offsets', 'start_offsets', 'done_offsets',
+              'title_lengths', 'content_lengths')
+
+    def __init__(self, **distributions):
+        # children[depth]: the number of subtasks of tasks at that depth
+        self.children = [[0]]
+        # number of tags of a task
+        self.tag_counts = [0]
+        # number of tasks of each tag, most used first
+        self.tag_frequencies = []
+        self.statuses = ['Active']
+        # days between the added date and the reference date
+        self.ages = [0]
+        # days between the reference and the due date, None for no due
+        # date, or a fuzzy date like "someday"
+        self.due_offsets = [None]
+        # days between the due date and the start date
+        self.start_offsets = [None]
+        # days between the done date and the reference, for closed tasks
+        self.done_offsets = [0]
+        self.title_lengths = [20]
+        self.content_lengths = [0]
+        for field, values in distributions.items():
+            if field not in self.FIELDS:
+                raise ValueError(f'Unknown distribution {field}')
+            setattr(self, field, values)
+
+    @classmethod
+    def from_task_file(cls, path):
+        """ Learns the distributions of a gtg_tasks.xml file """
+        doc = xml.dom.minidom.parse(path)
+        nodes = {node.getAttribute('id'): node
+                 for node in doc.getElementsByTagName('task')}
+
+        subtasks = {tid: [taskxml.get_text(sub)
+                          for sub in node.getElementsByTagName('subtask')]
+                    for tid, node in nodes.items()}
+        subtasks = {tid: [sub for sub in subs if sub in nodes]
+                    for tid, subs in subtasks.items()}
+
+        # Depth of every task, walking down from the tasks without parent
+        has_parent = {sub for subs in subtasks.values() for sub in subs}
+        depths = {}
+        queue = [(tid, 0) for tid in nodes if tid not in has_parent]
+        while queue:
+            tid, depth = queue.pop()
+            if tid in depths:
+                continue
+            depths[tid] = depth
+            queue.extend((sub, depth + 1) for sub in subtasks[tid])
+
+        children = []
+        for tid, depth in depths.items():
+            while len(children) <= depth:
+                children.append([])
+            children[depth].append(len(subtasks[tid]))
+
+        modified = [_parse_datetime(taskxml.read_node(node, 'modified'))
+                    for node in nodes.values()]
+        modified = [when for when in modified if when is not None]
+        reference = max(modified).date() if modified else date.today()
+
+        profile = {field: [] for field in cls.FIELDS}
+        profile['children'] = children or [[0]]
+        tag_usage = Counter()
+        for node in nodes.values():
+            tags = [tag for tag in node.getAttribute('tags').split(',')
+                    if tag.strip()]
+            tag_usage.update(tags)
+            profile['tag_counts'].append(len(tags))
+            profile['statuses'].append(node.getAttribute('status'))
+            profile['title_lengths'].append(
+                len(taskxml.read_node(node, 'title')))
+            profile['content_lengths'].append(
+                len(taskxml.read_node(node, 'content')))
+
+            added = _parse_datetime(taskxml.read_node(node, 'addeddate'))
+            if added is not None:
+                profile['ages'].append((reference - added.date()).days)
+
+            due = _parse_date(taskxml.read_node(node, 'duedate'))
+            if isinstance(due, date):
+                profile['due_offsets'].append((due - reference).days)
+            else:
+                profile['due_offsets'].append(due)
+
+            start = _parse_date(taskxml.read_node(node, 'startdate'))
+            if isinstance(start, date) and isinstance(due, date):
+                profile['start_offsets'].append((due - start).days)
+            else:
+                profile['start_offsets'].append(None)
+
+            done = _parse_date(taskxml.read_node(node, 'donedate'))
+            if isinstance(done, date):
+                profile['done_offsets'].append((reference - done).days)
+
+        profile['tag_frequencies'] = sorted(tag_usage.values(), reverse=True)
+        return cls(**{field: values for field, values in profile.items()
+                      if values})
+
+    @classmethod
+    def load(cls, path):
+        """ Reads a profile saved with save() """
+        with open(path) as profile_file:
+            return cls(**json.load(profile_file))
+
+    def save(self, path):
+        with open(path, 'w') as profile_file:
+            json.dump({field: getattr(self, field) for field in self.FIELDS},
+                      profile_file)
+
+
+class LearnedTasks(SyntheticTasks):
+    """
+    Generates a task tree following a TaskFileProfile: the tasks have as
+    many subtasks, tags, words and the same dates as in the profiled file.
+    The tree can be of any size, and is the same one for a given seed.
+    """
+
+    def __init__(self, profile, size=1000, seed=0, today=None):
+        """
+        @param profile: a TaskFileProfile
+        @param size: the number of tasks
+        @param seed: the seed of the random generator
+        @param today: the date the dates are spread around
+        """
+        super().__init__(size=size, seed=seed, today=today,
+                         tags=len(profile.tag_frequencies))
+        self.profile = profile
+
+    def _make_learned_task(self, rng, parent):
+        profile = self.profile
+        tid = str(uuid.UUID(int=rng.getrandbits(128)))
+        tag_count = min(rng.choice(profile.tag_counts), len(self.tag_names))
+        tags = []
+        while len(tags) < tag_count:
+            tag = rng.choices(self.tag_names, profile.tag_frequencies)[0]
+            if tag not in tags:
+                tags.append(tag)
+
+        age = rng.choice(profile.ages)
+        added = datetime.combine(self.today - timedelta(days=age),
+                                 datetime.min.time())
+        task = {
+            'id': tid,
+            'parent': parent,
+            'children': [],
+            'title': self._words(
+                rng, rng.choice(profile.title_lengths)).capitalize(),
+            'tags': tags,
+            'status': rng.choice(profile.statuses),
+            'added': added,
+            'modified': added + timedelta(
+                seconds=rng.randint(0, 86400 * max(age, 0))),
+            'due': '',
+            'start': '',
+            'done': '',
+            'content': '',
+        }
+
+        if task['status'] != 'Active':
+            done = self.today - timedelta(days=rng.choice(
+                profile.done_offsets))
+            task['done'] = done.strftime(DATE_FORMAT)
+
+        due = rng.choice(profile.due_offsets)
+        if isinstance(due, int):
+            due = self.today + timedelta(days=due)
+            task['due'] = due.strftime(DATE_FORMAT)
+            start = rng.choice(profile.start_offsets)
+            if start is not None:
+                task['start'] = (due - timedelta(days=start)
+                                 ).strftime(DATE_FORMAT)
+        elif due is not None:
+            task['due'] = due
+
+        # The observed lengths include the tags
+        markup = sum(len(f'<tag>{tag}</tag>, ') for tag in tags)
+        task['content'] = self._content(
+            rng, tags, max(0, rng.choice(profile.content_lengths) - markup))
+        return task
+
+    def get_tasks(self):
+        """ Returns the list of the task records, parents first """
+        if self._tasks is not None:
+            return self._tasks
+
+        rng = random.Random(self.seed)
+        children = self.profile.children
+        tasks = []
+        while len(tasks) < self.size:
+            queue = [(self._make_learned_task(rng, None), 0)]
+            while queue and len(tasks) < self.size:
+                task, depth = queue.pop(0)
+                tasks.append(task)
+                count = rng.choice(children[depth]) \
+                    if depth < len(children) else 0
+                for _ in range(count):
+                    child = self._make_learned_task(rng, task['id'])
+                    task['children'].append(child['id'])
+                    queue.append((child, depth + 1))
+
+        # Children which didn't fit are dropped
+        ids = {task['id'] for task in tasks}
+        for task in tasks:
+            task['children'] = [tid for tid in task['children'] if tid in ids]
+        self._tasks = tasks
+        return tasks
@@ -0,0 +1,110 @@
+# -----------------------------------------------------------------------------
+# Getting Things GNOME! - a personal organizer for the GNOME desktop
+# Copyright (c) 2008-2013 - Lionel Dricot & Bertrand Rousseau
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+from unittest import TestCase
+from datetime import date
+import os
+import shutil
+import tempfile
+
+from GTG.core import cleanxml
+from tests.benchmarks.synthetic import (LearnedTasks, SyntheticTasks,
+                                        TaskFileProfile)
+
+TODAY = date(2020, 1, 1)
+
+
+class TestSyntheticTasks(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def write(self, tasks, name='gtg_tasks.xml'):
+        path = os.path.join(self.tmpdir, name)
+        tasks.write_tasks(path)
+        with open(path, 'rb') as xml_file:
+            return path, xml_file.read()
+
+    def test_same_seed_same_file(self):
+        _, first = self.write(SyntheticTasks(size=50, seed=3, today=TODAY))
+        _, second = self.write(SyntheticTasks(size=50, seed=3, today=TODAY))
+        _, other = self.write(SyntheticTasks(size=50, seed=4, today=TODAY))
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+
+    def test_file_can_be_opened(self):
+        path, _ = self.write(SyntheticTasks(size=50, seed=3, today=TODAY))
+        doc, project = cleanxml.openxmlfile(path, 'project')
+        self.assertEqual(50, len(project.getElementsByTagName('task')))
+
+    def test_respects_depth(self):
+        tasks = SyntheticTasks(size=200, depth=2, subtask_ratio=0.9,
+                               today=TODAY).get_tasks()
+        parents = {task['id']: task['parent'] for task in tasks}
+        for task in tasks:
+            if task['parent'] is not None:
+                self.assertIsNone(parents[task['parent']])
+
+
+class TestLearnedTasks(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.source = os.path.join(self.tmpdir, 'source.xml')
+        SyntheticTasks(size=300, depth=3, closed_ratio=0.5, seed=1,
+                       today=TODAY).write_tasks(self.source)
+        self.profile = TaskFileProfile.from_task_file(self.source)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_learns_distributions(self):
+        self.assertEqual(3, len(self.profile.children))
+        self.assertEqual(300, len(self.profile.statuses))
+        closed = sum(status != 'Active' for status in self.profile.statuses)
+        self.assertTrue(100 < closed < 200)
+
+    def test_profile_round_trip(self):
+        path = os.path.join(self.tmpdir, 'profile.json')
+        self.profile.save(path)
+        loaded = TaskFileProfile.load(path)
+        for field in TaskFileProfile.FIELDS:
+            self.assertEqual(getattr(self.profile, field),
+                             getattr(loaded, field))
+
+    def test_generates_any_size(self):
+        tasks = LearnedTasks(self.profile, size=1000, seed=2,
+                             today=TODAY).get_tasks()
+        self.assertEqual(1000, len(tasks))
+        ids = {task['id'] for task in tasks}
+        for task in tasks:
+            self.assertTrue(set(task['children']) <= ids)
+
+    def test_follows_profile(self):
+        path = os.path.join(self.tmpdir, 'learned.xml')
+        LearnedTasks(self.profile, size=1000, seed=2,
+                     today=TODAY).write_tasks(path)
+        learned = TaskFileProfile.from_task_file(path)
+        ratio = sum(status != 'Active' for status in learned.statuses) / 1000
+        self.assertAlmostEqual(0.5, ratio, delta=0.1)
+        self.assertLessEqual(len(learned.children), 3)
+
+    def test_is_deterministic(self):
+        first = LearnedTasks(self.profile, size=200, seed=5, today=TODAY)
+        second = LearnedTasks(self.profile, size=200, seed=5, today=TODAY)
+        self.assertEqual(first.get_tasks(), second.get_tasks())
@@ -0,0 +1,83 @@
+# -----------------------------------------------------------------------------
+# Getting Things GNOME! - a personal organizer for the GNOME desktop
+# Copyright (c) 2008-2013 - Lionel Dricot & Bertrand Rousseau
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+
+"""
+Tasks on a liblarch Tree, for the tests of the relationships between them
+"""
+
+from unittest import TestCase
+
+from liblarch import Tree
+
+from GTG.core.dates import Date
+from GTG.core.task import Task
+
+
+class FakeRequester():
+    """ Gives access to the tasks of a Tree, like the Requester """
+
+    def __init__(self):
+        self.tree = Tree()
+
+    def get_main_view(self):
+        return self.tree.get_main_view()
+
+    def get_task(self, tid):
+        if self.tree.has_node(tid):
+            return self.tree.get_node(tid)
+        return None
+
+
+class TaskTreeTestCase(TestCase):
+    """ Builds tasks on a liblarch Tree and counts their syncs """
+
+    def setUp(self):
+        self.req = FakeRequester()
+        self.tasks = {}
+        self.syncs = {}
+
+    def add_task(self, tid, parent_ids=(), status=Task.STA_ACTIVE, due='',
+                 start=''):
+        task = Task(tid, self.req, newtask=True)
+        task.can_be_deleted = False
+        task.status = status
+        task.due_date = Date.parse(due)
+        task.start_date = Date.parse(start)
+        self.req.tree.add_node(task)
+        for parent_id in parent_ids:
+            task.add_parent(parent_id)
+        self.tasks[tid] = task
+        return task
+
+    def count_syncs(self):
+        """ Counts the syncs of all the tasks from now on """
+        for tid, task in self.tasks.items():
+            self.syncs[tid] = 0
+            task.sync = self.counter(tid, task.sync)
+
+    def counter(self, tid, sync):
+        def counted_sync():
+            self.syncs[tid] += 1
+            return sync()
+        return counted_sync
+
+    def due(self, tid):
+        return self.tasks[tid].get_due_date()
+
+    def start(self, tid):
+        return self.tasks[tid].get_start_date()
@@ -0,0 +1,161 @@
+# -----------------------------------------------------------------------------
+# Getting Things GNOME! - a personal organizer for the GNOME desktop
+# Copyright (c) 2008-2013 - Lionel Dricot & Bertrand Rousseau
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+
+from unittest import TestCase
+from functools import partial
+import os
+import shutil
+import tempfile
+
+from mock import patch
+
+from GTG.backends import backend_localfile
+from GTG.core import cleanxml, taskxml
+from GTG.core.taskindex import TaskFileIndex
+
+
+TASK = '<task id="{0}" status="Active"><title>{1}</title></task>'
+
+
+def write_file(path, tasks, complete=True):
+    """ Writes {tid: title} as another program would """
+    data = '<?xml version="1.0" ?>\n<project>\n'
+    data += ''.join(TASK.format(tid, title) + '\n'
+                    for tid, title in tasks.items())
+    if complete:
+        data += '</project>\n'
+    # A new inode makes sure the change is noticed
+    with open(path + '__', 'w') as xml_file:
+        xml_file.write(data)
+    os.replace(path + '__', path)
+
+
+class FakeTask():
+    def __init__(self, tid):
+        self.tid = tid
+        self.title = None
+
+    def get_id(self):
+        return self.tid
+
+
+def fake_task_from_xml(task, node, **kwargs):
+    task.title = cleanxml.readTextNode(node, 'title')
+    return task
+
+
+class FakeDatastore():
+    def __init__(self):
+        self.tasks = {}
+        self.deleted = []
+
+    def has_task(self, tid):
+        return tid in self.tasks
+
+    def get_task(self, tid):
+        return self.tasks.get(tid)
+
+    def task_factory(self, tid):
+        return FakeTask(tid)
+
+    def push_task(self, task):
+        self.tasks[task.get_id()] = task
+        return True
+
+    def push_tasks(self, tasks):
+        for task in tasks:
+            self.push_task(task)
+        return len(tasks)
+
+    def request_task_deletion(self, tid):
+        self.deleted.append(tid)
+        del self.tasks[tid]
+
+
+class TestExternalChanges(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'gtg_tasks.xml')
+        write_file(self.path, {'a': 'Alpha', 'b': 'Beta'})
+
+        for name in ('task_from_xml', 'update_task_from_xml'):
+            patcher = patch.object(taskxml, name, fake_task_from_xml)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        index = partial(TaskFileIndex,
+                        cache_dir=os.path.join(self.tmpdir, 'cache'))
+        with patch.object(backend_localfile, 'TaskFileIndex', index):
+            self.backend = backend_localfile.Backend({'path': self.path})
+
+        self.datastore = FakeDatastore()
+        self.backend.register_datastore(self.datastore)
+        with patch.object(self.backend, '_watcher'):
+            self.backend.start_get_tasks()
+
+    def tearDown(self):
+        self.backend._index.close()
+        shutil.rmtree(self.tmpdir)
+
+    def file_changed(self):
+        """ Runs the watcher callback, and returns the idle callbacks it
+        scheduled instead of running them """
+        with patch.object(backend_localfile, 'GLib') as glib:
+            self.backend._on_file_changed()
+        return [call[0] for call in glib.idle_add.call_args_list]
+
+    def titles(self):
+        return {tid: task.title for tid, task in self.datastore.tasks.items()}
+
+    def test_tasks_are_loaded(self):
+        self.assertEqual({'a': 'Alpha', 'b': 'Beta'}, self.titles())
+
+    def test_added_changed_and_removed_tasks(self):
+        write_file(self.path, {'a': 'Alpha, renamed', 'c': 'Gamma'})
+        calls = self.file_changed()
+
+        # GTG core is only modified from the main loop
+        self.assertEqual(1, len(calls))
+        self.assertEqual({'a': 'Alpha', 'b': 'Beta'}, self.titles())
+
+        callback, *args = calls[0]
+        self.assertFalse(callback(*args))
+        self.assertEqual(['b'], self.datastore.deleted)
+        self.assertEqual({'a': 'Alpha, renamed', 'c': 'Gamma'}, self.titles())
+
+        # The next save keeps the external changes
+        self.assertEqual({'a', 'c'}, set(self.backend._task_nodes))
+
+    def test_unchanged_file_is_ignored(self):
+        # e.g. the file was copied back by a sync tool
+        shutil.copy(self.path, self.path + '__')
+        os.replace(self.path + '__', self.path)
+        self.assertEqual([], self.file_changed())
+
+    def test_incomplete_file_is_ignored(self):
+        write_file(self.path, {'a': 'Alpha'}, complete=False)
+        self.assertEqual([], self.file_changed())
+        self.assertEqual({'a', 'b'}, set(self.backend._task_nodes))
+
+        # The changes are applied once the file is fully written
+        write_file(self.path, {'a': 'Alpha'})
+        calls = self.file_changed()
+        self.assertEqual(1, len(calls))
+        callback, *args = calls[0]
+        callback(*args)
+        self.assertEqual(['b'], self.datastore.deleted)
+        self.assertEqual({'a': 'Alpha'}, self.titles())
@@ -0,0 +1,86 @@
+# -----------------------------------------------------------------------------
+# Getting Things GNOME! - a personal organizer for the GNOME desktop
+# Copyright (c) 2008-2013 - Lionel Dricot & Bertrand Rousseau
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+
+from unittest import TestCase
+
+from GTG.backends import backend_metrics
+from GTG.backends.backend_metrics import QueueMetrics
+
+
+class FakeClock():
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestQueueMetrics(TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.metrics = QueueMetrics(window=10, clock=self.clock)
+
+    def test_idle_backend(self):
+        snapshot = self.metrics.get_snapshot()
+        self.assertEqual(0, snapshot[backend_metrics.QUEUE_DEPTH])
+        self.assertEqual(0, snapshot[backend_metrics.OLDEST_PENDING_AGE])
+        self.assertEqual(0, snapshot[backend_metrics.SETS_PER_SECOND])
+
+    def test_oldest_change_is_kept(self):
+        self.metrics.task_queued('a')
+        self.clock.now += 5
+        self.metrics.task_queued('a')
+        self.metrics.task_queued('b')
+        self.clock.now += 2
+        snapshot = self.metrics.get_snapshot()
+        self.assertEqual(2, snapshot[backend_metrics.QUEUE_DEPTH])
+        self.assertEqual(7, snapshot[backend_metrics.OLDEST_PENDING_AGE])
+
+    def test_written_tasks_are_not_pending(self):
+        self.metrics.task_queued('a')
+        self.metrics.task_queued('b')
+        self.metrics.task_queued('c')
+        self.metrics.task_set('a', 0.1)
+        self.metrics.task_removed('b')
+        self.metrics.task_dropped('c')
+        snapshot = self.metrics.get_snapshot()
+        self.assertEqual(0, snapshot[backend_metrics.QUEUE_DEPTH])
+
+    def test_rates_and_latency(self):
+        self.clock.now += 10
+        for tid, duration in (('a', 0.1), ('b', 0.3)):
+            self.metrics.task_set(tid, duration)
+        self.metrics.task_removed('c')
+        snapshot = self.metrics.get_snapshot()
+        self.assertAlmostEqual(0.2, snapshot[backend_metrics.SETS_PER_SECOND])
+        self.assertAlmostEqual(
+            0.1, snapshot[backend_metrics.REMOVES_PER_SECOND])
+        self.assertAlmostEqual(
+            0.2, snapshot[backend_metrics.SET_TASK_LATENCY])
+
+        # Old operations fall out of the window
+        self.clock.now += 11
+        snapshot = self.metrics.get_snapshot()
+        self.assertEqual(0, snapshot[backend_metrics.SETS_PER_SECOND])
+        self.assertEqual(0, snapshot[backend_metrics.SET_TASK_LATENCY])
+
+    def test_reports_are_throttled(self):
+        self.assertTrue(self.metrics.should_report())
+        self.assertFalse(self.metrics.should_report())
+        self.clock.now += backend_metrics.REPORT_INTERVAL
+        self.assertTrue(self.metrics.should_report())
@@ -0,0 +1,98 @@
+# -----------------------------------------------------------------------------
+# Getting Things GNOME! - a personal organizer for the GNOME desktop
+# Copyright (c) 2008-2013 - Lionel Dricot & Bertrand Rousseau
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+
+from unittest import TestCase
+import threading
+
+from GTG.core.backendloader import BackendLoader
+
+
+class TestBackendLoader(TestCase):
+    def setUp(self):
+        self.loader = BackendLoader()
+        self.order = []
+        self.lock = threading.Lock()
+
+    def job(self, name, event=None):
+        def function():
+            if event is not None:
+                event.wait(5)
+            with self.lock:
+                self.order.append(name)
+        return function
+
+    def wait_done(self, *names):
+        for _ in range(500):
+            if all(self.loader.is_done(name) for name in names):
+                return
+            threading.Event().wait(0.01)
+        self.fail(f'{names} not loaded')
+
+    def test_runs_inline(self):
+        self.loader.run('local', self.job('local'))
+        self.assertEqual(['local'], self.order)
+        self.assertTrue(self.loader.is_done('local'))
+        self.assertIn('local', self.loader.get_timings())
+
+    def test_waits_for_dependencies(self):
+        self.loader.load('remote', self.job('remote'), depends_on=['local'])
+        self.assertFalse(self.loader.is_done('remote'))
+        self.loader.load('local', self.job('local'))
+        self.wait_done('local', 'remote')
+        self.assertEqual(['local', 'remote'], self.order)
+
+    def test_waits_for_marked_names(self):
+        self.loader.load('remote', self.job('remote'), depends_on=['ready'])
+        threading.Event().wait(0.05)
+        self.assertEqual([], self.order)
+        self.loader.mark_done('ready')
+        self.wait_done('remote')
+
+    def test_blocked_backend_does_not_hold_back_others(self):
+        release = threading.Event()
+        for name in ('a', 'b', 'c', 'd', 'e'):
+            self.loader.load(name, self.job(name, release))
+        self.loader.load('local', self.job('local'))
+        self.loader.load('remote', self.job('remote'), depends_on=['local'])
+        self.wait_done('local', 'remote')
+        self.assertEqual(['local', 'remote'], self.order)
+
+        release.set()
+        self.wait_done('a', 'b', 'c', 'd', 'e')
+        self.assertEqual({'a', 'b', 'c', 'd', 'e', 'local', 'remote'},
+                         set(self.loader.get_timings()))
+
+    def test_waiting_backend_is_queued_once(self):
+        self.assertTrue(self.loader.load('remote', self.job('remote'),
+                                         depends_on=['ready']))
+        self.assertFalse(self.loader.load('remote', self.job('remote'),
+                                          depends_on=['ready']))
+        self.loader.mark_done('ready')
+        self.wait_done('remote')
+        threading.Event().wait(0.05)
+        self.assertEqual(['remote'], self.order)
+
+        # It can be loaded again once it is done
+        self.assertTrue(self.loader.load('remote', self.job('remote')))
+
+    def test_failing_backend_is_done(self):
+        def fail():
+            raise RuntimeError('boom')
+        self.loader.load('broken', fail)
+        self.loader.load('other', self.job('other'), depends_on=['broken'])
+        self.wait_done('broken', 'other')
@@ -18,10 +18,13 @@
 
 from unittest import TestCase
 import configparser
+import os
+import shutil
+import tempfile
 
 from mock import patch, mock_open, Mock
 
-from GTG.core.config import open_config_file, SectionConfig
+from GTG.core.config import open_config_file, SectionConfig, TaskConfigStore
 
 
 class TestOpenConfigFile(TestCase):
@@ -185,3 +188,96 @@ class TestSectionConfig(TestCase):
         self.assertEqual('1,2', config['list'])
         # Automatically saved value
         save_mock.assert_any_call()
+
+
+class TestTaskConfigStore(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'tasks.jsonl')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def count_lines(self):
+        with open(self.path) as log_file:
+            return len(log_file.readlines())
+
+    def test_record_survives_reload(self):
+        store = TaskConfigStore(self.path)
+        store.get_section('task1')['position'] = '10,20'
+        store.save('task1')
+
+        store = TaskConfigStore(self.path)
+        self.assertEqual('10,20', store.get_section('task1')['position'])
+
+    def test_update_appends_single_record(self):
+        store = TaskConfigStore(self.path)
+        for task_id in ('task1', 'task2', 'task3'):
+            store.get_section(task_id)['size'] = '400,300'
+            store.save(task_id)
+        store.get_section('task2')['size'] = '500,300'
+        store.save('task2')
+        self.assertEqual(4, self.count_lines())
+
+    def test_unchanged_record_is_not_written(self):
+        store = TaskConfigStore(self.path)
+        store.get_section('task1')['size'] = '400,300'
+        store.save('task1')
+        store.save('task1')
+        self.assertEqual(1, self.count_lines())
+
+    def test_purged_task_is_forgotten(self):
+        store = TaskConfigStore(self.path)
+        store.get_section('task1')['size'] = '400,300'
+        store.save('task1')
+        store.purge(['task1', 'never-saved'])
+
+        store = TaskConfigStore(self.path)
+        self.assertEqual({}, dict(store.get_section('task1')))
+        # Loading compacted the stale lines away
+        self.assertEqual(0, self.count_lines())
+
+    def test_log_is_compacted_when_mostly_stale(self):
+        store = TaskConfigStore(self.path)
+        for i in range(TaskConfigStore.COMPACT_MIN_STALE + 1):
+            store.get_section('task1')['position'] = f'{i},0'
+            store.save('task1')
+        self.assertTrue(self.count_lines() < TaskConfigStore.COMPACT_MIN_STALE)
+        self.assertEqual(f'{TaskConfigStore.COMPACT_MIN_STALE},0',
+                         TaskConfigStore(self.path).get_section('task1')['position'])
+
+    def test_malformed_lines_are_skipped(self):
+        store = TaskConfigStore(self.path)
+        store.get_section('task1')['size'] = '400,300'
+        store.save('task1')
+        with open(self.path, 'a') as log_file:
+            for line in ('{}', '[1]', '["task2", 5]', '[5, {}]',
+                         '["task3", {}, 1]', '"task4"', '{"task5": '):
+                log_file.write(line + '\n')
+
+        store = TaskConfigStore(self.path)
+        self.assertEqual('400,300', store.get_section('task1')['size'])
+        for task_id in ('task2', 'task3', 'task4', 'task5'):
+            self.assertEqual({}, dict(store.get_section(task_id)))
+        # The skipped lines were stale, so they were compacted away
+        self.assertEqual(1, self.count_lines())
+
+    def test_imports_legacy_configuration(self):
+        legacy_path = os.path.join(self.tmpdir, 'tasks.conf')
+        with open(legacy_path, 'w') as legacy_file:
+            legacy_file.write('[task1]\nposition = 1,2\n\n[empty]\n')
+
+        store = TaskConfigStore(self.path, legacy_path=legacy_path)
+        self.assertEqual('1,2', store.get_section('task1')['position'])
+        self.assertEqual(1, self.count_lines())
+
+    def test_section_config_saves_through_store(self):
+        store = TaskConfigStore(self.path)
+        section = SectionConfig('Task task1', store.get_section('task1'),
+                                {'size': []}, lambda: store.save('task1'))
+        section.set('size', [400, 300])
+
+        store = TaskConfigStore(self.path)
+        section = SectionConfig('Task task1', store.get_section('task1'),
+                                {'size': []}, Mock())
+        self.assertEqual(['400', '300'], section.get('size'))
@@ -0,0 +1,271 @@
+# -----------------------------------------------------------------------------
+# Getting Things GNOME! - a personal organizer for the GNOME desktop
+# Copyright (c) 2008-2013 - Lionel Dricot & Bertrand Rousseau
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+
+from unittest import TestCase
+import os
+import shutil
+import tempfile
+import threading
+
+from mock import patch
+
+from GTG.backends.generic_backend import GenericBackend
+from GTG.core import datastore
+from GTG.core.datastore import DataStore
+from GTG.core.task import Task
+
+
+class FakeBackend(GenericBackend):
+    """ Counts how many times it is started """
+
+    _general_description = {
+        GenericBackend.BACKEND_NAME: "backend_fake",
+        GenericBackend.BACKEND_HUMAN_NAME: "Fake",
+        GenericBackend.BACKEND_AUTHORS: [],
+        GenericBackend.BACKEND_TYPE: GenericBackend.TYPE_READWRITE,
+        GenericBackend.BACKEND_DESCRIPTION: "",
+    }
+
+    def __init__(self, pid):
+        super().__init__({
+            "pid": pid,
+            GenericBackend.KEY_DEFAULT_BACKEND: False,
+            GenericBackend.KEY_ENABLED: True,
+        })
+        self.initialized = 0
+        self.started = 0
+
+    def initialize(self):
+        super().initialize()
+        self.initialized += 1
+
+    def start_get_tasks(self):
+        self.started += 1
+
+
+class DataStoreTestCase(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        tags_file = os.path.join(self.tmpdir, 'tags.xml')
+        with patch.object(datastore, 'TAGS_XMLFILE', tags_file):
+            self.datastore = DataStore()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def wait_for(self, condition):
+        for _ in range(500):
+            if condition():
+                return
+            threading.Event().wait(0.01)
+        self.fail('timed out')
+
+
+class TestBackendStartup(DataStoreTestCase):
+    def register(self, pid='1'):
+        backend = FakeBackend(pid)
+        backend_dic = dict(backend.get_parameters(), backend=backend)
+        self.datastore.register_backend(backend_dic)
+        return backend
+
+    def set_enabled(self, backend, state):
+        self.datastore.set_backend_enabled(backend.get_id(), state)
+        # Backends are disabled in a separate thread
+        self.wait_for(lambda: backend.is_enabled() == state)
+
+    def load_default_backend(self, *backends):
+        """ Lets the other backends start, and waits for them """
+        self.datastore._activate_non_default_backends()
+        times = self.datastore.get_backend_load_times
+        self.wait_for(lambda: all(backend.get_id() in times()
+                                  for backend in backends))
+
+    def test_waits_for_default_backend(self):
+        backend = self.register()
+        threading.Event().wait(0.05)
+        self.assertEqual(0, backend.initialized)
+
+        self.load_default_backend(backend)
+        self.assertEqual(1, backend.initialized)
+
+    def test_disabled_backend_is_not_started(self):
+        backend = self.register()
+        self.set_enabled(backend, False)
+        self.load_default_backend(backend)
+        self.assertEqual(0, backend.initialized)
+        self.assertEqual(0, backend.started)
+
+    def test_removed_backend_is_not_started(self):
+        backend = self.register()
+        self.datastore.remove_backend(backend.get_id())
+        self.load_default_backend(backend)
+        self.assertEqual(0, backend.initialized)
+        self.assertEqual(0, backend.started)
+
+    def test_reenabled_backend_is_started_once(self):
+        backend = self.register()
+        self.set_enabled(backend, False)
+        self.set_enabled(backend, True)
+        self.load_default_backend(backend)
+        self.assertEqual(1, backend.initialized)
+
+    def test_enabled_after_default_backend(self):
+        backend = self.register()
+        self.set_enabled(backend, False)
+        self.load_default_backend(backend)
+        self.set_enabled(backend, True)
+        self.wait_for(lambda: backend.started)
+        self.assertEqual(1, backend.initialized)
+
+
+class FakeSource():
+    """ Default backend pushing its tasks while it is loaded progressively """
+
+    def __init__(self, datastore, tasks):
+        self.backend = self
+        self.datastore = datastore
+        self.tasks = tasks
+        self.accepted = None
+        self.loaded = False
+
+    def initialize(self, connect_signals=True):
+        pass
+
+    def start_get_tasks(self):
+        self.accepted = self.datastore.push_tasks(self.tasks)
+
+    def tasks_loaded(self):
+        self.loaded = True
+
+
+class HookedLock():
+    """ Lock running a function just before it is taken for the n-th time,
+    to reproduce a given interleaving of two threads """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._count = 0
+        self._hooks = {}
+
+    def hook_at(self, count, function):
+        self._hooks[self._count + count] = function
+
+    def __enter__(self):
+        self._count += 1
+        hook = self._hooks.pop(self._count, None)
+        if hook is not None:
+            hook()
+        return self._lock.__enter__()
+
+    def __exit__(self, *args):
+        return self._lock.__exit__(*args)
+
+
+class TestPushTasks(DataStoreTestCase):
+    def setUp(self):
+        super().setUp()
+        patcher = patch.object(Task, 'sync')
+        self.sync = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def new_task(self, tid, status=Task.STA_ACTIVE):
+        task = self.datastore.task_factory(tid)
+        task.set_status(status)
+        self.sync.reset_mock()
+        return task
+
+    def test_duplicates_are_ignored(self):
+        existing = self.new_task('existing')
+        self.assertTrue(self.datastore.push_task(existing))
+
+        tasks = [self.new_task(tid) for tid in ('a', 'b', 'a', 'existing')]
+        self.assertEqual(2, self.datastore.push_tasks(tasks))
+        self.assertIs(tasks[0], self.datastore.get_task('a'))
+        self.assertIs(existing, self.datastore.get_task('existing'))
+        self.assertEqual({'a', 'b', 'existing'},
+                         set(self.datastore.get_all_tasks()))
+        self.assertTrue(all(task.is_loaded() for task in tasks[:2]))
+
+    def test_not_synced_before_default_backend_is_loaded(self):
+        self.datastore.push_tasks([self.new_task('a'), self.new_task('b')])
+        self.sync.assert_not_called()
+
+    def test_synced_once_default_backend_is_loaded(self):
+        self.datastore.is_default_backend_loaded = True
+        self.datastore.push_tasks([self.new_task('a'), self.new_task('b')])
+        self.assertEqual(2, self.sync.call_count)
+
+    def start_loading(self, source):
+        """ Loads the source progressively, without running the idle
+        callback adding its tasks to the tree """
+        self.lock = HookedLock()
+        self.datastore._queue_lock = self.lock
+        patcher = patch.object(datastore, 'GLib')
+        self.glib = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.datastore._progressive_backend_startup(source)
+
+    def run_idle_callback(self):
+        callback = self.glib.idle_add.call_args[0][0]
+        while callback():
+            pass
+
+    def test_queued_while_loading_progressively(self):
+        tasks = [self.new_task('done', Task.STA_DONE),
+                 self.new_task('a'), self.new_task('b'), self.new_task('a')]
+        source = FakeSource(self.datastore, tasks)
+        self.start_loading(source)
+
+        # Nothing is added from the backend thread
+        self.assertEqual(3, source.accepted)
+        self.assertEqual([], self.datastore.get_all_tasks())
+        self.assertFalse(source.loaded)
+
+        added = []
+        self.datastore.get_tasks_tree().get_main_view().register_cllbck(
+            'node-added', lambda tid, path: added.append(tid))
+        self.run_idle_callback()
+
+        # Active tasks are added first
+        self.assertEqual(['a', 'b', 'done'], added)
+        self.assertTrue(source.loaded)
+        self.sync.assert_not_called()
+
+    def test_pushed_while_queue_is_drained_for_the_last_time(self):
+        source = FakeSource(self.datastore, [self.new_task('a')])
+        self.start_loading(source)
+        late = self.new_task('late')
+
+        # The backend pushes a task after the idle callback has run out of
+        # queued tasks, but before it finishes loading
+        self.lock.hook_at(3, lambda: self.datastore.push_tasks([late]))
+        self.run_idle_callback()
+
+        self.assertEqual({'a', 'late'}, set(self.datastore.get_all_tasks()))
+        self.assertTrue(source.loaded)
+
+    def test_pushed_while_loading_ends(self):
+        source = FakeSource(self.datastore, [self.new_task('a')])
+        self.start_loading(source)
+
+        # The main loop finishes loading while the backend pushes a task
+        self.lock.hook_at(1, self.run_idle_callback)
+        self.assertEqual(1, self.datastore.push_tasks([self.new_task('b')]))
+
+        self.assertEqual({'a', 'b'}, set(self.datastore.get_all_tasks()))
+        self.assertTrue(source.loaded)
@@ -0,0 +1,54 @@
+# -----------------------------------------------------------------------------
+# Getting Things GNOME! - a personal organizer for the GNOME desktop
+# Copyright (c) 2008-2013 - Lionel Dricot & Bertrand Rousseau
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+
+from datetime import date
+from unittest import TestCase
+
+from GTG.core.dateindex import DateIndex
+
+
+class TestDateIndex(TestCase):
+    def setUp(self):
+        self.index = DateIndex()
+        self.index.update('a', date(2020, 1, 3))
+        self.index.update('b', date(2020, 1, 1))
+        self.index.update('c', date(2020, 1, 2))
+        self.index.update('d', date(2020, 1, 2))
+
+    def test_range_is_sorted(self):
+        self.assertEqual(['b', 'c', 'd', 'a'], self.index.get_range())
+
+    def test_range_bounds(self):
+        self.assertEqual(['b'], self.index.get_range(end=date(2020, 1, 2)))
+        self.assertEqual(['c', 'd', 'a'],
+                         self.index.get_range(start=date(2020, 1, 2)))
+        self.assertEqual([], self.index.get_range(end=date(2019, 1, 1)))
+
+    def test_update_moves_task(self):
+        self.index.update('b', date(2020, 1, 5))
+        self.assertEqual(['c', 'd', 'a', 'b'], self.index.get_range())
+        self.assertEqual(date(2020, 1, 5), self.index.get('b'))
+        self.assertEqual(4, len(self.index))
+
+    def test_remove(self):
+        self.index.remove('c')
+        self.index.update('d', None)
+        self.index.remove('missing')
+        self.assertEqual(['b', 'a'], self.index.get_range())
+        self.assertNotIn('c', self.index)
+        self.assertIsNone(self.index.get('d'))
@@ -0,0 +1,81 @@
+# -----------------------------------------------------------------------------
+# Getting Things GNOME! - a personal organizer for the GNOME desktop
+# Copyright (c) 2008-2013 - Lionel Dricot & Bertrand Rousseau
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+
+from unittest import TestCase
+import os
+import shutil
+import tempfile
+
+from GTG.core.filewatcher import FileWatcher
+
+
+class TestFileWatcher(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'gtg_tasks.xml')
+        self.write('<project/>')
+        self.calls = 0
+        self.watcher = FileWatcher(self.path, self.callback)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def write(self, data):
+        # A new inode makes sure the change is noticed
+        with open(self.path + '__', 'w') as xml_file:
+            xml_file.write(data)
+        os.replace(self.path + '__', self.path)
+
+    def callback(self):
+        self.calls += 1
+
+    def test_unchanged_file(self):
+        self.watcher.check()
+        self.assertEqual(0, self.calls)
+
+    def test_changed_file(self):
+        self.write('<project></project>')
+        self.watcher.check()
+        self.assertEqual(1, self.calls)
+
+        # Each change is reported once
+        self.watcher.check()
+        self.assertEqual(1, self.calls)
+
+    def test_acknowledged_change(self):
+        self.write('<project></project>')
+        self.watcher.acknowledge()
+        self.watcher.check()
+        self.assertEqual(0, self.calls)
+
+    def test_deleted_file(self):
+        os.remove(self.path)
+        self.watcher.check()
+        self.assertEqual(0, self.calls)
+
+    def test_failing_callback(self):
+        def fail():
+            self.calls += 1
+            raise ValueError('broken file')
+
+        self.watcher.callback = fail
+        self.write('<project></project>')
+        self.watcher.check()
+        self.write('<project> </project>')
+        self.watcher.check()
+        self.assertEqual(2, self.calls)
@@ -0,0 +1,85 @@
+# -----------------------------------------------------------------------------
+# Getting Things GNOME! - a personal organizer for the GNOME desktop
+# Copyright (c) 2008-2013 - Lionel Dricot & Bertrand Rousseau
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+from unittest import TestCase
+import json
+import os
+import shutil
+import tempfile
+
+from GTG.core import profiler
+
+
+class TestProfiler(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.was_enabled = profiler.is_enabled()
+        profiler.reset()
+
+    def tearDown(self):
+        profiler._enabled = self.was_enabled
+        profiler._capture_phases = False
+        profiler.reset()
+        shutil.rmtree(self.tmpdir)
+
+    def test_disabled_collects_nothing(self):
+        profiler._enabled = False
+        profiler.timed('noop')(lambda: None)()
+        profiler.count('noop')
+        with profiler.timer('noop'):
+            pass
+        self.assertEqual({'timers': {}, 'counters': {}},
+                         profiler.get_stats())
+
+    def test_timers_and_counters(self):
+        profiler.enable()
+
+        @profiler.timed('double')
+        def double(value):
+            return value * 2
+
+        self.assertEqual(4, double(2))
+        double(3)
+        profiler.count('items', 5)
+        profiler.count('items')
+
+        stats = profiler.get_stats()
+        self.assertEqual(2, stats['timers']['double']['count'])
+        self.assertGreaterEqual(stats['timers']['double']['max'], 0)
+        self.assertEqual(6, stats['counters']['items'])
+
+    def test_timer_records_failing_calls(self):
+        profiler.enable()
+        with self.assertRaises(ValueError):
+            with profiler.timer('failing'):
+                raise ValueError()
+        self.assertEqual(1, profiler.get_stats()['timers']['failing']['count'])
+
+    def test_dump_with_phase_captures(self):
+        profiler.enable(profiler.MODE_CPROFILE)
+
+        @profiler.phase('work')
+        def work():
+            return sum(range(1000))
+
+        work()
+        path = profiler.dump(self.tmpdir)
+        with open(path) as stats_file:
+            stats = json.load(stats_file)
+        self.assertEqual(1, stats['timers']['phase.work']['count'])
+        self.assertTrue(any(name.endswith('-work.prof')
+                            for name in os.listdir(self.tmpdir)))
@@ -0,0 +1,216 @@
+# -----------------------------------------------------------------------------
+# Getting Things GNOME! - a personal organizer for the GNOME desktop
+# Copyright (c) 2008-2013 - Lionel Dricot & Bertrand Rousseau
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+
+from datetime import timedelta
+from random import Random
+
+from GTG.core.dates import Date
+from tests.core.tasktree import TaskTreeTestCase
+
+
+def get_defined_relatives(task, relation):
+    """ The nearest relatives with a defined due date which isn't fuzzy,
+    walking through the others """
+    relatives = []
+    for tid in getattr(task, relation):
+        relative = task.req.get_task(tid)
+        if relative.get_due_date().is_fuzzy():
+            relatives += get_defined_relatives(relative, relation)
+        else:
+            relatives.append(relative)
+    return relatives
+
+
+class TestDueDatePropagation(TaskTreeTestCase):
+
+    def test_children_are_moved_earlier(self):
+        self.add_task('project', due='2030-01-20')
+        self.add_task('task', ['project'], due='2030-01-15',
+                      start='2030-01-14')
+        self.add_task('subtask', ['task'], due='2030-01-10',
+                      start='2030-01-01')
+
+        self.tasks['project'].set_due_date(Date.parse('2030-01-12'))
+
+        self.assertEqual(Date.parse('2030-01-12'), self.due('project'))
+        self.assertEqual(Date.parse('2030-01-12'), self.due('task'))
+        self.assertEqual(Date.parse('2030-01-12'), self.start('task'))
+        # Already respecting the new constraint
+        self.assertEqual(Date.parse('2030-01-10'), self.due('subtask'))
+        self.assertEqual(Date.parse('2030-01-01'), self.start('subtask'))
+
+    def test_ancestors_are_moved_later(self):
+        self.add_task('project', due='2030-01-20')
+        self.add_task('task', ['project'], due='2030-01-15')
+        self.add_task('subtask', ['task'], due='2030-01-10')
+        self.add_task('sibling', ['project'], due='2030-01-05')
+
+        self.tasks['subtask'].set_due_date(Date.parse('2030-02-01'))
+
+        for tid in ['project', 'task', 'subtask']:
+            self.assertEqual(Date.parse('2030-02-01'), self.due(tid))
+        self.assertEqual(Date.parse('2030-01-05'), self.due('sibling'))
+
+    def test_fuzzy_and_undefined_dates_let_constraints_through(self):
+        self.add_task('project', due='2030-01-20')
+        self.add_task('someday', ['project'], due='someday')
+        self.add_task('undefined', ['someday'])
+        self.add_task('subtask', ['undefined'], due='2030-01-15')
+
+        self.tasks['project'].set_due_date(Date.parse('2030-01-10'))
+        self.assertEqual(Date.parse('2030-01-10'), self.due('subtask'))
+        self.assertEqual(Date.someday(), self.due('someday'))
+        self.assertEqual(Date.no_date(), self.due('undefined'))
+
+        self.tasks['subtask'].set_due_date(Date.parse('2030-03-01'))
+        self.assertEqual(Date.parse('2030-03-01'), self.due('project'))
+        self.assertEqual(Date.someday(), self.due('someday'))
+        self.assertEqual(Date.no_date(), self.due('undefined'))
+
+    def test_fuzzy_due_date_is_not_propagated(self):
+        self.add_task('project', due='2030-01-20')
+        self.add_task('task', ['project'], due='2030-01-15')
+
+        self.tasks['project'].set_due_date(Date.soon())
+
+        self.assertEqual(Date.soon(), self.due('project'))
+        self.assertEqual(Date.parse('2030-01-15'), self.due('task'))
+
+    def test_start_dates_are_clamped(self):
+        self.add_task('task', due='2030-01-20', start='2030-01-15')
+        self.add_task('fuzzy_start', ['task'], due='2030-01-20',
+                      start='someday')
+
+        self.tasks['task'].set_due_date(Date.parse('2030-01-10'))
+
+        self.assertEqual(Date.parse('2030-01-10'), self.start('task'))
+        self.assertEqual(Date.parse('2030-01-10'), self.due('fuzzy_start'))
+        self.assertEqual(Date.someday(), self.start('fuzzy_start'))
+
+    def test_each_task_is_synced_once(self):
+        self.add_task('project', due='2030-01-20')
+        self.add_task('left', ['project'], due='2030-01-18')
+        self.add_task('right', ['project'], due='2030-01-18')
+        self.add_task('shared', ['left', 'right'], due='2030-01-17',
+                      start='2030-01-16')
+        self.add_task('undefined', ['shared'])
+        self.add_task('early', ['project'], due='2030-01-05')
+        self.add_task('other_project', due='2030-01-20')
+        self.count_syncs()
+
+        self.tasks['project'].set_due_date(Date.parse('2030-01-10'))
+
+        for tid in ['left', 'right', 'shared']:
+            self.assertEqual(Date.parse('2030-01-10'), self.due(tid))
+        self.assertEqual({
+            'project': 1,
+            'left': 1,
+            'right': 1,
+            'shared': 1,
+            # the subtasks of a moved task: their constraint changed
+            'undefined': 1,
+            'early': 1,
+            'other_project': 0,
+        }, self.syncs)
+
+    def test_unchanged_due_date_syncs_nothing(self):
+        self.add_task('project', due='2030-01-20')
+        self.add_task('task', ['project'], due='2030-01-15')
+        self.count_syncs()
+
+        self.tasks['project'].set_due_date(Date.parse('2030-01-20'))
+
+        self.assertEqual({'project': 0, 'task': 0}, self.syncs)
+
+
+class TestRandomDueDatePropagation(TaskTreeTestCase):
+    """ Moves due dates in random trees, with several parents per task,
+    and checks that all the constraints hold afterwards """
+
+    TREES = 100
+    TODAY = Date.parse('2030-01-01')
+
+    def random_date(self, rng, latest=None):
+        choice = rng.random()
+        if choice < 0.2:
+            return Date.no_date()
+        if choice < 0.3:
+            return Date(rng.choice(['now', 'soon', 'someday']))
+        date = self.TODAY + timedelta(days=rng.randint(0, 60))
+        if latest is not None and date > latest:
+            return latest
+        return date
+
+    def build_tree(self, rng):
+        self.setUp()
+        for number in range(rng.randint(1, 20)):
+            tid = str(number)
+            parent_ids = set()
+            if number > 0 and rng.random() < 0.8:
+                parent_ids.add(str(rng.randrange(number)))
+                if rng.random() < 0.2:
+                    parent_ids.add(str(rng.randrange(number)))
+            # respect the constraints of the parents
+            latest = None
+            for parent_id in parent_ids:
+                constraint = self.tasks[parent_id].get_due_date_constraint()
+                if not constraint.is_fuzzy() and \
+                        (latest is None or constraint < latest):
+                    latest = constraint
+            due = self.random_date(rng, latest)
+            start = Date.no_date()
+            if not due.is_fuzzy() and rng.random() < 0.5:
+                start = Date(due.date() - timedelta(days=rng.randint(0, 10)))
+            task = self.add_task(tid, sorted(parent_ids))
+            task.due_date = due
+            task.start_date = start
+
+    def assert_constraints(self):
+        for task in self.tasks.values():
+            due = task.get_due_date()
+            start = task.get_start_date()
+            if due.is_fuzzy():
+                continue
+            if not start.is_fuzzy():
+                self.assertLessEqual(start, due)
+            for sub in get_defined_relatives(task, 'children'):
+                self.assertLessEqual(sub.get_due_date(), due)
+
+    def test_constraints_hold_after_moving_a_due_date(self):
+        rng = Random(0)
+        for _ in range(self.TREES):
+            self.build_tree(rng)
+            self.assert_constraints()
+            before = {tid: (task.get_due_date(), task.get_start_date())
+                      for tid, task in self.tasks.items()}
+            self.count_syncs()
+
+            target = rng.choice(list(self.tasks))
+            new_due = self.random_date(rng)
+            self.tasks[target].set_due_date(new_due)
+
+            self.assertEqual(new_due, self.due(target))
+            self.assert_constraints()
+            for tid, task in self.tasks.items():
+                self.assertLessEqual(self.syncs[tid], 1)
+                if (task.get_due_date(), task.get_start_date()) != \
+                        before[tid]:
+                    self.assertEqual(1, self.syncs[tid])
+                # The related tasks are only moved to the new due date
+                if tid != target and task.get_due_date() != before[tid][0]:
+                    self.assertEqual(new_due, task.get_due_date())
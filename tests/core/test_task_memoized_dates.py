@@ -0,0 +1,223 @@
+# -----------------------------------------------------------------------------
+# Getting Things GNOME! - a personal organizer for the GNOME desktop
+# Copyright (c) 2008-2013 - Lionel Dricot & Bertrand Rousseau
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+
+from datetime import date, timedelta
+from random import Random
+
+from mock import patch
+
+from GTG.core.datastore import DataStore
+from GTG.core.dateindex import DateIndex
+from GTG.core.dates import Date
+from GTG.core.task import Task
+from GTG.core.titleindex import TitleIndex
+from tests.core.tasktree import TaskTreeTestCase
+
+
+class FakeDataStore():
+    """ Indexes the tasks of the tree like the DataStore does, on each
+    node-modified callback """
+
+    _index_task = DataStore._index_task
+
+    def __init__(self, req):
+        self.req = req
+        self._closed_index = DateIndex()
+        self._modified_index = DateIndex()
+        self._title_index = TitleIndex()
+        req.get_main_view().register_cllbck('node-modified', self._index_task)
+
+    def get_task(self, tid):
+        return self.req.get_task(tid)
+
+
+def get_urgent_date(task):
+    """ get_urgent_date() without memoization """
+    urgent_date = task.get_due_date()
+    for tid in task.children:
+        sub = task.req.get_task(tid)
+        if sub.get_status() == Task.STA_ACTIVE:
+            urgent_date = min(urgent_date, get_urgent_date(sub))
+    return urgent_date
+
+
+def get_due_date_constraint(task):
+    """ get_due_date_constraint() without memoization """
+    constraint = task.get_due_date()
+    if constraint.is_fuzzy():
+        for tid in task.parents:
+            par = task.req.get_task(tid)
+            par_duedate = par.get_due_date()
+            if par_duedate.is_fuzzy():
+                par_duedate = get_due_date_constraint(par)
+            if par_duedate.is_fuzzy():
+                continue
+            if constraint.is_fuzzy() or par_duedate < constraint:
+                constraint = par_duedate
+    return constraint
+
+
+class TestMemoizedDates(TaskTreeTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.add_task('project', due='2030-01-20')
+        self.add_task('task', ['project'], due='2030-01-15')
+        self.add_task('undefined', ['task'])
+        self.add_task('other_project', due='2030-01-25')
+        self.add_task('other', due='2030-01-05')
+
+    def urgent(self, tid):
+        return self.tasks[tid].get_urgent_date()
+
+    def constraint(self, tid):
+        return self.tasks[tid].get_due_date_constraint()
+
+    def test_child_due_date_changes(self):
+        self.assertEqual(Date.parse('2030-01-15'), self.urgent('project'))
+        self.tasks['task'].set_due_date(Date.parse('2030-01-12'))
+        self.assertEqual(Date.parse('2030-01-12'), self.urgent('project'))
+
+    def test_parent_due_date_changes(self):
+        self.assertEqual(Date.parse('2030-01-15'),
+                         self.constraint('undefined'))
+        self.tasks['task'].set_due_date(Date.parse('2030-01-10'))
+        self.assertEqual(Date.parse('2030-01-10'),
+                         self.constraint('undefined'))
+
+    def test_child_status_changes(self):
+        self.assertEqual(Date.parse('2030-01-15'), self.urgent('project'))
+        self.tasks['task'].set_status(Task.STA_DONE)
+        self.assertEqual(Date.parse('2030-01-20'), self.urgent('project'))
+        self.tasks['task'].set_status(Task.STA_ACTIVE)
+        self.assertEqual(Date.parse('2030-01-15'), self.urgent('project'))
+
+    def test_parent_added(self):
+        self.assertEqual(Date.parse('2030-01-25'),
+                         self.urgent('other_project'))
+        self.tasks['undefined'].add_parent('other_project')
+        self.tasks['other'].add_parent('other_project')
+        self.assertEqual(Date.parse('2030-01-05'),
+                         self.urgent('other_project'))
+        self.assertEqual(Date.parse('2030-01-15'),
+                         self.constraint('undefined'))
+
+    def test_parent_removed(self):
+        self.assertEqual(Date.parse('2030-01-15'),
+                         self.constraint('undefined'))
+        self.assertEqual(Date.parse('2030-01-15'), self.urgent('project'))
+        self.tasks['undefined'].remove_parent('task')
+        self.tasks['task'].remove_parent('project')
+        self.assertEqual(Date.no_date(), self.constraint('undefined'))
+        self.assertEqual(Date.parse('2030-01-20'), self.urgent('project'))
+
+    def test_parent_set(self):
+        self.assertEqual(Date.parse('2030-01-15'), self.urgent('project'))
+        self.assertEqual(Date.parse('2030-01-25'),
+                         self.urgent('other_project'))
+        self.tasks['task'].set_parent('other_project')
+        self.assertEqual(Date.parse('2030-01-20'), self.urgent('project'))
+        self.assertEqual(Date.parse('2030-01-15'),
+                         self.urgent('other_project'))
+
+    def test_subtask_deleted_by_the_tree(self):
+        FakeDataStore(self.req)
+        self.tasks['other'].add_parent('other_project')
+        self.assertEqual(Date.parse('2030-01-05'),
+                         self.urgent('other_project'))
+        # Only the node-modified of the parent tells the task
+        self.req.tree.del_node('other')
+        self.assertEqual(Date.parse('2030-01-25'),
+                         self.urgent('other_project'))
+
+    @patch('GTG.core.task.date')
+    def test_day_rollover(self, mock_date):
+        today = date(2030, 1, 1)
+        mock_date.today.return_value = today
+        self.assertEqual(Date.parse('2030-01-15'), self.urgent('project'))
+
+        # Changed behind the back of the memoization
+        self.tasks['task'].due_date = Date.parse('2030-01-11')
+        self.assertEqual(Date.parse('2030-01-15'), self.urgent('project'))
+
+        mock_date.today.return_value = today + timedelta(days=1)
+        self.assertEqual(Date.parse('2030-01-11'), self.urgent('project'))
+
+
+class TestRandomMemoizedDates(TaskTreeTestCase):
+    """ Changes due dates, statuses and parent links in random trees and
+    compares the memoized dates with the computed ones """
+
+    TREES = 50
+    CHANGES = 20
+
+    def random_date(self, rng):
+        choice = rng.random()
+        if choice < 0.25:
+            return Date.no_date()
+        if choice < 0.35:
+            return Date(rng.choice(['now', 'soon', 'someday']))
+        return Date(date(2030, 1, 1) + timedelta(days=rng.randint(0, 60)))
+
+    def build_tree(self, rng):
+        self.setUp()
+        FakeDataStore(self.req)
+        for number in range(rng.randint(2, 20)):
+            parent_ids = []
+            if number > 0 and rng.random() < 0.8:
+                parent_ids.append(str(rng.randrange(number)))
+            self.add_task(str(number), parent_ids)
+            self.tasks[str(number)].set_due_date(self.random_date(rng))
+
+    def change(self, rng):
+        if not self.tasks:
+            return
+        tid = rng.choice(list(self.tasks))
+        task = self.tasks[tid]
+        # Parents always have a lower number: no cycles
+        candidates = [str(number) for number in range(int(tid))
+                      if str(number) in self.tasks]
+        choice = rng.random()
+        if choice < 0.3:
+            task.set_due_date(self.random_date(rng))
+        elif choice < 0.55:
+            task.set_status(rng.choice([Task.STA_ACTIVE, Task.STA_DONE,
+                                        Task.STA_DISMISSED]))
+        elif choice < 0.7 and candidates:
+            parent_id = rng.choice(candidates)
+            if parent_id not in task.parents:
+                task.add_parent(parent_id)
+        elif choice < 0.8 and task.parents:
+            task.remove_parent(rng.choice(task.parents))
+        elif choice < 0.9:
+            task.set_parent(rng.choice(candidates) if candidates else None)
+        elif not task.children:
+            self.req.tree.del_node(tid)
+            del self.tasks[tid]
+
+    def test_memoized_dates_match(self):
+        rng = Random(0)
+        for _ in range(self.TREES):
+            self.build_tree(rng)
+            for _ in range(self.CHANGES):
+                for task in self.tasks.values():
+                    self.assertEqual(get_urgent_date(task),
+                                     task.get_urgent_date())
+                    self.assertEqual(get_due_date_constraint(task),
+                                     task.get_due_date_constraint())
+                self.change(rng)
@@ -0,0 +1,111 @@
+# -----------------------------------------------------------------------------
+# Getting Things GNOME! - a personal organizer for the GNOME desktop
+# Copyright (c) 2008-2013 - Lionel Dricot & Bertrand Rousseau
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+
+from GTG.core.dates import Date
+from GTG.core.task import Task
+from tests.core.tasktree import TaskTreeTestCase
+
+
+class TestTaskStatus(TaskTreeTestCase):
+    """ A project with a mixed subtree:
+
+        project
+        ├── active
+        │   └── active_child
+        ├── done
+        │   └── active_under_done
+        └── dismissed
+            └── done_under_dismissed
+    """
+
+    CLOSED_BEFORE = Date.parse('2020-01-01')
+
+    def setUp(self):
+        super().setUp()
+        self.add_task('project')
+        self.add_task('active', ['project'])
+        self.add_task('active_child', ['active'])
+        self.add_task('done', ['project'], Task.STA_DONE)
+        self.add_task('active_under_done', ['done'])
+        self.add_task('dismissed', ['project'], Task.STA_DISMISSED)
+        self.add_task('done_under_dismissed', ['dismissed'], Task.STA_DONE)
+        self.count_syncs()
+
+    def add_task(self, tid, parent_ids=(), status=Task.STA_ACTIVE):
+        task = super().add_task(tid, parent_ids, status)
+        if status != Task.STA_ACTIVE:
+            task.closed_date = self.CLOSED_BEFORE
+        return task
+
+    def status(self, tid):
+        return self.tasks[tid].get_status()
+
+    def test_done_closes_only_the_active_subtasks(self):
+        closed = Date.parse('2021-02-03')
+        self.tasks['project'].set_status(Task.STA_DONE, donedate=closed)
+
+        for tid in ['project', 'active', 'active_child']:
+            self.assertEqual(Task.STA_DONE, self.status(tid))
+            self.assertEqual(closed, self.tasks[tid].get_closed_date())
+        self.assertEqual(Task.STA_DISMISSED, self.status('dismissed'))
+        self.assertEqual(Task.STA_DONE, self.status('done_under_dismissed'))
+        self.assertEqual(self.CLOSED_BEFORE,
+                         self.tasks['done'].get_closed_date())
+        # The subtasks of closed tasks are left alone
+        self.assertEqual(Task.STA_ACTIVE, self.status('active_under_done'))
+
+    def test_dismiss_keeps_done_subtasks(self):
+        self.tasks['project'].set_status(Task.STA_DISMISSED)
+
+        for tid in ['project', 'active', 'active_child', 'dismissed']:
+            self.assertEqual(Task.STA_DISMISSED, self.status(tid))
+        for tid in ['done', 'done_under_dismissed']:
+            self.assertEqual(Task.STA_DONE, self.status(tid))
+        self.assertEqual(Date.today(), self.tasks['active'].get_closed_date())
+
+    def test_closing_syncs_each_affected_task_once(self):
+        self.tasks['project'].set_status(Task.STA_DONE)
+
+        self.assertEqual({
+            'project': 1,
+            'active': 1,
+            'active_child': 1,
+            'done': 0,
+            'active_under_done': 0,
+            'dismissed': 0,
+            'done_under_dismissed': 0,
+        }, self.syncs)
+
+    def test_reopening_reopens_the_closed_parents(self):
+        self.tasks['done_under_dismissed'].set_status(Task.STA_ACTIVE)
+
+        for tid in ['done_under_dismissed', 'dismissed']:
+            self.assertEqual(Task.STA_ACTIVE, self.status(tid))
+            self.assertEqual(1, self.syncs[tid])
+        # The other closed tasks are not reopened
+        self.assertEqual(Task.STA_DONE, self.status('done'))
+        self.assertEqual(0, self.syncs['done'])
+
+    def test_reopening_a_whole_branch(self):
+        self.tasks['project'].set_status(Task.STA_DONE)
+        self.tasks['active_child'].set_status(Task.STA_ACTIVE)
+
+        for tid in ['active_child', 'active', 'project']:
+            self.assertEqual(Task.STA_ACTIVE, self.status(tid))
+        self.assertEqual(Task.STA_DISMISSED, self.status('dismissed'))
+        self.assertEqual(Task.STA_DONE, self.status('done'))
@@ -0,0 +1,111 @@
+# -----------------------------------------------------------------------------
+# Getting Things GNOME! - a personal organizer for the GNOME desktop
+# Copyright (c) 2008-2013 - Lionel Dricot & Bertrand Rousseau
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+
+from unittest import TestCase
+import os
+import shutil
+import tempfile
+
+from GTG.core import cleanxml
+from GTG.core.taskindex import TaskFileIndex
+
+
+def write_tasks(path, tasks):
+    """ Writes {tid: (title, content)} as GTG does """
+    doc, xmlproj = cleanxml.emptydoc("project")
+    for tid, (title, content) in tasks.items():
+        task = doc.createElement("task")
+        task.setAttribute("id", tid)
+        task.setAttribute("status", "Active")
+        cleanxml.addTextNode(doc, task, "title", title)
+        cleanxml.addTextNode(doc, task, "content", content)
+        task.appendChild(doc.createElement("task-remote-ids"))
+        xmlproj.appendChild(task)
+    cleanxml.savexml(path, doc)
+
+
+class TestTaskFileIndex(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'gtg_tasks.xml')
+        self.cache_dir = os.path.join(self.tmpdir, 'cache')
+        write_tasks(self.path, {
+            'a': ('First', 'Some <tag>@work</tag> &amp; text'),
+            'b': ('Second', ''),
+        })
+        self.index = TaskFileIndex(self.path, cache_dir=self.cache_dir)
+
+    def tearDown(self):
+        self.index.close()
+        shutil.rmtree(self.tmpdir)
+
+    def test_indexes_every_task(self):
+        self.assertEqual({'a', 'b'}, set(self.index.get_task_ids()))
+
+    def test_task_bytes_are_a_single_element(self):
+        raw = self.index.get_task_bytes('b')
+        self.assertTrue(raw.startswith(b'<task '))
+        self.assertTrue(raw.endswith(b'</task>'))
+        self.assertIn(b'Second', raw)
+        self.assertNotIn(b'First', raw)
+
+    def test_reads_content_of_single_task(self):
+        self.assertEqual(
+            '<content>Some <tag>@work</tag> &amp; text</content>',
+            self.index.get_content('a'))
+        self.assertEqual('', self.index.get_content('b'))
+        self.assertIsNone(self.index.get_content('missing'))
+
+    def test_reads_task_node(self):
+        node = self.index.get_task_node('a')
+        self.assertEqual('a', node.getAttribute('id'))
+        self.assertEqual('First', cleanxml.readTextNode(node, 'title'))
+
+    def test_rebuilds_when_file_changes(self):
+        digests = self.index.get_digests()
+        write_tasks(self.path, {
+            'a': ('First', 'Some <tag>@work</tag> &amp; text'),
+            'b': ('Second, renamed', ''),
+            'c': ('Third', ''),
+        })
+        self.assertTrue(self.index.refresh())
+        new_digests = self.index.get_digests()
+        self.assertEqual(digests['a'], new_digests['a'])
+        self.assertNotEqual(digests['b'], new_digests['b'])
+        self.assertIn('c', new_digests)
+
+    def test_does_not_rebuild_unchanged_file(self):
+        self.index.get_task_ids()
+        self.assertFalse(self.index.refresh())
+
+    def test_index_is_persisted(self):
+        digests = self.index.get_digests()
+        other = TaskFileIndex(self.path, cache_dir=self.cache_dir)
+        try:
+            self.assertFalse(other.refresh())
+            self.assertEqual(digests, other.get_digests())
+        finally:
+            other.close()
+
+    def test_detects_truncated_file(self):
+        self.assertTrue(self.index.is_complete())
+        with open(self.path, 'rb') as xml_file:
+            data = xml_file.read()
+        with open(self.path, 'wb') as xml_file:
+            xml_file.write(data[:len(data) // 2])
+        self.assertFalse(self.index.is_complete())
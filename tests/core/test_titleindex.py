@@ -0,0 +1,54 @@
+# -----------------------------------------------------------------------------
+# Getting Things GNOME! - a personal organizer for the GNOME desktop
+# Copyright (c) 2008-2013 - Lionel Dricot & Bertrand Rousseau
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+
+from unittest import TestCase
+
+from GTG.core.titleindex import TitleIndex
+
+
+class TestTitleIndex(TestCase):
+
+    def setUp(self):
+        self.index = TitleIndex()
+        self.index.update('a', 'Buy milk')
+        self.index.update('b', 'buy MILK')
+        self.index.update('c', 'Buy bread')
+        self.index.update('d', 'Call mom')
+
+    def test_exact_match_ignores_the_case(self):
+        self.assertEqual(['a', 'b'], self.index.get_exact('BUY MILK'))
+        self.assertEqual([], self.index.get_exact('buy'))
+
+    def test_prefix(self):
+        self.assertEqual(['c', 'a', 'b'], self.index.get_prefix('buy'))
+        self.assertEqual(['d'], self.index.get_prefix('CALL'))
+        self.assertEqual([], self.index.get_prefix('x'))
+
+    def test_rename(self):
+        self.index.update('a', 'Sell milk')
+        self.assertEqual(['b'], self.index.get_exact('buy milk'))
+        self.assertEqual(['a'], self.index.get_exact('sell milk'))
+        self.assertEqual(4, len(self.index))
+
+    def test_remove(self):
+        self.index.remove('b')
+        self.index.update('d', None)
+        self.index.remove('unknown')
+        self.assertEqual(['a'], self.index.get_exact('buy milk'))
+        self.assertNotIn('d', self.index)
+        self.assertEqual(2, len(self.index))
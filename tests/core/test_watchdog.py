@@ -0,0 +1,121 @@
+# -----------------------------------------------------------------------------
+# Getting Things GNOME! - a personal organizer for the GNOME desktop
+# Copyright (c) 2008-2013 - Lionel Dricot & Bertrand Rousseau
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+
+from unittest import TestCase
+
+from mock import patch
+
+from GTG.core import watchdog
+from GTG.core.watchdog import MainLoopWatchdog, main_loop_handler
+
+
+class FakeTime():
+    """ Clock of the watchdog, only moved by the tests """
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = 0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps += 1
+        self.now += seconds
+
+
+class RacyHandlers(list):
+    """ The main thread pops the handler between the check of the watchdog
+    thread and its read """
+
+    def __len__(self):
+        return 1
+
+    def __getitem__(self, index):
+        raise IndexError(index)
+
+
+class TestMainLoopWatchdog(TestCase):
+    def setUp(self):
+        self.time = FakeTime()
+        patcher = patch.object(watchdog, 'time', self.time)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.watchdog = MainLoopWatchdog(threshold=0.25, heartbeat=0.05)
+        with patch.object(watchdog, 'GLib') as glib, \
+                patch.object(watchdog.threading, 'Thread'):
+            self.watchdog.start()
+        self.addCleanup(self.watchdog.stop)
+        # The heartbeat is only run by the tests
+        self.beat = glib.timeout_add.call_args[0][1]
+
+    def test_no_stall(self):
+        for _ in range(10):
+            self.time.now += 0.05
+            self.watchdog.check()
+            self.assertTrue(self.beat())
+        self.assertEqual(0, self.watchdog.stalls)
+
+    def test_stall(self):
+        self.time.now += 0.2
+        self.watchdog.check()
+        self.time.now += 0.8
+        with self.assertLogs('gtg', 'WARNING') as logs:
+            self.watchdog.check()
+            # The stack is sampled once per stall
+            self.watchdog.check()
+        self.assertEqual(1, len(logs.output))
+        self.assertIn('Main loop blocked for more than 950 ms', logs.output[0])
+        self.assertIn('test_stall', logs.output[0])
+
+        with self.assertLogs('gtg', 'WARNING') as logs:
+            self.assertTrue(self.beat())
+        self.assertEqual(1, self.watchdog.stalls)
+        self.assertAlmostEqual(0.95, self.watchdog.longest_stall)
+        self.assertIn('Main loop blocked for 950 ms', logs.output[0])
+
+    def test_stall_is_attributed_to_the_handler(self):
+        self.time.now += 1
+        with main_loop_handler('on_search'):
+            with self.assertLogs('gtg', 'WARNING') as logs:
+                self.watchdog.check()
+        self.assertIn('by on_search', logs.output[0])
+
+        with self.assertLogs('gtg', 'WARNING') as logs:
+            self.beat()
+        self.assertIn('in on_search', logs.output[0])
+
+    def test_handler_popped_while_sampling(self):
+        self.time.now += 1
+        with patch.object(watchdog, '_handlers', RacyHandlers()):
+            with self.assertLogs('gtg', 'WARNING') as logs:
+                self.watchdog.check()
+        self.assertNotIn(' by ', logs.output[0])
+        self.assertEqual(1, len(logs.output))
+
+    def test_failed_sample_does_not_stop_the_monitor(self):
+        def check():
+            if self.time.sleeps == 3:
+                self.watchdog.stop()
+            raise RuntimeError('bad sample')
+
+        with patch.object(self.watchdog, 'check', side_effect=check), \
+                self.assertLogs('gtg', 'ERROR') as logs:
+            self.watchdog._monitor()
+        self.assertEqual(3, len(logs.output))
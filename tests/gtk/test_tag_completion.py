@@ -0,0 +1,45 @@
+# -----------------------------------------------------------------------------
+# Getting Things GNOME! - a personal organizer for the GNOME desktop
+# Copyright (c) 2008-2013 - Lionel Dricot & Bertrand Rousseau
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+
+from unittest import TestCase
+
+from mock import Mock
+
+from GTG.gtk.tag_completion import get_match_key, tag_match
+
+
+class TestTagMatch(TestCase):
+    def match(self, key, name):
+        completion = Mock()
+        completion.get_model().get_value.return_value = name
+        return tag_match(completion, key, None, 0)
+
+    def test_prefix(self):
+        self.assertTrue(self.match('@wo', '@work'))
+        self.assertTrue(self.match('@WO', '@work'))
+        self.assertFalse(self.match('@wo', '@home'))
+
+    def test_leading_whitespace_is_ignored(self):
+        self.assertTrue(self.match('  @wo', '@work'))
+        self.assertTrue(self.match('\t!wo', '!work'))
+        self.assertEqual('@wo', get_match_key(' @Wo'))
+
+    def test_artefacts_match_nothing(self):
+        for key in ['', ' ', '!', '@', ' !@']:
+            self.assertFalse(self.match(key, '@work'))
+            self.assertIsNone(get_match_key(key))